@@ -0,0 +1,131 @@
+# api_clients.py - Client delle API (Anthropic, OpenAI, Gemini) creati una volta e riusati
+import importlib.util
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+# Gli SDK impostano il timeout per ogni richiesta; questo vale per le chiamate dirette
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_request_counts: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count_request(request: httpx.Request) -> None:
+    with _stats_lock:
+        _request_counts[request.url.host] += 1
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Client HTTP condiviso da tutti gli SDK: un unico pool di connessioni keep-alive
+    (HTTP/2 se il pacchetto 'h2' è installato), quindi l'handshake TLS verso ogni
+    API si paga una volta sola per processo.
+    """
+    global _http_client
+    with _clients_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=DEFAULT_TIMEOUT,
+                limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS,
+                                    max_keepalive_connections=DEFAULT_MAX_KEEPALIVE,
+                                    keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY),
+                event_hooks={"request": [_count_request]},
+            )
+            logging.info(f"Pool HTTP condiviso per le API creato (HTTP/2: {'sì' if HTTP2_AVAILABLE else 'no'})")
+        return _http_client
+
+
+def _get_or_create(provider: str, api_key: Optional[str], factory) -> Any:
+    key = (provider, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+    if client is not None:
+        return client
+    client = factory()
+    with _clients_lock:
+        # Un altro thread potrebbe averlo creato nel frattempo: si tiene il primo
+        return _clients.setdefault(key, client)
+
+
+def get_anthropic_client(api_key: Optional[str]):
+    """Client Anthropic riusato; i nuovi tentativi sono delegati ai RateLimiter"""
+    import anthropic
+    return _get_or_create("anthropic", api_key, lambda: anthropic.Anthropic(
+        api_key=api_key, max_retries=0, http_client=get_http_client()))
+
+
+def get_openai_client(api_key: Optional[str]):
+    """Client OpenAI riusato; i nuovi tentativi sono delegati ai RateLimiter"""
+    import openai
+    return _get_or_create("openai", api_key, lambda: openai.OpenAI(
+        api_key=api_key, max_retries=0, http_client=get_http_client()))
+
+
+def get_gemini_client(api_key: Optional[str]):
+    """Client Google Gemini riusato (ImportError se google-genai non è installato)"""
+    from google import genai
+    from google.genai import types
+
+    def create():
+        try:
+            http_options = types.HttpOptions(httpx_client=get_http_client())
+        except Exception:
+            # Versioni di google-genai senza 'httpx_client': il client usa un suo pool
+            http_options = None
+        return genai.Client(api_key=api_key, http_options=http_options)
+
+    return _get_or_create("gemini", api_key, create)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Statistiche del pool condiviso: client creati, richieste per host e connessioni aperte"""
+    with _clients_lock:
+        providers = sorted({provider for provider, _ in _clients})
+        http_client = _http_client
+    with _stats_lock:
+        requests_by_host = dict(_request_counts)
+
+    stats: Dict[str, Any] = {
+        "http2": HTTP2_AVAILABLE,
+        "clients": providers,
+        "requests": sum(requests_by_host.values()),
+        "requests_by_host": requests_by_host,
+        "connections": 0,
+        "idle_connections": 0,
+        "http2_connections": 0,
+    }
+    # Il pool di httpcore non ha un'API pubblica: lettura difensiva dello stato
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    for connection in list(getattr(pool, "connections", []) or []):
+        stats["connections"] += 1
+        try:
+            if connection.is_idle():
+                stats["idle_connections"] += 1
+            if "HTTP/2" in connection.info():
+                stats["http2_connections"] += 1
+        except Exception:
+            pass
+    return stats
+
+
+def close_clients() -> None:
+    """Chiude il pool condiviso e dimentica i client (es. alla chiusura dell'applicazione)"""
+    global _http_client
+    with _clients_lock:
+        _clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
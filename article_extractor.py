@@ -0,0 +1,140 @@
+# article_extractor.py - Estrazione asincrona del testo completo degli articoli
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from newspaper import Article
+
+from article_text_cache import get_article_text_cache
+
+DEFAULT_MAX_CONCURRENCY = 6
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+DEFAULT_PARSE_WORKERS = 2
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+_parse_executor: Optional[Executor] = None
+_parse_executor_lock = threading.Lock()
+
+
+def parse_article_html(article_url: str, html: str) -> Optional[str]:
+    """Estrae il testo da HTML già scaricato (eseguita nel process pool)"""
+    article_parser = Article(article_url, language='it')
+    article_parser.download(input_html=html)
+    article_parser.parse()
+    return article_parser.text or None
+
+
+def get_parse_executor(max_workers: int = DEFAULT_PARSE_WORKERS) -> Executor:
+    """Process pool condiviso per il parsing HTML (fallback su thread se non disponibile)"""
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            try:
+                _parse_executor = ProcessPoolExecutor(max_workers=max_workers)
+            except (OSError, NotImplementedError) as e:
+                logging.warning(f"Process pool non disponibile ({e}), parsing su thread")
+                _parse_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                     thread_name_prefix="article-parse")
+        return _parse_executor
+
+
+def shutdown_parse_executor() -> None:
+    """Chiude il pool di parsing (registrata anche con atexit)"""
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is not None:
+            _parse_executor.shutdown(wait=False, cancel_futures=True)
+            _parse_executor = None
+
+
+atexit.register(shutdown_parse_executor)
+
+
+async def _extract_one(client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                       executor: Executor, article: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Scarica un articolo (limitato dal semaforo) e ne delega il parsing al pool"""
+    article_url = article.get('link')
+    if not article_url:
+        return article, None
+
+    text_cache = get_article_text_cache()
+    cached_text = text_cache.get(article_url)
+    if cached_text:
+        logging.info(f"Testo dell'articolo dalla cache: {article_url}")
+        return article, cached_text
+
+    try:
+        async with semaphore:
+            response = await client.get(article_url)
+            response.raise_for_status()
+            html = response.text
+
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(executor, parse_article_html, str(response.url), html)
+        if text:
+            logging.info(f"Testo estratto ({len(text)} caratteri): {article_url}")
+            text_cache.put(article_url, text)
+        else:
+            logging.warning(f"Testo dell'articolo vuoto: {article_url}")
+        return article, text
+    except Exception as e:
+        logging.error(f"Errore durante l'estrazione del testo da {article_url}: {e}")
+        return article, None
+
+
+async def extract_articles(articles: List[Dict[str, Any]],
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                           ) -> AsyncIterator[Tuple[Dict[str, Any], Optional[str]]]:
+    """Estrae in parallelo il testo di tutti gli articoli, restituendoli man mano che completano"""
+    if not articles:
+        return
+
+    executor = get_parse_executor()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    timeout = httpx.Timeout(DEFAULT_READ_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT)
+    limits = httpx.Limits(max_connections=max(1, max_concurrency))
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        tasks = [asyncio.create_task(_extract_one(client, semaphore, executor, article))
+                 for article in articles]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+
+
+def iter_extracted_articles(articles: List[Dict[str, Any]],
+                            max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                            ) -> Iterator[Tuple[Dict[str, Any], Optional[str]]]:
+    """
+    Versione sincrona di extract_articles: l'event loop gira in un thread dedicato
+    e ogni risultato viene consegnato appena pronto, così il chiamante può
+    avviare la generazione del post mentre gli altri download sono ancora in corso.
+    """
+    results: "queue.Queue[Any]" = queue.Queue()
+    done = object()
+
+    def run_loop():
+        async def consume():
+            async for item in extract_articles(articles, max_concurrency):
+                results.put(item)
+        try:
+            asyncio.run(consume())
+        except Exception as e:
+            logging.error(f"Errore nella pipeline di estrazione articoli: {e}")
+        finally:
+            results.put(done)
+
+    threading.Thread(target=run_loop, name="article-extract", daemon=True).start()
+
+    while True:
+        item = results.get()
+        if item is done:
+            return
+        yield item
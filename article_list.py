@@ -0,0 +1,197 @@
+# article_list.py - Elenco articoli della GUI: modello incrementale con id stabili e listbox virtualizzata
+import hashlib
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from url_utils import normalize_title, normalize_url
+
+DEFAULT_VISIBLE_ROWS = 15
+
+
+def article_id(article: Dict[str, Any]) -> str:
+    """Id stabile tra un caricamento e l'altro: URL normalizzato (o titolo se manca il link)"""
+    link = article.get("link")
+    basis = normalize_url(link) if link else "title:" + normalize_title(article.get("title", ""))
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+class ArticleListModel:
+    """
+    Articoli in ordine di arrivo, indicizzati per id: un nuovo caricamento inserisce
+    solo gli articoli non ancora presenti invece di ricostruire l'elenco.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._articles: Dict[str, Dict[str, Any]] = {}
+        self._positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self._articles[self._ids[index]]
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._articles
+
+    def id_at(self, index: int) -> str:
+        return self._ids[index]
+
+    def index_of(self, item_id: str) -> Optional[int]:
+        return self._positions.get(item_id)
+
+    def merge(self, articles: Iterable[Dict[str, Any]]) -> List[str]:
+        """Aggiunge in coda gli articoli nuovi e restituisce i loro id (i già presenti non cambiano posizione)"""
+        added = []
+        for article in articles:
+            item_id = article_id(article)
+            if item_id in self._articles:
+                continue
+            self._positions[item_id] = len(self._ids)
+            self._ids.append(item_id)
+            self._articles[item_id] = article
+            added.append(item_id)
+        return added
+
+    def retain(self, keep_ids: Iterable[str]) -> int:
+        """Toglie gli articoli non più presenti nei feed; restituisce quanti ne ha rimossi"""
+        keep = set(keep_ids)
+        removed = [item_id for item_id in self._ids if item_id not in keep]
+        if not removed:
+            return 0
+        for item_id in removed:
+            del self._articles[item_id]
+        self._ids = [item_id for item_id in self._ids if item_id in keep]
+        self._positions = {item_id: index for index, item_id in enumerate(self._ids)}
+        return len(removed)
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._articles.clear()
+        self._positions.clear()
+
+
+class VirtualListbox(tk.Frame):
+    """
+    Listbox che contiene solo le righe visibili: lo scorrimento ridisegna la finestra
+    di righe a partire dal modello, quindi il costo non dipende dal numero di articoli.
+    La selezione è legata all'id dell'articolo e sopravvive a scorrimenti e aggiornamenti.
+    """
+
+    def __init__(self, master, model: ArticleListModel,
+                 render: Optional[Callable[[int, Dict[str, Any]], str]] = None,
+                 empty_text: str = "", height: int = DEFAULT_VISIBLE_ROWS, **listbox_options: Any):
+        super().__init__(master)
+        self.model = model
+        self.render = render or (lambda index, article: f"{index + 1}. {article.get('title', '')}")
+        self.empty_text = empty_text
+        self.top = 0
+        self.visible_rows = height
+        self.selected_id: Optional[str] = None
+        self._rendered: List[Optional[str]] = []
+
+        self.listbox = tk.Listbox(self, height=height, selectmode=tk.SINGLE, exportselection=False,
+                                  **listbox_options)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._row_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        self.listbox.bind("<Up>", lambda event: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda event: self.scroll(-1, "pages"))
+        self.listbox.bind("<Next>", lambda event: self.scroll(1, "pages"))
+
+    # --- Scorrimento ---
+
+    def _max_top(self) -> int:
+        return max(0, len(self.model) - self.visible_rows)
+
+    def scroll_to(self, top: int) -> None:
+        top = min(max(0, top), self._max_top())
+        if top != self.top:
+            self.top = top
+            self.refresh()
+
+    def scroll(self, amount: int, what: str = "units") -> str:
+        step = self.visible_rows - 1 if what == "pages" else 3
+        self.scroll_to(self.top + amount * max(1, step))
+        return "break"
+
+    def _on_scrollbar(self, action: str, value: str, what: str = "units") -> None:
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.model)))
+        else:
+            self.scroll(int(value), what)
+
+    def _on_resize(self, event) -> None:
+        rows = max(1, event.height // self._row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.top = min(self.top, self._max_top())
+            self.refresh()
+
+    # --- Selezione ---
+
+    def _on_select(self, _event=None) -> None:
+        selection = self.listbox.curselection()
+        if selection and selection[0] < len(self._rendered):
+            self.selected_id = self._rendered[selection[0]]
+
+    def _move_selection(self, delta: int) -> str:
+        if not len(self.model):
+            return "break"
+        current = self.model.index_of(self.selected_id) if self.selected_id else None
+        index = min(max(0, (self.top if current is None else current + delta)), len(self.model) - 1)
+        self.selected_id = self.model.id_at(index)
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible_rows:
+            self.top = index - self.visible_rows + 1
+        self.refresh()
+        return "break"
+
+    def selected_article(self) -> Optional[Dict[str, Any]]:
+        if self.selected_id is None or self.selected_id not in self.model:
+            return None
+        return self.model[self.model.index_of(self.selected_id)]
+
+    # --- Disegno ---
+
+    def refresh(self) -> None:
+        """Ridisegna solo le righe visibili; le righe invariate non vengono toccate"""
+        total = len(self.model)
+        self.top = min(self.top, self._max_top())
+        if total:
+            stop = min(total, self.top + self.visible_rows)
+            wanted = [self.model.id_at(index) for index in range(self.top, stop)]
+            labels = [self.render(index, self.model[index]) for index in range(self.top, stop)]
+        else:
+            wanted = [None] if self.empty_text else []
+            labels = [self.empty_text] if self.empty_text else []
+
+        for row, (item_id, label) in enumerate(zip(wanted, labels)):
+            if row < len(self._rendered):
+                if self._rendered[row] == item_id and self.listbox.get(row) == label:
+                    continue
+                self.listbox.delete(row)
+            self.listbox.insert(row, label)
+        if len(self._rendered) > len(wanted):
+            self.listbox.delete(len(wanted), tk.END)
+        self._rendered = wanted
+
+        self.listbox.selection_clear(0, tk.END)
+        if self.selected_id is not None and self.selected_id in wanted:
+            self.listbox.selection_set(wanted.index(self.selected_id))
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,108 @@
+# article_scoring.py - Parsing delle date di pubblicazione e scoring vettorizzato degli articoli
+import calendar
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dateutil import parser as date_parser
+
+MAX_FRESHNESS_HOURS = 168  # 7 giorni
+MISSING_DATE_SCORE = 0.0
+UNPARSEABLE_DATE_SCORE = 0.5
+TITLE_KEYWORD_BONUS = 0.2
+
+
+def parse_published_timestamp(published_parsed: Any = None, published: Optional[str] = None) -> Optional[float]:
+    """
+    Timestamp UTC (secondi epoch) della pubblicazione.
+    'published_parsed' di feedparser è già normalizzato in UTC; in alternativa viene
+    interpretata la stringa (RFC 822 dei feed RSS o ISO 8601 degli Atom).
+    Le date senza fuso orario sono considerate UTC.
+    """
+    if published_parsed:
+        try:
+            return float(calendar.timegm(tuple(published_parsed)[:9]))
+        except (TypeError, ValueError, OverflowError):
+            pass
+
+    if not published or not isinstance(published, str):
+        return None
+
+    parsed: Optional[datetime] = None
+    try:
+        parsed = parsedate_to_datetime(published)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = date_parser.parse(published)
+        except (ValueError, OverflowError):
+            return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def article_timestamp(article: Dict[str, Any]) -> Optional[float]:
+    """Timestamp di pubblicazione dell'articolo, calcolato una volta e memorizzato"""
+    if 'published_timestamp' not in article:
+        article['published_timestamp'] = parse_published_timestamp(
+            article.get('published_parsed'), article.get('published')
+        )
+    return article['published_timestamp']
+
+
+def freshness_scores(timestamps: np.ndarray, has_date_text: np.ndarray,
+                     now: Optional[float] = None,
+                     max_hours: float = MAX_FRESHNESS_HOURS) -> np.ndarray:
+    """
+    Punteggio di freschezza 0-1 decrescente linearmente fino a 'max_hours'.
+    timestamps: NaN dove la data manca o non è interpretabile.
+    """
+    now = time.time() if now is None else now
+    hours_ago = (now - timestamps) / 3600.0
+    scores = np.clip((max_hours - hours_ago) / max_hours, 0.0, 1.0)
+    fallback = np.where(has_date_text, UNPARSEABLE_DATE_SCORE, MISSING_DATE_SCORE)
+    return np.where(np.isnan(timestamps), fallback, scores)
+
+
+def relevance_scores(keyword_counts: np.ndarray, title_counts: np.ndarray,
+                     total_keywords: int) -> np.ndarray:
+    """Quota di keyword AI presenti più un bonus per quelle nel titolo, limitato a 1"""
+    base = keyword_counts / total_keywords if total_keywords > 0 else np.zeros_like(keyword_counts, dtype=float)
+    return np.minimum(1.0, base + title_counts * TITLE_KEYWORD_BONUS)
+
+
+def score_articles_batch(articles: Sequence[Dict[str, Any]], total_keywords: int,
+                         freshness_weight: float, relevance_weight: float,
+                         now: Optional[float] = None) -> np.ndarray:
+    """
+    Calcola in blocco i punteggi finali (freschezza e rilevanza pesate) per tutti gli articoli.
+    Richiede che 'keyword_hits' e 'title_keyword_hits' siano già presenti negli articoli.
+    """
+    count = len(articles)
+    timestamps = np.empty(count, dtype=float)
+    has_date_text = np.zeros(count, dtype=bool)
+    keyword_counts = np.empty(count, dtype=float)
+    title_counts = np.empty(count, dtype=float)
+
+    for i, article in enumerate(articles):
+        timestamp = article_timestamp(article)
+        timestamps[i] = np.nan if timestamp is None else timestamp
+        has_date_text[i] = bool(article.get('published'))
+        keyword_counts[i] = len(article.get('keyword_hits', ()))
+        title_counts[i] = len(article.get('title_keyword_hits', ()))
+
+    freshness = freshness_scores(timestamps, has_date_text, now)
+    relevance = relevance_scores(keyword_counts, title_counts, total_keywords)
+    return freshness * freshness_weight + relevance * relevance_weight
+
+
+def rank_by_score(articles: List[Dict[str, Any]], scores: np.ndarray) -> List[Dict[str, Any]]:
+    """Assegna 'score' a ogni articolo e li restituisce in ordine decrescente (ordinamento stabile)"""
+    for article, score in zip(articles, scores.tolist()):
+        article['score'] = score
+    order = np.argsort(-scores, kind="stable")
+    return [articles[i] for i in order]
@@ -0,0 +1,69 @@
+# article_text_cache.py - Cache content-addressed del testo estratto dagli articoli
+import hashlib
+import os
+from typing import Optional
+
+from disk_cache import DiskCache
+from url_utils import normalize_url
+
+DEFAULT_ARTICLE_CACHE_PATH = os.path.join("cache", "article_text.db")
+DEFAULT_ARTICLE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_ARTICLE_CACHE_TTL = 14 * 24 * 3600
+
+URL_NAMESPACE = "article_url"
+TEXT_NAMESPACE = "article_text"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ArticleTextCache:
+    """
+    Testo estratto degli articoli indicizzato su due livelli:
+    URL normalizzato -> hash del contenuto -> testo compresso.
+    Articoli identici raggiungibili da URL diversi occupano spazio una sola volta.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_ARTICLE_CACHE_PATH,
+                 max_bytes: int = DEFAULT_ARTICLE_CACHE_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_ARTICLE_CACHE_TTL):
+        self.cache = DiskCache(db_path, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+    def get_by_hash(self, text_hash: str) -> Optional[str]:
+        return self.cache.get(text_hash, namespace=TEXT_NAMESPACE)
+
+    def get(self, article_url: str) -> Optional[str]:
+        """Testo in cache per l'URL (dopo normalizzazione) o None"""
+        url_key = normalize_url(article_url)
+        if not url_key:
+            return None
+        text_hash = self.cache.get(url_key, namespace=URL_NAMESPACE)
+        if text_hash is None:
+            return None
+        text = self.get_by_hash(text_hash)
+        if text is None:
+            # Il contenuto è stato rimosso dall'LRU: anche il puntatore non serve più
+            self.cache.delete(url_key, namespace=URL_NAMESPACE)
+        return text
+
+    def put(self, article_url: str, text: str) -> Optional[str]:
+        """Salva il testo e restituisce il suo hash"""
+        url_key = normalize_url(article_url)
+        if not url_key or not text:
+            return None
+        text_hash = content_hash(text)
+        self.cache.set(text_hash, text, namespace=TEXT_NAMESPACE)
+        self.cache.set(url_key, text_hash, namespace=URL_NAMESPACE)
+        return text_hash
+
+
+_default_cache: Optional[ArticleTextCache] = None
+
+
+def get_article_text_cache() -> ArticleTextCache:
+    """Istanza condivisa della cache (creata al primo utilizzo)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ArticleTextCache()
+    return _default_cache
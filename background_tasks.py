@@ -0,0 +1,271 @@
+# background_tasks.py - Esecuzione in background per la GUI Tkinter (coda dei risultati svuotata con after)
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_POLL_MS = 50
+# Eventi consegnati per ogni giro di after: la finestra resta reattiva anche con molti eventi
+MAX_EVENTS_PER_POLL = 200
+
+STATUS_QUEUED = "in coda"
+STATUS_RUNNING = "in corso"
+STATUS_DONE = "completata"
+STATUS_CANCELLED = "annullata"
+STATUS_FAILED = "errore"
+FINAL_STATUSES = {STATUS_DONE, STATUS_CANCELLED, STATUS_FAILED}
+
+
+class TaskCancelled(Exception):
+    """Sollevata nel thread di lavoro quando l'attività è stata annullata dall'utente"""
+
+
+class _DaemonWorkerPool:
+    """
+    Pool di thread daemon: alla chiusura del programma un'attività ancora in corso
+    (es. una generazione d'immagine) non tiene aperto il processo, come farebbero i
+    thread di ThreadPoolExecutor che vengono attesi all'uscita dell'interprete.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{thread_name_prefix}_{index}", daemon=True)
+            for index in range(max(1, max_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, func = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, func: Callable[[], Any]) -> Future:
+        future: Future = Future()
+        self._jobs.put((future, func))
+        return future
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        """Non attende le attività in corso; con 'cancel_futures' quelle in coda non partiranno"""
+        if cancel_futures:
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[0].cancel()
+        for _ in self._threads:
+            self._jobs.put(None)
+
+
+class TaskHandle:
+    """
+    Lato worker di un'attività: 'report' invia avanzamenti alla GUI, 'check_cancelled'
+    interrompe il lavoro se l'utente ha annullato. Stato e avanzamento sono letti
+    dalla GUI (vengono aggiornati solo nel thread di Tk).
+    """
+
+    def __init__(self, runner: "BackgroundTaskRunner", task_id: int, name: str):
+        self._runner = runner
+        self.id = task_id
+        self.name = name
+        self.status = STATUS_QUEUED
+        self.progress = ""
+        self._cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            # Non ancora partita: non partirà più
+            self._runner._put(self, "cancelled", None)
+
+    def check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise TaskCancelled(f"Attività '{self.name}' annullata")
+
+    def report(self, *payload: Any) -> None:
+        """Avanzamento (thread-safe): arriva a 'on_progress' nel thread della GUI"""
+        self._runner._put(self, "progress", payload)
+
+    def set_status(self, text: str) -> None:
+        """Testo di avanzamento mostrato nell'elenco delle attività (thread-safe)"""
+        self._runner._put(self, "status", text)
+
+    def run_in_ui(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Esegue 'func' nel thread della GUI e ne attende il risultato (es. una messagebox)"""
+        return self._runner.call_in_ui(func, *args, **kwargs)
+
+
+class BackgroundTaskRunner:
+    """
+    Esegue le attività lente (download dei feed, generazione dei post) in un pool di
+    thread; i risultati passano da una coda thread-safe che la finestra svuota con
+    'after', così i widget vengono toccati solo dal thread di Tk e la GUI non si blocca.
+    """
+
+    def __init__(self, root, max_workers: int = DEFAULT_MAX_WORKERS, poll_ms: int = DEFAULT_POLL_MS,
+                 on_task_update: Optional[Callable[[TaskHandle], None]] = None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_task_update = on_task_update
+        self._executor = _DaemonWorkerPool(max_workers, thread_name_prefix="gui-task")
+        self._events: "queue.Queue" = queue.Queue()
+        self._callbacks: Dict[int, Dict[str, Optional[Callable]]] = {}
+        self._ids = itertools.count(1)
+        self.tasks: List[TaskHandle] = []
+        self._closed = False
+        self._after_id = self.root.after(self.poll_ms, self._drain)
+
+    def _put(self, handle: Optional[TaskHandle], kind: str, payload: Any) -> None:
+        self._events.put((handle, kind, payload))
+
+    def submit(self, name: str, func: Callable[..., Any], *args: Any,
+               on_progress: Optional[Callable] = None, on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None,
+               on_cancelled: Optional[Callable[[], None]] = None, **kwargs: Any) -> TaskHandle:
+        """
+        Avvia func(handle, *args, **kwargs) in background. Le callback sono chiamate nel
+        thread della GUI: on_progress(*payload) per ogni report, on_done(risultato) alla
+        fine, on_error(eccezione) in caso di errore, on_cancelled() se viene annullata.
+        """
+        handle = TaskHandle(self, next(self._ids), name)
+        self._callbacks[handle.id] = {"progress": on_progress, "done": on_done, "error": on_error,
+                                      "cancelled": on_cancelled}
+        self.tasks.append(handle)
+
+        def run():
+            if handle.cancelled:
+                return
+            self._put(handle, "started", None)
+            try:
+                result = func(handle, *args, **kwargs)
+            except TaskCancelled:
+                self._put(handle, "cancelled", None)
+            except Exception as e:
+                logging.error(f"Errore nell'attività '{name}': {e}")
+                self._put(handle, "error", e)
+            else:
+                self._put(handle, "cancelled" if handle.cancelled else "done", result)
+
+        handle.future = self._executor.submit(run)
+        self._notify(handle)
+        return handle
+
+    def post(self, func: Callable, *args: Any) -> None:
+        """Chiede l'esecuzione di func(*args) nel thread della GUI senza attendere (thread-safe)"""
+        self._put(None, "call", (func, args))
+
+    def call_in_ui(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Come 'post' ma attende il risultato; da usare solo dai thread di lavoro"""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args, **kwargs)
+        done = threading.Event()
+        box: Dict[str, Any] = {}
+
+        def call():
+            try:
+                box["result"] = func(*args, **kwargs)
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        self._put(None, "call", (call, ()))
+        while not done.wait(0.5):
+            if self._closed:
+                raise TaskCancelled("Finestra chiusa")
+        if "error" in box:
+            raise box["error"]
+        return box.get("result")
+
+    @property
+    def active_tasks(self) -> List[TaskHandle]:
+        return [task for task in self.tasks if task.status not in FINAL_STATUSES]
+
+    def cancel_all(self) -> None:
+        for task in self.active_tasks:
+            task.cancel()
+
+    def shutdown(self) -> None:
+        """Annulla le attività in corso e ferma il drenaggio (da chiamare alla chiusura della finestra)"""
+        self._closed = True
+        self.cancel_all()
+        try:
+            self.root.after_cancel(self._after_id)
+        except Exception:
+            pass
+        self._executor.shutdown(cancel_futures=True)
+
+    def _notify(self, handle: TaskHandle) -> None:
+        if self.on_task_update:
+            self.on_task_update(handle)
+
+    def _dispatch(self, handle: Optional[TaskHandle], kind: str, payload: Any) -> None:
+        if kind == "call":
+            func, args = payload
+            func(*args)
+            return
+        if handle.status in FINAL_STATUSES:
+            return
+        callbacks = self._callbacks.get(handle.id, {})
+        if kind == "started":
+            handle.status = STATUS_RUNNING
+        elif kind == "progress":
+            if handle.cancelled:
+                return
+            if callbacks.get("progress"):
+                callbacks["progress"](*payload)
+            return
+        elif kind == "status":
+            handle.progress = payload
+        elif kind == "done":
+            handle.status = STATUS_DONE
+            if callbacks.get("done"):
+                callbacks["done"](payload)
+        elif kind == "error":
+            handle.status = STATUS_FAILED
+            handle.progress = str(payload)
+            if callbacks.get("error"):
+                callbacks["error"](payload)
+        elif kind == "cancelled":
+            handle.status = STATUS_CANCELLED
+            if callbacks.get("cancelled"):
+                callbacks["cancelled"]()
+        if handle.status in FINAL_STATUSES:
+            # Le attività concluse non servono più al runner: l'elenco resta limitato a quelle attive
+            self._callbacks.pop(handle.id, None)
+            if handle in self.tasks:
+                self.tasks.remove(handle)
+        self._notify(handle)
+
+    def _drain(self) -> None:
+        for _ in range(MAX_EVENTS_PER_POLL):
+            try:
+                handle, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self._dispatch(handle, kind, payload)
+            except Exception as e:
+                # Un errore in una callback non deve fermare la consegna degli altri eventi
+                logging.error(f"Errore nella gestione di un evento in background: {e}")
+        if not self._closed:
+            self._after_id = self.root.after(self.poll_ms, self._drain)
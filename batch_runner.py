@@ -0,0 +1,221 @@
+# batch_runner.py - Generazione dei post tramite Message Batches (Anthropic) o Batch API (OpenAI)
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from api_clients import get_anthropic_client, get_openai_client
+from token_usage import record_usage
+
+DEFAULT_BATCH_STATE_PATH = os.path.join("cache", "batch_state.json")
+DEFAULT_POLL_INTERVAL = 60.0
+DEFAULT_MAX_WAIT_HOURS = 24.0
+ANTHROPIC_ENDED_STATUS = "ended"
+OPENAI_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchNotReady(Exception):
+    """Il batch non è terminato entro il tempo di attesa: verrà ripreso alla prossima esecuzione"""
+
+
+def load_batch_state(state_path: str = DEFAULT_BATCH_STATE_PATH) -> Optional[Dict[str, Any]]:
+    """Stato di un batch già inviato e non ancora concluso, o None"""
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.error(f"Stato batch illeggibile ({state_path}): {e}")
+        return None
+    return state if state.get("batch_id") else None
+
+
+class BatchRunner:
+    """
+    Invia i prompt di tutti gli articoli selezionati come un unico job batch
+    (prezzi e limiti del batch invece di quelli interattivi), salva l'id del job
+    su disco e ne attende il completamento. Se il processo si interrompe, la
+    successiva esecuzione riprende lo stesso batch invece di crearne uno nuovo;
+    i post già salvati sono annotati nello stato e non vengono rigenerati.
+    'system' (le linee guida fisse) è inviato come prefisso memorizzabile nella
+    cache dei prompt, condiviso da tutte le richieste del batch.
+    """
+
+    def __init__(self, provider: str, api_key: str, model: str, max_tokens: int,
+                 state_path: str = DEFAULT_BATCH_STATE_PATH,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 max_wait_hours: float = DEFAULT_MAX_WAIT_HOURS,
+                 system: Optional[str] = None):
+        if provider not in ("anthropic", "openai"):
+            raise ValueError(f"Provider batch non supportato: {provider}")
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.state_path = state_path
+        self.poll_interval = poll_interval
+        self.max_wait_seconds = max_wait_hours * 3600
+        self.system = system
+
+    # --- Stato persistente ---
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        """Scrittura atomica: un'interruzione non lascia mai un file a metà"""
+        directory = os.path.dirname(self.state_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self.state_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def clear_state(self) -> None:
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def mark_completed(self, state: Dict[str, Any], custom_id: str) -> None:
+        """Annota una richiesta conclusa (post salvato o fallita nel batch), così una ripresa non la rielabora"""
+        completed = state.setdefault("completed", [])
+        if custom_id not in completed:
+            completed.append(custom_id)
+            self.save_state(state)
+
+    # --- Invio ---
+
+    def submit(self, articles: List[Dict[str, Any]], prompts: List[str]) -> Dict[str, Any]:
+        """Crea il batch e ne salva lo stato prima di restituirlo"""
+        requests = [(f"post-{index}", prompt) for index, prompt in enumerate(prompts)]
+        if self.provider == "anthropic":
+            batch_id = self._submit_anthropic(requests)
+        else:
+            batch_id = self._submit_openai(requests)
+        state = {
+            "provider": self.provider,
+            "model": self.model,
+            "batch_id": batch_id,
+            "submitted_at": time.time(),
+            "articles": {custom_id: article for (custom_id, _), article in zip(requests, articles)},
+            "completed": [],
+        }
+        self.save_state(state)
+        logging.info(f"Batch {self.provider} inviato: {batch_id} ({len(requests)} richieste)")
+        return state
+
+    def _submit_anthropic(self, requests: List[Tuple[str, str]]) -> str:
+        client = get_anthropic_client(self.api_key)
+        params: Dict[str, Any] = {"model": self.model, "max_tokens": self.max_tokens}
+        if self.system:
+            params["system"] = [{"type": "text", "text": self.system, "cache_control": {"type": "ephemeral"}}]
+        batch = client.messages.batches.create(requests=[
+            {
+                "custom_id": custom_id,
+                "params": dict(params, messages=[{"role": "user", "content": prompt}]),
+            }
+            for custom_id, prompt in requests
+        ])
+        return batch.id
+
+    def _submit_openai(self, requests: List[Tuple[str, str]]) -> str:
+        client = get_openai_client(self.api_key)
+        system_messages = [{"role": "system", "content": self.system}] if self.system else []
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "messages": system_messages + [{"role": "user", "content": prompt}],
+                },
+            }, ensure_ascii=False)
+            for custom_id, prompt in requests
+        ]
+        payload = io.BytesIO("\n".join(lines).encode("utf-8"))
+        input_file = client.files.create(file=("batch_input.jsonl", payload), purpose="batch")
+        batch = client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                      completion_window="24h")
+        return batch.id
+
+    # --- Attesa e risultati ---
+
+    def _is_finished(self, batch_id: str) -> bool:
+        if self.provider == "anthropic":
+            batch = get_anthropic_client(self.api_key).messages.batches.retrieve(batch_id)
+            logging.info(f"Batch {batch_id}: {batch.processing_status} {batch.request_counts}")
+            return batch.processing_status == ANTHROPIC_ENDED_STATUS
+        batch = get_openai_client(self.api_key).batches.retrieve(batch_id)
+        logging.info(f"Batch {batch_id}: {batch.status} {batch.request_counts}")
+        return batch.status in OPENAI_FINAL_STATUSES
+
+    def wait(self, state: Dict[str, Any]) -> None:
+        """Interroga il batch fino al termine; BatchNotReady se supera l'attesa massima"""
+        deadline = time.monotonic() + self.max_wait_seconds
+        while not self._is_finished(state["batch_id"]):
+            if time.monotonic() + self.poll_interval > deadline:
+                raise BatchNotReady(f"Batch {state['batch_id']} non ancora completato")
+            time.sleep(self.poll_interval)
+
+    def _anthropic_results(self, batch_id: str) -> Iterator[Tuple[str, Optional[str]]]:
+        client = get_anthropic_client(self.api_key)
+        for entry in client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                record_usage("anthropic", self.model, entry.result.message.usage)
+                yield entry.custom_id, entry.result.message.content[0].text
+            else:
+                logging.error(f"Richiesta {entry.custom_id} del batch non riuscita: {entry.result.type}")
+                yield entry.custom_id, None
+
+    def _openai_file_entries(self, client, file_id: str) -> Iterator[Dict[str, Any]]:
+        for line in client.files.content(file_id).text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+    def _openai_results(self, batch_id: str) -> Iterator[Tuple[str, Optional[str]]]:
+        client = get_openai_client(self.api_key)
+        batch = client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            logging.error(f"Il batch {batch_id} è terminato con stato '{batch.status}'")
+        if batch.output_file_id:
+            for entry in self._openai_file_entries(client, batch.output_file_id):
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    record_usage("openai", self.model, response["body"].get("usage"))
+                    yield entry["custom_id"], response["body"]["choices"][0]["message"]["content"]
+                else:
+                    logging.error(f"Richiesta {entry.get('custom_id')} del batch non riuscita: {entry.get('error')}")
+                    yield entry.get("custom_id"), None
+        if batch.error_file_id:
+            # Le richieste fallite compaiono solo nel file degli errori
+            for entry in self._openai_file_entries(client, batch.error_file_id):
+                logging.error(f"Richiesta {entry.get('custom_id')} del batch non riuscita: "
+                              f"{entry.get('error') or (entry.get('response') or {}).get('body')}")
+                yield entry.get("custom_id"), None
+
+    def results(self, state: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+        """
+        (custom_id, articolo, testo) per le richieste non ancora salvate; testo None per
+        quelle fallite, comprese quelle senza alcun risultato (batch fallito, scaduto o
+        annullato), così possono essere segnate come concluse e il batch non viene
+        ripreso all'infinito.
+        """
+        completed = set(state.get("completed", []))
+        fetch = self._anthropic_results if self.provider == "anthropic" else self._openai_results
+        seen = set()
+        for custom_id, text in fetch(state["batch_id"]):
+            if custom_id in completed or custom_id in seen or custom_id not in state["articles"]:
+                continue
+            seen.add(custom_id)
+            yield custom_id, state["articles"][custom_id], text
+        for custom_id, article in state["articles"].items():
+            if custom_id not in completed and custom_id not in seen:
+                logging.error(f"Nessun risultato per la richiesta {custom_id} del batch {state['batch_id']}")
+                yield custom_id, article, None
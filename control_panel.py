@@ -2,12 +2,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
-import sys
 import os
 import subprocess
 import threading
 from datetime import datetime
 
+from log_tail import LEVELS, LogBuffer, LogTailer, latest_log_file
+from process_runner import ProcessRunner, RunAlreadyActive, automation_command, format_progress
+from run_window import open_run_window
+from scheduler_daemon import (daemon_status, is_daemon_running, next_slot, parse_execution_times,
+                              request_run_now, request_stop, start_daemon_process)
+
+# Righe di log tenute in memoria e mostrate; intervallo di aggiornamento dell'area log
+LOG_MAX_LINES = 5000
+LOG_POLL_MS = 500
+SCHEDULER_POLL_MS = 5000
+
 
 class AIContentControlPanel:
     def __init__(self):
@@ -111,6 +121,22 @@ class AIContentControlPanel:
                                       bg="red", fg="white", font=("Arial", 10, "bold"))
         self.toggle_button.pack(side="right")
         
+        # Frame scheduler integrato
+        scheduler_frame = ttk.LabelFrame(main_frame, text="Scheduler Integrato", padding=15)
+        scheduler_frame.pack(fill="x", padx=20, pady=10)
+        
+        self.scheduler_label = tk.Label(scheduler_frame, text="🔄 Caricamento...", 
+                                        font=("Arial", 10), justify="left", anchor="w")
+        self.scheduler_label.pack(side="left", fill="x", expand=True)
+        
+        tk.Button(scheduler_frame, text="⚡ Esegui Ora", command=self.scheduler_run_now,
+                  bg="orange", fg="white", font=("Arial", 9, "bold")).pack(side="right", padx=2)
+        self.scheduler_button = tk.Button(scheduler_frame, text="▶️ Avvia", command=self.toggle_scheduler,
+                                          bg="green", fg="white", font=("Arial", 9, "bold"))
+        self.scheduler_button.pack(side="right", padx=2)
+        
+        self.root.after(SCHEDULER_POLL_MS, self.poll_scheduler_status)
+        
         # Informazioni configurazione
         info_frame = ttk.LabelFrame(main_frame, text="Configurazione Attuale", padding=15)
         info_frame.pack(fill="x", padx=20, pady=10)
@@ -296,6 +322,19 @@ class AIContentControlPanel:
                                     bg="red", fg="white", font=("Arial", 10, "bold"))
         clear_log_button.pack(side="left", padx=5)
         
+        # Filtri: lavorano sulle righe già in memoria, senza rileggere il file
+        tk.Label(log_buttons, text="Livello:").pack(side="left", padx=(15, 2))
+        self.log_level_var = tk.StringVar(value="TUTTI")
+        level_combo = ttk.Combobox(log_buttons, textvariable=self.log_level_var, width=9, state="readonly",
+                                   values=("TUTTI",) + LEVELS)
+        level_combo.pack(side="left")
+        level_combo.bind("<<ComboboxSelected>>", lambda event: self.render_log())
+        
+        tk.Label(log_buttons, text="Cerca:").pack(side="left", padx=(10, 2))
+        self.log_filter_var = tk.StringVar()
+        self.log_filter_var.trace_add("write", lambda *args: self.render_log())
+        tk.Entry(log_buttons, textvariable=self.log_filter_var, width=20).pack(side="left")
+        
         # Area log
         log_container = ttk.LabelFrame(log_frame, text="Log Recenti", padding=15)
         log_container.pack(fill="both", expand=True, padx=20, pady=10)
@@ -304,8 +343,12 @@ class AIContentControlPanel:
                                                  bg="black", fg="white")
         self.log_text.pack(fill="both", expand=True)
         
-        # Carica log iniziale
+        # Il log viene seguito in background: solo i byte nuovi vengono letti e le
+        # righe mostrate restano limitate a LOG_MAX_LINES
+        self.log_buffer = LogBuffer(LOG_MAX_LINES)
+        self.log_tailer = None
         self.refresh_log()
+        self.root.after(LOG_POLL_MS, self.poll_log)
     
     def create_status_bar(self):
         """Crea barra di stato"""
@@ -341,6 +384,7 @@ class AIContentControlPanel:
         
         # Aggiorna info configurazione
         self.update_info_display()
+        self.update_scheduler_status()
         
         # Aggiorna status bar
         self.status_bar.config(text=f"Aggiornato: {datetime.now().strftime('%H:%M:%S')}")
@@ -354,11 +398,68 @@ class AIContentControlPanel:
 📰 Fonti RSS: {len(self.config['ai_sources']['rss_feeds'])}
 🔄 Status: {'Attiva' if self.config['schedule'].get('enabled', True) else 'Disattiva'}
 
-🎯 Prossima Esecuzione: Domani alle {self.config['schedule']['execution_time']}
+🎯 Prossima Esecuzione: {self.next_run_text()}
 📁 Cartella Post: generated_posts/
 """
         self.info_text.insert(1.0, info)
     
+    def next_run_text(self):
+        if not self.config['schedule'].get('enabled', True):
+            return "automazione disattiva"
+        upcoming = next_slot(datetime.now(), parse_execution_times(self.config['schedule']['execution_time']))
+        if upcoming is None:
+            return "orario non valido"
+        day = "Oggi" if upcoming.date() == datetime.now().date() else "Domani"
+        return f"{day} alle {upcoming.strftime('%H:%M')}"
+    
+    def update_scheduler_status(self):
+        """Aggiorna lo stato dello scheduler dal suo file di stato"""
+        status = daemon_status()
+        if not status["running"]:
+            text = "⚪ Scheduler non attivo (esecuzione affidata all'Utilità di pianificazione)"
+            self.scheduler_button.config(text="▶️ Avvia", bg="green")
+        else:
+            text = f"🟢 Scheduler attivo (PID {status.get('pid', '?')})"
+            if status.get("current_run"):
+                text += f" - in esecuzione: {status['current_run'].get('reason', '')}"
+            elif status.get("next_run"):
+                text += f" - prossima: {datetime.fromisoformat(status['next_run']).strftime('%d/%m %H:%M')}"
+            self.scheduler_button.config(text="⏹️ Ferma", bg="red")
+        last_run = status.get("last_run")
+        if last_run:
+            last_time = datetime.fromisoformat(last_run['started_at']).strftime('%d/%m %H:%M')
+            outcome = f"errore: {last_run['error']}" if last_run.get("error") else f"{last_run.get('posts', 0)} post"
+            text += f"\nUltima esecuzione: {last_time} ({outcome})"
+        self.scheduler_label.config(text=text)
+    
+    def poll_scheduler_status(self):
+        try:
+            self.update_scheduler_status()
+        finally:
+            self.root.after(SCHEDULER_POLL_MS, self.poll_scheduler_status)
+    
+    def toggle_scheduler(self):
+        """Avvia o ferma lo scheduler residente"""
+        try:
+            if is_daemon_running():
+                request_stop()
+                self.status_bar.config(text="Arresto scheduler richiesto (dopo l'eventuale esecuzione in corso)")
+            else:
+                start_daemon_process(os.path.dirname(os.path.abspath(__file__)))
+                self.status_bar.config(text="Scheduler avviato")
+        except Exception as e:
+            messagebox.showerror("Errore", f"Impossibile controllare lo scheduler: {e}")
+        self.root.after(1000, self.update_scheduler_status)
+    
+    def scheduler_run_now(self):
+        """Chiede allo scheduler un'esecuzione immediata"""
+        if not is_daemon_running():
+            messagebox.showwarning("Scheduler", "Lo scheduler non è attivo.\n\n"
+                                   "Avvialo oppure usa 'Test Manuale'.")
+            return
+        request_run_now()
+        self.status_bar.config(text="Esecuzione immediata richiesta allo scheduler")
+    
     def refresh_rss_list(self):
         """Aggiorna lista RSS"""
         self.rss_listbox.delete(0, tk.END)
@@ -534,37 +635,37 @@ class AIContentControlPanel:
                                     "Questo genererà post reali con le impostazioni attuali.")
         
         if result:
-            def test_worker():
-                try:
-                    self.root.after(0, lambda: self.status_bar.config(text="Test in esecuzione..."))
-                    
-                    venv_python = os.path.join(os.getcwd(), 'venv', 'Scripts', 'python.exe')
-
-                    if os.path.exists(venv_python):
-                        result = subprocess.run([venv_python, "daily_ai_automation.py"],
-                                                cwd=os.getcwd(),
-                                                timeout=300)
-                    else:
-                        result = subprocess.run([sys.executable, "daily_ai_automation.py"],
-                                                cwd=os.getcwd(),
-                                                timeout=300)
-
-                    if result.returncode == 0:
-                        self.root.after(0, lambda: messagebox.showinfo("Test Completato", 
-                                                                      "✅ Test completato con successo!\n\n"
-                                                                      "Controlla la cartella generated_posts per i risultati."))
-                    else:
-                        self.root.after(0, lambda: messagebox.showerror("Test Fallito", 
-                                                                        f"❌ Test fallito:\n\n{result.stderr}"))
-                    
-                except Exception as error:
-                    error_msg = str(error)
-                    self.root.after(0, lambda: messagebox.showerror("Errore Test", f"Errore durante il test: {error_msg}"))
-
-                finally:
-                    self.root.after(0, lambda: self.status_bar.config(text="Test completato"))
+            runner = ProcessRunner(automation_command())
+            try:
+                runner.start()
+            except RunAlreadyActive as e:
+                messagebox.showwarning("Test Manuale", f"{e}.\n\nAttendi che finisca prima di avviarne un altro.")
+                return
+            except OSError as e:
+                messagebox.showerror("Errore Test", f"Errore durante il test: {e}")
+                return
             
-            threading.Thread(target=test_worker, daemon=True).start()
+            self.status_bar.config(text="Test in esecuzione...")
+            
+            def on_progress(event):
+                self.status_bar.config(text=f"Test: {format_progress(event)}")
+            
+            def on_finished(returncode, cancelled):
+                if cancelled:
+                    self.status_bar.config(text="Test annullato")
+                elif returncode == 0:
+                    self.status_bar.config(text="Test completato")
+                    messagebox.showinfo("Test Completato", 
+                                        "✅ Test completato con successo!\n\n"
+                                        "Controlla la cartella generated_posts per i risultati.")
+                else:
+                    self.status_bar.config(text="Test fallito")
+                    messagebox.showerror("Test Fallito", 
+                                         f"❌ Test fallito (codice {returncode}).\n\n"
+                                         "Controlla l'output del test o il log per i dettagli.")
+            
+            open_run_window(self.root, "Test Manuale - Output", runner,
+                            on_progress=on_progress, on_finished=on_finished)
     
     def show_latest_log(self):
         """Mostra log più recente"""
@@ -572,38 +673,67 @@ class AIContentControlPanel:
         self.refresh_log()
     
     def refresh_log(self):
-        """Aggiorna contenuto log"""
+        """Riparte dalla coda del file log più recente"""
+        if self.log_tailer is not None:
+            self.log_tailer.stop()
+        self.log_buffer.clear()
         self.log_text.delete(1.0, tk.END)
         
-        # Cerca file log più recente
         log_dir = "logs"
-        if os.path.exists(log_dir):
-            log_files = [f for f in os.listdir(log_dir) if f.endswith(".log")]
-            
-            if log_files:
-                latest_log = max(log_files, key=lambda f: os.path.getmtime(os.path.join(log_dir, f)))
-                log_path = os.path.join(log_dir, latest_log)
-                
-                try:
-                    with open(log_path, 'r', encoding='utf-8') as f:
-                        log_content = f.read()
-                        self.log_text.insert(1.0, log_content)
-                        self.log_text.see(tk.END)  # Scroll to bottom
-                        
-                except Exception as e:
-                    self.log_text.insert(1.0, f"Errore lettura log: {e}")
-            else:
-                self.log_text.insert(1.0, "Nessun file log trovato")
-        else:
+        if not os.path.exists(log_dir):
             self.log_text.insert(1.0, "Cartella logs non trovata")
+        elif latest_log_file(log_dir) is None:
+            self.log_text.insert(1.0, "Nessun file log trovato")
+        
+        # Il tailer aspetta anche la comparsa della cartella o del primo file
+        self.log_tailer = LogTailer(log_dir)
+        self.log_tailer.start()
+    
+    def log_filters(self):
+        level = self.log_level_var.get()
+        return (None if level == "TUTTI" else level), self.log_filter_var.get().strip()
+    
+    def render_log(self):
+        """Ridisegna l'area log dalle righe in memoria applicando i filtri"""
+        min_level, substring = self.log_filters()
+        self.log_text.delete(1.0, tk.END)
+        lines = [text for _, text in self.log_buffer.filtered(min_level, substring)]
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        self.log_text.see(tk.END)
+    
+    def poll_log(self):
+        """Aggiunge all'area log le righe nuove arrivate dal tailer"""
+        try:
+            if self.log_tailer is not None:
+                new_lines = self.log_tailer.drain(LOG_MAX_LINES)
+                if new_lines:
+                    min_level, substring = self.log_filters()
+                    visible = []
+                    for text in new_lines:
+                        entry = self.log_buffer.append(text)
+                        if LogBuffer.matches(entry, min_level, substring):
+                            visible.append(text)
+                    if visible:
+                        at_bottom = self.log_text.yview()[1] >= 0.999
+                        self.log_text.insert(tk.END, "\n".join(visible) + "\n")
+                        # Buffer circolare anche nel widget: si tolgono le righe più vecchie
+                        line_count = int(self.log_text.index("end-1c").split(".")[0])
+                        if line_count > LOG_MAX_LINES:
+                            self.log_text.delete(1.0, f"{line_count - LOG_MAX_LINES + 1}.0")
+                        if at_bottom:
+                            self.log_text.see(tk.END)
+        finally:
+            self.root.after(LOG_POLL_MS, self.poll_log)
     
     def clear_log(self):
         """Pulisce area log"""
         result = messagebox.askyesno("Conferma", "Vuoi pulire la visualizzazione del log?")
         
         if result:
+            # Le righe nuove continueranno ad arrivare
+            self.log_buffer.clear()
             self.log_text.delete(1.0, tk.END)
-            self.log_text.insert(1.0, "Log pulito - usa 'Aggiorna Log' per ricaricare")
     
     def open_posts_folder(self):
         """Apre cartella post generati"""
@@ -618,8 +748,15 @@ class AIContentControlPanel:
             messagebox.showwarning("Attenzione", "Cartella post non trovata!\n\n"
                                   "Esegui prima un test per generare dei post.")
     
+    def on_close(self):
+        """Ferma la lettura del log e chiude la finestra"""
+        if self.log_tailer is not None:
+            self.log_tailer.stop()
+        self.root.destroy()
+    
     def run(self):
         """Avvia l'applicazione"""
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.root.mainloop()
 
 if __name__ == "__main__":
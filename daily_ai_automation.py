@@ -1,9 +1,9 @@
 # daily_ai_automation.py - Enhanced with advanced sources (Clean version)
-import feedparser
 import json
 import requests
 from datetime import datetime  # Rimosso timedelta non usato
 import os
+import sys
 import logging
 from typing import List, Dict, Any
 # Rimosso time e re non usati
@@ -16,24 +16,34 @@ from PIL import Image, ImageDraw, ImageFont
 import textwrap
 import uuid
 import base64
-import openai
+import numpy as np
+from api_clients import get_anthropic_client, get_gemini_client, get_openai_client, get_pool_stats
+from article_scoring import rank_by_score, score_articles_batch
+from batch_runner import (DEFAULT_BATCH_STATE_PATH, DEFAULT_MAX_WAIT_HOURS, DEFAULT_POLL_INTERVAL,
+                          BatchNotReady, BatchRunner, load_batch_state)
+from feed_fetcher import FeedFetcher
+from image_cache import configure_image_cache, get_image_cache
+from job_scheduler import PostJobScheduler, get_rate_limiter
+from keyword_matcher import KeywordMatcher
+from near_duplicates import collapse_near_duplicates
+from post_pipeline import PostPipeline
+from process_runner import RUN_ALREADY_ACTIVE_EXIT_CODE, RunAlreadyActive, RunLock, emit_progress
+from processed_store import DEFAULT_PROCESSED_DB, DEFAULT_RETENTION_DAYS, ProcessedArticleStore
+from provider_router import ProviderRouter
+from response_cache import ResponseCacheMiss, configure_response_cache, get_response_cache
+from token_usage import get_token_usage, record_usage
+from top_k_selector import TopKSelector
+from url_utils import normalize_title
 
 load_dotenv()
 
-def generate_post_with_ai(article_data):
-    """Genera post LinkedIn usando AI"""
-    try:
-        logging.info(f"Generazione post per: {article_data.get('title', 'Articolo senza titolo')}")
-        
-        # Prepara il prompt per l'AI
-        prompt = f"""
-Crea un post LinkedIn professionale e coinvolgente basato su questo articolo AI:
-
-Titolo: {article_data.get('title', '')}
-Riassunto: {article_data.get('summary', '')}
-Link: {article_data.get('link', '')}
+CLAUDE_TEXT_MODEL = "claude-3-sonnet-20240229"
+OPENAI_TEXT_MODEL = "gpt-4"
+TEXT_MAX_TOKENS = 1000
 
-# Regole per la Creazione di Post LinkedIn Autentici sull'IA
+# Linee guida fisse, uguali per ogni articolo: vanno nel prompt di sistema, così il provider
+# le tiene nella sua cache dei prompt e le richieste successive pagano solo la parte variabile
+POST_GUIDELINES = """# Regole per la Creazione di Post LinkedIn Autentici sull'IA
 
 Lunghezza post: 500-600 parole, 10 hashtag
 
@@ -166,9 +176,29 @@ Creare contenuti che:
 - **Toccare emozioni reali** - preoccupazioni, speranze, frustrazioni che tutti provano
 - **Evitare pose da esperto** - mantenere il punto di vista della persona comune che riflette
 """
+
+def build_post_prompt(article_data):
+    """Parte variabile del prompt (usata sia in modalità diretta che batch, con POST_GUIDELINES come sistema)"""
+    return f"""
+Crea un post LinkedIn professionale e coinvolgente basato su questo articolo AI,
+seguendo le regole per i post LinkedIn autentici sull'IA:
+
+Titolo: {article_data.get('title', '')}
+Riassunto: {article_data.get('summary', '')}
+Link: {article_data.get('link', '')}
+"""
+
+def generate_post_with_ai(article_data, interactive=False, regenerate=False):
+    """Genera post LinkedIn usando AI ('regenerate': nuova risposta anche se ce n'è una in cache)"""
+    try:
+        logging.info(f"Generazione post per: {article_data.get('title', 'Articolo senza titolo')}")
+        
+        # Prepara il prompt per l'AI
+        prompt = build_post_prompt(article_data)
         
         # Simulazione generazione AI (da sostituire con vera API)
-        ai_response = generate_ai_content(prompt)
+        ai_response = generate_ai_content(prompt, interactive=interactive, system=POST_GUIDELINES,
+                                          regenerate=regenerate)
         
         if ai_response:
             logging.info("Post generato con successo")
@@ -177,63 +207,129 @@ Creare contenuti che:
             logging.error("Errore nella generazione del post")
             return None
             
+    except ResponseCacheMiss as e:
+        # In replay il post non va sostituito con un template: l'articolo resta da generare
+        logging.error(f"Post non generato: {e}")
+        return None
     except Exception as e:
         logging.error(f"Errore nella generazione post: {e}")
         return None
 
-def generate_ai_content(prompt):
-    """Genera contenuto usando API AI (Claude/OpenAI)"""
+_text_router = ProviderRouter()
+
+def generate_ai_content(prompt, interactive=False, system=None, regenerate=False):
+    """
+    Genera contenuto usando API AI (Claude/OpenAI).
+    Il router sceglie il provider sano più veloce e salta subito quelli con il circuito aperto;
+    con 'interactive' usa richieste hedged per ridurre l'attesa.
+    'system' è la parte fissa del prompt, inviata come prefisso memorizzabile nella cache del provider.
+    Solo 'regenerate' (rigenerazione chiesta esplicitamente) ignora la risposta in cache.
+    In replay una risposta mancante solleva ResponseCacheMiss invece di diventare un template.
+    """
     try:
-        # Prova prima con Claude
+        # Ordine di preferenza in assenza di statistiche: Claude, poi OpenAI
+        providers = []
         claude_key = os.getenv('CLAUDE_API_KEY')
         if claude_key:
-            return generate_with_claude(prompt, claude_key)
+            providers.append(("claude", lambda text: generate_with_claude(text, claude_key, system, refresh=regenerate)))
         
-        # Fallback su OpenAI
         openai_key = os.getenv('OPENAI_API_KEY')
         if openai_key:
-            return generate_with_openai(prompt, openai_key)
-        
-        # Fallback su contenuto template
-        logging.warning("Nessuna API key trovata, usando template")
+            providers.append(("openai", lambda text: generate_with_openai(text, openai_key, system, refresh=regenerate)))
+        
+        if providers and get_response_cache().mode == "replay":
+            # Nessuna chiamata alle API: vale la prima risposta salvata, nell'ordine di preferenza
+            miss = None
+            for _, generate in providers:
+                try:
+                    return generate(prompt)
+                except ResponseCacheMiss as e:
+                    miss = e
+            raise miss
+        if providers:
+            ai_response = _text_router.generate(prompt, providers, hedge=interactive)
+            logging.info(f"Statistiche provider di testo: {_text_router.stats()}")
+            if ai_response:
+                return ai_response
+            logging.warning("Nessun provider ha generato il contenuto, usando template")
+        else:
+            # Fallback su contenuto template
+            logging.warning("Nessuna API key trovata, usando template")
         return generate_template_content(prompt)
         
+    except ResponseCacheMiss:
+        raise
     except Exception as e:
         logging.error(f"Errore generazione AI: {e}")
         return generate_template_content(prompt)
 
-def generate_with_claude(prompt, api_key):
-    """Genera contenuto con Claude"""
+def anthropic_system_blocks(system):
+    """Prompt di sistema come blocco con cache_control: il prefisso fisso viene letto dalla cache del provider"""
+    if not system:
+        return None
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+def openai_messages(prompt, system=None):
+    """Messaggi OpenAI con la parte fissa per prima (la cache automatica dei prompt lavora sui prefissi)"""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def generate_with_claude(prompt, api_key, system=None, refresh=False):
+    """Genera contenuto con Claude ('refresh': ignora la risposta in cache e la sostituisce)"""
     try:
-        import anthropic
-        
-        client = anthropic.Anthropic(api_key=api_key)
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        return response.content[0].text
-        
+        model = CLAUDE_TEXT_MODEL
+        messages = [{"role": "user", "content": prompt}]
+        system_blocks = anthropic_system_blocks(system)
+        
+        def call_api():
+            # Client riusato tra le chiamate; i nuovi tentativi (429 / Retry-After)
+            # sono gestiti dal limitatore condiviso
+            client = get_anthropic_client(api_key)
+            extra = {"system": system_blocks} if system_blocks else {}
+            response = get_rate_limiter("text").call(
+                client.messages.create,
+                model=model,
+                max_tokens=TEXT_MAX_TOKENS,
+                messages=messages,
+                **extra
+            )
+            record_usage("anthropic", model, response.usage)
+            return response.content[0].text
+        
+        # Una riesecuzione con lo stesso prompt riusa la risposta già pagata
+        params = {"max_tokens": TEXT_MAX_TOKENS, "system": system}
+        return get_response_cache().get_or_generate("anthropic", model, messages, params, call_api, refresh=refresh)
+        
+    except ResponseCacheMiss:
+        # Non è un errore del provider: in replay la risposta deve venire dalla cache
+        raise
     except Exception as e:
         logging.error(f"Errore Claude API: {e}")
         return None
 
-def generate_with_openai(prompt, api_key):
-    """Genera contenuto con OpenAI"""
+def generate_with_openai(prompt, api_key, system=None, refresh=False):
+    """Genera contenuto con OpenAI ('refresh': ignora la risposta in cache e la sostituisce)"""
     try:
-        import openai
-        
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=1000
-        )
-        
-        return response.choices[0].message.content
-        
+        model = OPENAI_TEXT_MODEL
+        messages = openai_messages(prompt, system)
+        
+        def call_api():
+            client = get_openai_client(api_key)
+            response = get_rate_limiter("text").call(
+                client.chat.completions.create,
+                model=model,
+                messages=messages,
+                max_tokens=TEXT_MAX_TOKENS
+            )
+            record_usage("openai", model, response.usage)
+            return response.choices[0].message.content
+        
+        return get_response_cache().get_or_generate("openai", model, messages, {"max_tokens": TEXT_MAX_TOKENS}, call_api,
+                                                    refresh=refresh)
+        
+    except ResponseCacheMiss:
+        raise
     except Exception as e:
         logging.error(f"Errore OpenAI API: {e}")
         return None
@@ -287,6 +383,10 @@ Style: Professional, tech-focused, modern graphics, suitable for LinkedIn busine
         # Nome file temporaneo
         temp_filename = f"temp_ai_image_{uuid.uuid4().hex[:8]}.png"
         
+        # Il modello del prompt è fisso: la chiave della cache è il soggetto dell'immagine
+        image_subject = f"{title}\n{summary[:200]}"
+        image_cache = get_image_cache()
+        
         success = False
         
         if provider.lower() == "google":
@@ -295,16 +395,24 @@ Style: Professional, tech-focused, modern graphics, suitable for LinkedIn busine
             if not google_key:
                 logging.warning("API key Google non trovata, provo con OpenAI")
                 provider = "openai"
+            elif image_cache.restore(image_subject, "google", temp_filename):
+                return temp_filename
             else:
                 success = generate_post_image_google(image_prompt, temp_filename, google_key)
+                if success:
+                    image_cache.store_file(image_subject, "google", temp_filename)
         
         if provider.lower() == "openai" and not success:
             # Usa OpenAI (fallback o scelta primaria)
+            if image_cache.restore(image_subject, "openai", temp_filename):
+                return temp_filename
             openai_key = os.getenv('OPENAI_API_KEY')
             if not openai_key:
                 logging.warning("API key OpenAI non trovata, uso immagine template")
                 return create_template_image(article_data, post_content)
             success = generate_post_image_ai(image_prompt, temp_filename, openai_key)
+            if success:
+                image_cache.store_file(image_subject, "openai", temp_filename)
         
         if success and os.path.exists(temp_filename):
             logging.info(f"Immagine AI generata con {provider.upper()}: {temp_filename}")
@@ -324,17 +432,12 @@ def generate_post_image_google(image_generation_prompt, output_filepath, api_key
     logging.info(f"Richiesta generazione immagine Google AI: '{image_generation_prompt[:100]}...'")
     
     try:
-        from google import genai
-        from google.genai import types
-        from PIL import Image
-        from io import BytesIO
-        
-        # Configura il client Google Gemini
-        genai.configure(api_key=api_key)
-        client = genai.Client()
+        # Client Google Gemini condiviso (creato una volta per processo)
+        client = get_gemini_client(api_key)
         
         # Genera l'immagine usando Gemini
-        response = client.models.generate_content(
+        response = get_rate_limiter("image").call(
+            client.models.generate_content,
             model="gemini-2.5-flash-image-preview",
             contents=[image_generation_prompt],
         )
@@ -381,10 +484,11 @@ def generate_post_image_ai(image_generation_prompt, output_filepath, api_key):
     logging.info(f"Richiesta generazione immagine AI: '{image_generation_prompt[:100]}...'")
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = get_openai_client(api_key)
 
         # Usa la nuova API OpenAI come nel file originale
-        response = client.responses.create(
+        response = get_rate_limiter("image").call(
+            client.responses.create,
             model="gpt-4o-mini",
             input=image_generation_prompt,
             tools=[
@@ -526,8 +630,8 @@ def save_post_to_docx(post_content, article_data, image_path=None):
             doc.add_heading('Immagine:', 2)
             doc.add_picture(image_path, width=Inches(6))
         
-        # Salva documento
-        timestamp = today.strftime('%H%M%S')
+        # Salva documento (suffisso univoco: più post possono essere salvati nello stesso secondo)
+        timestamp = f"{today.strftime('%H%M%S')}_{uuid.uuid4().hex[:6]}"
         filename = f"post_{timestamp}.docx"
         filepath = os.path.join(date_folder, filename)
         
@@ -549,15 +653,147 @@ def save_post_to_docx(post_content, article_data, image_path=None):
         logging.error(f"Errore salvataggio post: {e}")
         return None
 
-def main():
-    """Funzione principale dell'automazione"""
+def generate_and_save_post(article, index, post_content=None):
+    """
+    Genera testo e immagine di un post e lo salva; restituisce il percorso del file o None.
+    Con 'post_content' (es. risultato di un batch) il testo non viene rigenerato.
+    """
+    logging.info(f"Generazione post {index}: {article.get('title', 'N/A')}")
+    
+    # L'immagine dipende solo da titolo e riassunto: parte subito, in parallelo al testo.
+    # Il documento viene scritto appena testo e immagine sono entrambi pronti.
+    pipeline = PostPipeline(
+        generate_image=lambda article_data: create_post_image(article_data, None),
+        write_document=lambda post_content, image_path: save_post_to_docx(post_content, article, image_path),
+        document_needs_image=True,
+        name=f"post-{index}",
+    )
+    pipeline.submit_image_request(article)
+    
+    # Genera contenuto post
+    if post_content is None:
+        post_content = generate_post_with_ai(article)
+    if post_content:
+        pipeline.submit_post_text(post_content)
+    
+    saved_path, image_path = pipeline.join()
+    if not post_content:
+        logging.error(f"Errore generazione contenuto post {index}")
+        # Il post non verrà salvato: rimuove l'immagine temporanea già generata
+        if image_path and os.path.exists(image_path):
+            os.remove(image_path)
+        return None
+    if not saved_path:
+        logging.error(f"Errore salvataggio post {index}")
+    return saved_path
+
+def create_batch_runner(settings, provider):
+    """BatchRunner per il provider indicato, o None se manca la sua API key"""
+    api_keys = {"anthropic": os.getenv('CLAUDE_API_KEY'), "openai": os.getenv('OPENAI_API_KEY')}
+    models = {"anthropic": CLAUDE_TEXT_MODEL, "openai": OPENAI_TEXT_MODEL}
+    if not api_keys.get(provider):
+        return None
+    return BatchRunner(
+        provider, api_keys[provider], models[provider], TEXT_MAX_TOKENS, system=POST_GUIDELINES,
+        state_path=settings.get("state_path", DEFAULT_BATCH_STATE_PATH),
+        poll_interval=settings.get("poll_interval_seconds", DEFAULT_POLL_INTERVAL),
+        max_wait_hours=settings.get("max_wait_hours", DEFAULT_MAX_WAIT_HOURS),
+    )
+
+def run_batch_generation(collector):
+    """
+    Modalità batch: invia i prompt di tutti gli articoli selezionati come un unico job
+    (Message Batches di Anthropic o Batch API di OpenAI), attende il risultato e poi
+    genera immagini e DOCX. Un batch rimasto in sospeso viene ripreso invece di crearne un altro.
+    """
+    settings = collector.config.get("batch", {})
+    state = load_batch_state(settings.get("state_path", DEFAULT_BATCH_STATE_PATH))
+    if state:
+        provider = state["provider"]
+        logging.info(f"Ripresa del batch {state['batch_id']} ({provider}) inviato in precedenza")
+    else:
+        provider = settings.get("provider", "auto")
+        if provider == "auto":
+            provider = "anthropic" if os.getenv('CLAUDE_API_KEY') else "openai"
+    
+    runner = create_batch_runner(settings, provider)
+    if runner is None:
+        logging.error(f"API key mancante per il provider batch '{provider}'")
+        return []
+    
+    if state is None:
+        articles = collector.collect_all_articles()
+        if not articles:
+            logging.warning("Nessun articolo raccolto")
+            return []
+        selected_articles = collector.select_top_articles(articles)
+        if not selected_articles:
+            return []
+        state = runner.submit(selected_articles, [build_post_prompt(article) for article in selected_articles])
+    
+    emit_progress("attesa batch", total=len(state["articles"]))
+    try:
+        runner.wait(state)
+    except BatchNotReady as e:
+        logging.warning(f"{e}: verrà ripreso alla prossima esecuzione con --batch")
+        return []
+    
+    # Immagini e DOCX vengono prodotti in parallelo appena i testi sono disponibili
+    generated_posts = []
+    total = len(state["articles"])
+    finished = 0
+    with PostJobScheduler.from_config(collector.config) as scheduler:
+        for index, (custom_id, article, post_content) in enumerate(runner.results(state), 1):
+            if post_content:
+                scheduler.submit(custom_id, generate_and_save_post, article, index, post_content)
+            else:
+                # La richiesta è fallita nel batch: una ripresa non potrebbe recuperarla
+                runner.mark_completed(state, custom_id)
+        
+        for custom_id, saved_path, error in scheduler.iter_completed():
+            finished += 1
+            emit_progress("generazione", finished, total)
+            if error is not None:
+                logging.error(f"Errore nel job del post {custom_id}: {error}")
+            elif saved_path:
+                generated_posts.append(saved_path)
+                collector.mark_as_processed(state["articles"][custom_id])
+                runner.mark_completed(state, custom_id)
+                logging.info(f"Post {custom_id} completato: {saved_path}")
+    
+    if set(state.get("completed", [])) >= set(state["articles"]):
+        runner.clear_state()
+    else:
+        logging.warning("Alcuni post del batch non sono stati salvati: verranno ritentati alla prossima esecuzione con --batch")
+    return generated_posts
+
+def main(batch=False, raise_errors=False, configure_caches=True):
+    """
+    Funzione principale dell'automazione.
+    Lo scheduler residente la chiama con 'raise_errors' (per registrare l'errore dell'esecuzione)
+    e senza riconfigurare le cache, che tiene già aperte tra un'esecuzione e l'altra.
+    """
     try:
         logging.info("=== Avvio Automazione AI Enhanced ===")
+        # Il riepilogo dei token riguarda solo questa esecuzione (il processo può restare attivo)
+        get_token_usage().reset()
         
         # Inizializza collector enhanced
         collector = EnhancedArticleCollector()
+        if configure_caches:
+            configure_response_cache(collector.config.get("llm_cache", {}))
+            configure_image_cache(collector.config.get("image_cache", {}))
+        
+        if batch:
+            generated_posts = run_batch_generation(collector)
+            logging.info(f"Automazione batch completata. Generati {len(generated_posts)} post")
+            get_token_usage().log_summary()
+            for post_path in generated_posts:
+                logging.info(f"  - {post_path}")
+            return generated_posts
         
         # Raccoglie articoli da tutte le fonti
+        emit_progress("raccolta")
         articles = collector.collect_all_articles()
         
         if not articles:
@@ -565,33 +801,32 @@ def main():
             return
         
         # Seleziona i migliori articoli
+        emit_progress("selezione", articles=len(articles))
         selected_articles = collector.select_top_articles(articles)
+        emit_progress("generazione", 0, len(selected_articles))
         
-        # Genera post per ogni articolo selezionato
+        # Genera i post di tutti gli articoli selezionati in parallelo (entro i limiti delle API):
+        # ogni post viene salvato e registrato appena completato
         generated_posts = []
-        for i, article in enumerate(selected_articles, 1):
-            logging.info(f"Generazione post {i}/{len(selected_articles)}")
-            
-            # Genera contenuto post
-            post_content = generate_post_with_ai(article)
+        with PostJobScheduler.from_config(collector.config) as scheduler:
+            for i, article in enumerate(selected_articles, 1):
+                scheduler.submit(i, generate_and_save_post, article, i)
             
-            if post_content:
-                # Crea immagine
-                image_path = create_post_image(article, post_content)
-                
-                # Salva post
-                saved_path = save_post_to_docx(post_content, article, image_path)
-                
-                if saved_path:
+            for finished, (i, saved_path, error) in enumerate(scheduler.iter_completed(), 1):
+                emit_progress("generazione", finished, len(selected_articles))
+                article = selected_articles[i - 1]
+                if error is not None:
+                    logging.error(f"Errore nel job del post {i}: {error}")
+                elif saved_path:
                     generated_posts.append(saved_path)
+                    collector.mark_as_processed(article)
                     logging.info(f"Post {i} completato: {saved_path}")
-                else:
-                    logging.error(f"Errore salvataggio post {i}")
-            else:
-                logging.error(f"Errore generazione contenuto post {i}")
         
         # Riepilogo finale
         logging.info(f"Automazione completata. Generati {len(generated_posts)} post")
+        emit_progress("completato", posts=len(generated_posts))
+        logging.info(f"Pool connessioni API: {get_pool_stats()}")
+        get_token_usage().log_summary()
         
         if generated_posts:
             logging.info("Post generati:")
@@ -602,13 +837,21 @@ def main():
         
     except Exception as e:
         logging.error(f"Errore nell'automazione: {e}")
+        if raise_errors:
+            raise
         return []
 
 class EnhancedArticleCollector:
     def __init__(self, config_path: str = "automation_config.json"):
         self.config = self.load_config(config_path)
         self.setup_logging()
+        self.build_keyword_matcher()
+        # Duplicati nella singola esecuzione (stesso articolo su più feed)
         self.processed_articles = set()
+        # Articoli già usati nelle esecuzioni precedenti (registro condiviso con la GUI)
+        dedup_settings = self.config.get("dedup", {})
+        self.dedup_index = ProcessedArticleStore(dedup_settings.get("db_path", DEFAULT_PROCESSED_DB))
+        self.dedup_index.compact(dedup_settings.get("retention_days", DEFAULT_RETENTION_DAYS))
         
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """Carica configurazione da file JSON"""
@@ -619,6 +862,29 @@ class EnhancedArticleCollector:
             logging.error(f"File di configurazione {config_path} non trovato")
             return {}
     
+    def build_keyword_matcher(self):
+        """Compila una sola volta le keyword AI ed escluse della configurazione"""
+        criteria = self.config.get("selection_criteria", {})
+        self.keyword_matcher = KeywordMatcher(
+            {
+                "ai": criteria.get("ai_keywords", []),
+                "exclude": criteria.get("exclude_keywords", []),
+            },
+            prefix_groups=["exclude"],
+        )
+    
+    def match_keywords(self, article: Dict[str, Any]) -> Dict[str, Any]:
+        """Trova tutte le keyword di titolo + riassunto in un solo passaggio e le salva nell'articolo"""
+        if 'keyword_hits' not in article:
+            title = article.get('title', '')
+            hits = self.keyword_matcher.find_all(f"{title} {article.get('summary', '')}")
+            title_end = len(title.lower())
+            article['keyword_hits'] = sorted({hit.keyword for hit in hits if hit.group == "ai"})
+            article['title_keyword_hits'] = sorted({hit.keyword for hit in hits
+                                                    if hit.group == "ai" and hit.end <= title_end})
+            article['excluded_keyword_hits'] = sorted({hit.keyword for hit in hits if hit.group == "exclude"})
+        return article
+    
     def setup_logging(self):
         """Setup logging system"""
         logs_dir = "logs"
@@ -637,10 +903,22 @@ class EnhancedArticleCollector:
         )
     
     def get_article_hash(self, article: Dict[str, Any]) -> str:
-        """Genera hash unico per l'articolo per evitare duplicati"""
-        content = f"{article.get('title', '')}{article.get('link', '')}"
+        """Genera hash unico per l'articolo (URL canonico, o titolo se manca il link)"""
+        content = article.get('canonical_link') or normalize_title(article.get('title', '')) or article.get('title', '')
         return hashlib.md5(content.encode()).hexdigest()
     
+    def is_already_processed(self, article: Dict[str, Any]) -> bool:
+        """Verifica duplicati nell'esecuzione corrente e nelle esecuzioni precedenti"""
+        if self.get_article_hash(article) in self.processed_articles:
+            return True
+        return self.dedup_index.contains_article(article.get('canonical_link'), article.get('title'))
+    
+    def mark_as_processed(self, article: Dict[str, Any]):
+        """Registra in modo persistente un articolo usato per un post"""
+        link = article.get('canonical_link') or article.get('link')
+        if link:
+            self.dedup_index.add(link, article.get('title'))
+    
     def fetch_rss_articles(self) -> List[Dict[str, Any]]:
         """Raccoglie articoli da feed RSS con filtering avanzato"""
         all_articles = []
@@ -649,40 +927,53 @@ class EnhancedArticleCollector:
         
         logging.info(f"Raccogliendo articoli da {len(rss_feeds)} fonti RSS...")
         
-        for feed_url in rss_feeds:
+        # I feed vengono scaricati in parallelo e processati appena completano
+        fetcher = FeedFetcher.from_config(self.config)
+        for result in fetcher.iter_fetch(rss_feeds):
+            feed_url = result['url']
             try:
-                logging.info(f"Fetching da: {feed_url}")
-                feed = feedparser.parse(feed_url)
+                if result['error'] is not None:
+                    raise result['error']
+                
+                logging.info(f"Fetch completato da: {feed_url} ({result['elapsed']:.1f}s)")
+                feed = result['feed']
                 
                 # Estrai dominio per source tracking
                 source_domain = urlparse(feed_url).netloc
                 
-                articles_from_source = 0
+                # I filtri di qualità non dipendono dal link: si applicano prima di risolvere i redirect
+                candidates = []
                 for entry in feed.entries:
-                    if articles_from_source >= max_per_source:
-                        break
-                    
                     # Crea oggetto articolo standardizzato
                     article = {
                         'title': entry.get('title', ''),
                         'link': entry.get('link', ''),
                         'summary': entry.get('summary', ''),
-                        'published': entry.get('published', ''),
+                        'published': entry.get('published', '') or entry.get('updated', ''),
+                        'published_parsed': entry.get('published_parsed') or entry.get('updated_parsed'),
                         'source': source_domain,
                         'feed_url': feed_url,
                         'content': entry.get('content', [{}])[0].get('value', '') if entry.get('content') else ''
                     }
+                    if self.passes_quality_filters(article):
+                        candidates.append((article, entry))
+                
+                # Redirect (feedburner, shortener) risolti in parallelo prima della deduplicazione
+                canonical_links = self.dedup_index.canonical_urls(
+                    [(article['link'], entry) for article, entry in candidates])
+                
+                articles_from_source = 0
+                for (article, _), canonical_link in zip(candidates, canonical_links):
+                    if articles_from_source >= max_per_source:
+                        break
+                    article['canonical_link'] = canonical_link
                     
-                    # Verifica duplicati
-                    article_hash = self.get_article_hash(article)
-                    if article_hash in self.processed_articles:
+                    # Verifica duplicati (anche rispetto alle esecuzioni precedenti)
+                    if self.is_already_processed(article):
                         continue
-                    
-                    # Applica filtri di qualità
-                    if self.passes_quality_filters(article):
-                        all_articles.append(article)
-                        self.processed_articles.add(article_hash)
-                        articles_from_source += 1
+                    all_articles.append(article)
+                    self.processed_articles.add(self.get_article_hash(article))
+                    articles_from_source += 1
                         
                 logging.info(f"Raccolti {articles_from_source} articoli da {source_domain}")
                 
@@ -703,20 +994,15 @@ class EnhancedArticleCollector:
         if content_length < min_length:
             return False
         
-        # Controlla keywords AI
-        ai_keywords = criteria.get("ai_keywords", [])
-        exclude_keywords = criteria.get("exclude_keywords", [])
-        
-        text_content = f"{article.get('title', '')} {article.get('summary', '')}".lower()
+        # Controlla keywords AI (un solo passaggio sul testo per tutte le keyword)
+        self.match_keywords(article)
         
         # Deve contenere almeno una keyword AI
-        has_ai_keyword = any(keyword.lower() in text_content for keyword in ai_keywords)
-        if not has_ai_keyword:
+        if not article['keyword_hits']:
             return False
         
         # Non deve contenere keywords escluse
-        has_excluded = any(keyword.lower() in text_content for keyword in exclude_keywords)
-        if has_excluded:
+        if article['excluded_keyword_hits']:
             return False
         
         return True
@@ -770,71 +1056,53 @@ class EnhancedArticleCollector:
         logging.info("Google News API non ancora implementato")
         return articles
     
-    def score_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Assegna punteggi agli articoli basati su criteri di rilevanza"""
+    def calculate_scores(self, articles: List[Dict[str, Any]]) -> np.ndarray:
+        """Punteggi finali degli articoli (nello stesso ordine), senza ordinarli"""
         criteria = self.config.get("selection_criteria", {})
         freshness_weight = criteria.get("freshness_weight", 0.4)
         relevance_weight = criteria.get("relevance_weight", 0.6)
         ai_keywords = criteria.get("ai_keywords", [])
         
+        # Le keyword sono già calcolate dai filtri; qui servono solo per le fonti non RSS
         for article in articles:
-            # Score di freschezza (0-1)
-            freshness_score = self.calculate_freshness_score(article.get('published', ''))
-            
-            # Score di rilevanza (0-1)
-            relevance_score = self.calculate_relevance_score(article, ai_keywords)
-            
-            # Score finale
-            final_score = (freshness_score * freshness_weight) + (relevance_score * relevance_weight)
-            article['score'] = final_score
-        
-        # Ordina per punteggio decrescente
-        return sorted(articles, key=lambda x: x.get('score', 0), reverse=True)
-    
-    def calculate_freshness_score(self, published_date: str) -> float:
-        """Calcola punteggio di freschezza (articoli più recenti = punteggio maggiore)"""
-        if not published_date:
-            return 0.0
+            self.match_keywords(article)
         
-        try:
-            # Parse della data (formato può variare)
-            # Implementazione semplificata per evitare warning
-            hours_ago = 24  # Assume 24 ore fa se non parseable
-            
-            # Score inversamente proporzionale alle ore passate
-            max_hours = 168  # 7 giorni
-            score = max(0, (max_hours - hours_ago) / max_hours)
-            return score
-            
-        except Exception:
-            return 0.5  # Default score
+        # Freschezza e rilevanza calcolate in blocco su array NumPy
+        return score_articles_batch(articles, len(ai_keywords), freshness_weight, relevance_weight)
     
-    def calculate_relevance_score(self, article: Dict[str, Any], ai_keywords: List[str]) -> float:
-        """Calcola punteggio di rilevanza basato su keyword AI"""
-        text_content = f"{article.get('title', '')} {article.get('summary', '')}".lower()
-        
-        # Conta keyword matches
-        keyword_matches = sum(1 for keyword in ai_keywords if keyword.lower() in text_content)
-        
-        # Bonus per keyword nel titolo
-        title_matches = sum(1 for keyword in ai_keywords if keyword.lower() in article.get('title', '').lower())
-        
-        # Score normalizzato
-        total_keywords = len(ai_keywords)
-        base_score = keyword_matches / total_keywords if total_keywords > 0 else 0
-        title_bonus = title_matches * 0.2  # 20% bonus per keyword nel titolo
+    def score_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Assegna punteggi agli articoli basati su criteri di rilevanza"""
+        if not articles:
+            return []
         
-        return min(1.0, base_score + title_bonus)
+        # Ordina per punteggio decrescente
+        return rank_by_score(articles, self.calculate_scores(articles))
     
     def select_top_articles(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Seleziona i migliori articoli per la generazione post"""
         posts_per_day = self.config.get("schedule", {}).get("posts_per_day", 3)
         
-        # Assegna punteggi
-        scored_articles = self.score_articles(articles)
+        # Collassa le notizie sindacate su più fonti in un solo rappresentante per storia
+        near_duplicate_settings = self.config.get("near_duplicates", {})
+        if near_duplicate_settings.get("enabled", True):
+            articles = collapse_near_duplicates(articles, near_duplicate_settings)
+            logging.info(f"Storie distinte dopo il raggruppamento dei duplicati: {len(articles)}")
         
-        # Seleziona i migliori
-        selected = scored_articles[:posts_per_day]
+        if not articles:
+            return []
+        
+        # Assegna punteggi e seleziona i migliori con un heap limitato (O(n log k)),
+        # rispettando i limiti per fonte e per cluster di notizie
+        criteria = self.config.get("selection_criteria", {})
+        selector = TopKSelector(
+            posts_per_day,
+            max_per_source=criteria.get("max_posts_per_source"),
+            max_per_cluster=criteria.get("max_posts_per_cluster"),
+        )
+        for article, score in zip(articles, self.calculate_scores(articles).tolist()):
+            article['score'] = score
+            selector.push(article, score, source=article.get('source'), cluster=article.get('cluster_id'))
+        selected = [article for article, _ in selector.result()]
         
         logging.info(f"Selezionati {len(selected)} articoli per generazione post:")
         for i, article in enumerate(selected, 1):
@@ -867,4 +1135,11 @@ class EnhancedArticleCollector:
 
 # Esempio di utilizzo
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Una sola esecuzione alla volta, qualunque sia chi la avvia (pannello, launcher, pianificazione)
+    try:
+        with RunLock():
+            # '--batch': generazione tramite Batch API (più economica, senza requisiti di latenza)
+            main(batch='--batch' in sys.argv[1:])
+    except RunAlreadyActive as e:
+        print(e, file=sys.stderr)
+        sys.exit(RUN_ALREADY_ACTIVE_EXIT_CODE)
\ No newline at end of file
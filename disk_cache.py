@@ -0,0 +1,200 @@
+# disk_cache.py - Cache chiave/valore persistente su SQLite con compressione, TTL ed eviction LRU
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, List, Optional, Tuple, Union
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Dopo un'eviction la cache viene riportata a questa frazione del limite
+EVICTION_TARGET_RATIO = 0.9
+# Ogni quante scritture il totale tenuto in memoria viene riallineato con il database
+# (le scritture e le cancellazioni degli altri processi non passano da qui)
+SIZE_RESYNC_WRITES = 100
+
+Value = Union[str, bytes]
+_USE_DEFAULT_TTL = object()
+
+
+class DiskCache:
+    """
+    Cache su un unico file SQLite (WAL) condivisibile tra thread e processi.
+    I valori sono compressi con zlib, scadono dopo 'ttl_seconds' e, quando la
+    dimensione totale supera 'max_bytes', vengono rimossi i meno usati di recente.
+    Le chiavi sono separate per 'namespace' così più cache possono condividere il file.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        # Dimensione stimata per non ricalcolare SUM(size) a ogni scrittura: per le scritture
+        # di questa istanza può solo sovrastimare (sovrascritture e cancellazioni non la riducono)
+        self._size_lock = threading.Lock()
+        self._estimated_size: Optional[int] = None
+        self._writes_since_sync = 0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Una connessione per thread: sqlite3 non condivide connessioni tra thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                is_text INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+
+    def _is_expired(self, created_at: float, ttl_seconds: Optional[float]) -> bool:
+        return ttl_seconds is not None and time.time() - created_at > ttl_seconds
+
+    def get(self, key: str, namespace: str = "default",
+            ttl_seconds: Any = _USE_DEFAULT_TTL) -> Optional[Value]:
+        """
+        Restituisce il valore (str o bytes, come salvato) o None se assente/scaduto.
+        'ttl_seconds' sovrascrive il TTL di default; None significa nessuna scadenza.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is _USE_DEFAULT_TTL else ttl_seconds
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, is_text, created_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            value, is_text, created_at = row
+            if self._is_expired(created_at, ttl):
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key),
+            )
+            data = zlib.decompress(value)
+            return data.decode("utf-8") if is_text else data
+        except (sqlite3.Error, zlib.error) as e:
+            logging.warning(f"Errore lettura cache {self.db_path} ({namespace}/{key}): {e}")
+            return None
+
+    def contains(self, key: str, namespace: str = "default") -> bool:
+        """True se la chiave è presente e non scaduta, senza leggere né decomprimere il valore"""
+        try:
+            row = self._connect().execute(
+                "SELECT created_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Errore lettura cache {self.db_path} ({namespace}/{key}): {e}")
+            return False
+        return row is not None and not self._is_expired(row[0], self.ttl_seconds)
+
+    def set(self, key: str, value: Value, namespace: str = "default") -> bool:
+        """Salva (o sovrascrive) un valore e applica l'eviction se serve"""
+        is_text = isinstance(value, str)
+        raw = value.encode("utf-8") if is_text else value
+        compressed = zlib.compress(raw, 6)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, is_text, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, compressed, int(is_text), len(compressed), now, now),
+            )
+            self._evict_if_needed(conn, len(compressed))
+            return True
+        except sqlite3.Error as e:
+            logging.warning(f"Errore scrittura cache {self.db_path} ({namespace}/{key}): {e}")
+            return False
+
+    def items(self, namespace: str = "default") -> List[Tuple[str, Value, float]]:
+        """(chiave, valore, created_at) delle voci non scadute del namespace, senza aggiornarne l'uso"""
+        try:
+            rows = self._connect().execute(
+                "SELECT key, value, is_text, created_at FROM entries WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Errore lettura cache {self.db_path} ({namespace}): {e}")
+            return []
+        result = []
+        for key, value, is_text, created_at in rows:
+            if self._is_expired(created_at, self.ttl_seconds):
+                continue
+            try:
+                data = zlib.decompress(value)
+            except zlib.error:
+                continue
+            result.append((key, data.decode("utf-8") if is_text else data, created_at))
+        return result
+
+    def delete(self, key: str, namespace: str = "default") -> None:
+        try:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            logging.warning(f"Errore cancellazione cache {self.db_path} ({namespace}/{key}): {e}")
+
+    def total_size(self) -> int:
+        row = self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(row[0])
+
+    def _evict_if_needed(self, conn: sqlite3.Connection, added: int) -> None:
+        """
+        Rimuove le voci meno usate di recente finché la cache non rientra nel limite.
+        Il totale esatto si legge solo quando la stima supera il limite o ogni
+        SIZE_RESYNC_WRITES scritture, non a ogni set().
+        """
+        if self.max_bytes is None:
+            return
+        with self._size_lock:
+            if self._estimated_size is not None and self._writes_since_sync < SIZE_RESYNC_WRITES:
+                self._estimated_size += added
+                self._writes_since_sync += 1
+                if self._estimated_size <= self.max_bytes:
+                    return
+            total = self.total_size()
+            self._writes_since_sync = 0
+            if total > self.max_bytes:
+                target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+                rows = conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+                victims = []
+                for namespace, key, size in rows:
+                    if total <= target:
+                        break
+                    victims.append((namespace, key))
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+                logging.info(f"Cache {self.db_path}: rimosse {len(victims)} voci (LRU)")
+            self._estimated_size = total
+
+    def purge_expired(self) -> int:
+        """Elimina tutte le voci scadute e restituisce quante ne sono state rimosse"""
+        if self.ttl_seconds is None:
+            return 0
+        cursor = self._connect().execute(
+            "DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
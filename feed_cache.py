@@ -0,0 +1,124 @@
+# feed_cache.py - Cache persistente dei feed RSS con richieste condizionali (ETag / Last-Modified)
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import feedparser
+
+DEFAULT_FEED_CACHE_DIR = os.path.join("cache", "feeds")
+
+# Campi delle entry che vengono salvati in cache (quelli usati dai due fetcher)
+CACHED_ENTRY_FIELDS = (
+    "id", "title", "link", "summary", "published", "published_parsed",
+    "updated", "updated_parsed", "author", "content", "feedburner_origlink",
+)
+CACHED_FEED_FIELDS = ("title", "link", "subtitle")
+STRUCT_TIME_MARKER = "__struct_time__"
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Converte i valori di feedparser (struct_time, FeedParserDict) in tipi JSON"""
+    if isinstance(value, time.struct_time):
+        return {STRUCT_TIME_MARKER: list(value)}
+    if isinstance(value, dict):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _from_jsonable(value: Any) -> Any:
+    """Operazione inversa di _to_jsonable: ricostruisce struct_time e FeedParserDict"""
+    if isinstance(value, dict):
+        if STRUCT_TIME_MARKER in value:
+            return time.struct_time(value[STRUCT_TIME_MARKER])
+        return feedparser.FeedParserDict({k: _from_jsonable(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_from_jsonable(v) for v in value]
+    return value
+
+
+class FeedCache:
+    """
+    Salva su disco, per ogni URL di feed, ETag, Last-Modified e le entry già parsate.
+    Con una risposta 304 il feed viene ricostruito dalla cache senza scaricare né parsare nulla.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_FEED_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path_for(self, feed_url: str) -> str:
+        digest = hashlib.sha1(feed_url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, feed_url: str) -> Optional[Dict[str, Any]]:
+        """Restituisce il record in cache per il feed o None"""
+        path = self._path_for(feed_url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            return record if record.get("url") == feed_url else None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cache feed illeggibile per {feed_url}: {e}")
+            return None
+
+    @staticmethod
+    def conditional_headers(record: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Header If-None-Match / If-Modified-Since ricavati da un record in cache"""
+        headers = {}
+        if record and record.get("entries") is not None:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("last_modified"):
+                headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def store(self, feed_url: str, parsed_feed: Any, etag: Optional[str],
+              last_modified: Optional[str]) -> None:
+        """Salva validatori HTTP e entry parsate con scrittura atomica"""
+        entries: List[Dict[str, Any]] = []
+        for entry in parsed_feed.get("entries", []):
+            entries.append({
+                field: _to_jsonable(entry[field]) for field in CACHED_ENTRY_FIELDS if field in entry
+            })
+        feed_info = parsed_feed.get("feed", {})
+        record = {
+            "url": feed_url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "feed": {field: _to_jsonable(feed_info[field]) for field in CACHED_FEED_FIELDS if field in feed_info},
+            "entries": entries,
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path_for(feed_url))
+        except OSError as e:
+            logging.warning(f"Impossibile aggiornare la cache del feed {feed_url}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def to_parsed(record: Optional[Dict[str, Any]]) -> Optional[feedparser.FeedParserDict]:
+        """Ricostruisce un oggetto compatibile con feedparser.parse da un record in cache"""
+        if not record or record.get("entries") is None:
+            return None
+        return feedparser.FeedParserDict({
+            "feed": _from_jsonable(record.get("feed", {})),
+            "entries": _from_jsonable(record["entries"]),
+            "bozo": False,
+            "status": 304,
+            "href": record.get("url"),
+        })
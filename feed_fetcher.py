@@ -0,0 +1,168 @@
+# feed_fetcher.py - Motore di fetch concorrente per i feed RSS
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import feedparser
+import requests
+
+from feed_cache import DEFAULT_FEED_CACHE_DIR, FeedCache
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST_LIMIT = 2
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+USER_AGENT = "Mozilla/5.0 (compatible; LinkedinContentHelper/1.0; +feedparser)"
+CHUNK_SIZE = 64 * 1024
+
+
+class FeedFetchTimeout(Exception):
+    """Il download del feed ha superato il tempo massimo di lettura"""
+
+
+class FeedFetcher:
+    """
+    Scarica più feed RSS in parallelo con un pool di worker limitato,
+    un tetto di connessioni simultanee per host e timeout separati
+    di connessione e lettura. Ogni feed viene parsato appena il suo
+    download termina, quindi il tempo totale è circa quello del feed più lento.
+    Se è presente una FeedCache le richieste sono condizionali: con un 304
+    il feed viene ricostruito dalla cache senza download né parsing.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 cache: Optional[FeedCache] = None):
+        self.max_workers = max(1, int(max_workers))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache = cache
+        self._host_semaphores: Dict[str, threading.Semaphore] = {}
+        self._host_lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "FeedFetcher":
+        """Crea il fetcher leggendo la sezione 'feed_fetching' della configurazione"""
+        settings = config.get("feed_fetching", {})
+        cache = None
+        if settings.get("use_cache", True):
+            cache = FeedCache(settings.get("cache_dir", DEFAULT_FEED_CACHE_DIR))
+        return cls(
+            max_workers=settings.get("max_workers", DEFAULT_MAX_WORKERS),
+            per_host_limit=settings.get("per_host_limit", DEFAULT_PER_HOST_LIMIT),
+            connect_timeout=settings.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=settings.get("read_timeout", DEFAULT_READ_TIMEOUT),
+            cache=cache,
+        )
+
+    def _get_session(self) -> requests.Session:
+        """Restituisce una sessione HTTP per thread (keep-alive senza condividere lo stato)"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"User-Agent": USER_AGENT})
+            self._local.session = session
+        return session
+
+    def _get_host_semaphore(self, feed_url: str) -> threading.Semaphore:
+        """Semaforo che limita le richieste simultanee verso lo stesso host"""
+        host = urlparse(feed_url).netloc.lower()
+        with self._host_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _download(self, feed_url: str, headers: Dict[str, str]) -> requests.Response:
+        """Scarica il corpo del feed rispettando il tempo massimo di lettura complessivo"""
+        response = self._get_session().get(
+            feed_url,
+            headers=headers,
+            timeout=(self.connect_timeout, self.read_timeout),
+            stream=True,
+        )
+        try:
+            response.raise_for_status()
+            if response.status_code == 304:
+                return response
+            deadline = time.monotonic() + self.read_timeout
+            chunks = []
+            for chunk in response.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise FeedFetchTimeout(f"Lettura oltre {self.read_timeout}s")
+            response._content = b"".join(chunks)
+            return response
+        finally:
+            response.close()
+
+    def fetch_one(self, feed_url: str) -> Dict[str, Any]:
+        """Scarica e parsa un singolo feed; gli errori vengono riportati nel risultato"""
+        started = time.monotonic()
+        result: Dict[str, Any] = {
+            "url": feed_url, "feed": None, "error": None, "elapsed": 0.0, "not_modified": False,
+        }
+        try:
+            record = self.cache.load(feed_url) if self.cache else None
+            headers = FeedCache.conditional_headers(record)
+            cached_feed = None
+            with self._get_host_semaphore(feed_url):
+                response = self._download(feed_url, headers)
+                if response.status_code == 304:
+                    cached_feed = FeedCache.to_parsed(record)
+                    if cached_feed is None:
+                        # Copia in cache mancante o illeggibile: il 304 non basta, serve il feed completo
+                        logging.warning(f"Risposta 304 senza copia in cache, nuovo download completo: {feed_url}")
+                        response = self._download(feed_url, {})
+                        if response.status_code == 304:
+                            raise requests.HTTPError(f"Risposta 304 a una richiesta non condizionale: {feed_url}")
+
+            if cached_feed is not None:
+                result["feed"] = cached_feed
+                result["not_modified"] = True
+            else:
+                result["feed"] = feedparser.parse(
+                    response.content,
+                    response_headers={
+                        "content-location": response.url,
+                        "content-type": response.headers.get("Content-Type", ""),
+                    },
+                )
+                # Un feed con errori di formato minori (bozo) ma con articoli si memorizza comunque;
+                # senza articoli un 304 successivo restituirebbe un feed vuoto
+                if self.cache and result["feed"].get("entries"):
+                    self.cache.store(
+                        feed_url,
+                        result["feed"],
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    )
+        except Exception as e:
+            result["error"] = e
+        result["elapsed"] = time.monotonic() - started
+        return result
+
+    def iter_fetch(self, feed_urls: List[str]) -> Iterator[Dict[str, Any]]:
+        """Restituisce i risultati dei feed man mano che completano (non in ordine di input)"""
+        unique_urls = list(dict.fromkeys(url for url in feed_urls if url))
+        if not unique_urls:
+            return
+
+        workers = min(self.max_workers, len(unique_urls))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed-fetch") as executor:
+            futures = [executor.submit(self.fetch_one, url) for url in unique_urls]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def fetch_all(self, feed_urls: List[str]) -> List[Dict[str, Any]]:
+        """Versione bloccante di iter_fetch"""
+        return list(self.iter_fetch(feed_urls))
+
@@ -0,0 +1,187 @@
+# image_cache.py - Cache delle immagini generate (chiave: prompt normalizzato e provider)
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from disk_cache import DiskCache
+
+DEFAULT_IMAGE_CACHE_PATH = os.path.join("cache", "images.db")
+DEFAULT_IMAGE_CACHE_MAX_BYTES = 300 * 1024 * 1024
+DEFAULT_IMAGE_CACHE_TTL = 30 * 24 * 3600
+# Somiglianza minima (Jaccard sulle parole) perché due prompt siano considerati "lo stesso"
+DEFAULT_PROMPT_SIMILARITY = 0.9
+INDEX_NAMESPACE = "image_prompt"
+BLOB_NAMESPACE = "image_blob"
+MIN_PROMPT_WORD_LENGTH = 3
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+
+
+class CachedImage(NamedTuple):
+    data: bytes
+    prompt: str
+    provider: str
+    created_at: float
+    exact: bool
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Minuscole, senza punteggiatura e spazi ripetuti: varianti banali dello stesso prompt coincidono"""
+    text = unicodedata.normalize("NFKC", prompt or "").lower()
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+def prompt_key(prompt: str, provider: str) -> str:
+    return hashlib.sha256(f"{provider.lower()}\n{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+def _prompt_words(normalized: str) -> set:
+    return {word for word in normalized.split() if len(word) >= MIN_PROMPT_WORD_LENGTH}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ImageCache:
+    """
+    Memorizza le immagini generate per provider e prompt normalizzato, così un
+    argomento ricorrente non ripaga la fase più lenta e costosa della pipeline.
+    Un prompt quasi identico a uno già usato (stesse parole oltre 'prompt_similarity')
+    riusa la stessa immagine. I byte sono salvati una volta sola per contenuto (SHA-256).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_IMAGE_CACHE_PATH,
+                 max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_IMAGE_CACHE_TTL,
+                 prompt_similarity: float = DEFAULT_PROMPT_SIMILARITY,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.prompt_similarity = prompt_similarity
+        self.cache = DiskCache(db_path, max_bytes=max_bytes, ttl_seconds=ttl_seconds) if enabled else None
+
+    def _entries(self) -> List[Tuple[str, Dict[str, Any]]]:
+        entries = []
+        for key, value, _ in self.cache.items(INDEX_NAMESPACE):
+            try:
+                entries.append((key, json.loads(value)))
+            except (TypeError, ValueError):
+                continue
+        return entries
+
+    def _load(self, key: str, entry: Dict[str, Any], exact: bool) -> Optional[CachedImage]:
+        data = self.cache.get(entry.get("blob", ""), namespace=BLOB_NAMESPACE)
+        if not isinstance(data, bytes):
+            # Immagine rimossa dall'eviction: l'indice non deve più puntarci
+            self.cache.delete(key, namespace=INDEX_NAMESPACE)
+            return None
+        return CachedImage(data, entry.get("prompt", ""), entry.get("provider", ""),
+                           entry.get("created_at", 0.0), exact)
+
+    def lookup(self, prompt: str, provider: str) -> Optional[CachedImage]:
+        """Immagine per lo stesso prompt (o uno quasi identico) e provider, None se non c'è"""
+        if self.cache is None:
+            return None
+        key = prompt_key(prompt, provider)
+        raw = self.cache.get(key, namespace=INDEX_NAMESPACE)
+        if raw is not None:
+            hit = self._load(key, json.loads(raw), exact=True)
+            if hit is not None:
+                return hit
+
+        words = _prompt_words(normalize_prompt(prompt))
+        best: Optional[Tuple[float, str, Dict[str, Any]]] = None
+        for entry_key, entry in self._entries():
+            if entry.get("provider") != provider.lower():
+                continue
+            similarity = _jaccard(words, _prompt_words(entry.get("normalized", "")))
+            if similarity >= self.prompt_similarity and (best is None or similarity > best[0]):
+                best = (similarity, entry_key, entry)
+        if best is None:
+            return None
+        logging.info(f"Immagine in cache per un prompt simile al {best[0]:.0%}")
+        return self._load(best[1], best[2], exact=False)
+
+    def store(self, prompt: str, provider: str, image_bytes: bytes) -> bool:
+        if self.cache is None or not image_bytes:
+            return False
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                image.verify()
+        except Exception as e:
+            logging.warning(f"Immagine non salvata in cache (formato non riconosciuto): {e}")
+            return False
+
+        # Gli stessi byte (es. un'immagine riusata e salvata per un altro prompt) non vengono duplicati;
+        # due immagini solo simili restano distinte, altrimenti un prompt riceverebbe l'immagine di un altro
+        blob_key = hashlib.sha256(image_bytes).hexdigest()
+        if not self.cache.contains(blob_key, namespace=BLOB_NAMESPACE):
+            self.cache.set(blob_key, image_bytes, namespace=BLOB_NAMESPACE)
+
+        entry = {
+            "prompt": prompt[:500],
+            "normalized": normalize_prompt(prompt),
+            "provider": provider.lower(),
+            "blob": blob_key,
+            "created_at": time.time(),
+        }
+        return self.cache.set(prompt_key(prompt, provider), json.dumps(entry, ensure_ascii=False),
+                              namespace=INDEX_NAMESPACE)
+
+    def store_file(self, prompt: str, provider: str, path: str) -> bool:
+        try:
+            with open(path, "rb") as f:
+                return self.store(prompt, provider, f.read())
+        except OSError as e:
+            logging.warning(f"Immagine {path} non salvata in cache: {e}")
+            return False
+
+    def restore(self, prompt: str, provider: str, output_path: str) -> Optional[CachedImage]:
+        """Scrive in 'output_path' l'immagine in cache per il prompt e la restituisce, None se non c'è"""
+        hit = self.lookup(prompt, provider)
+        if hit is None:
+            return None
+        with open(output_path, "wb") as f:
+            f.write(hit.data)
+        logging.info(f"Immagine {provider} riusata dalla cache ({'stesso prompt' if hit.exact else 'prompt simile'}): "
+                     f"{output_path}")
+        return hit
+
+
+_default_cache: Optional[ImageCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def configure_image_cache(settings: Dict[str, Any]) -> ImageCache:
+    """Ricrea la cache condivisa dalla sezione 'image_cache' della configurazione"""
+    global _default_cache
+    cache = ImageCache(
+        db_path=settings.get("db_path", DEFAULT_IMAGE_CACHE_PATH),
+        max_bytes=int(settings.get("max_mb", DEFAULT_IMAGE_CACHE_MAX_BYTES / (1024 * 1024)) * 1024 * 1024),
+        ttl_seconds=settings.get("ttl_days", DEFAULT_IMAGE_CACHE_TTL / 86400) * 86400,
+        prompt_similarity=settings.get("prompt_similarity", DEFAULT_PROMPT_SIMILARITY),
+        enabled=settings.get("enabled", True),
+    )
+    with _default_cache_lock:
+        _default_cache = cache
+    return cache
+
+
+def get_image_cache() -> ImageCache:
+    """Istanza condivisa della cache (creata al primo utilizzo)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ImageCache()
+        return _default_cache
@@ -0,0 +1,205 @@
+# job_scheduler.py - Generazione concorrente dei post con limiti di frequenza per le API
+import email.utils
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+DEFAULT_MAX_JOBS = 4
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_BACKOFF = 2.0
+DEFAULT_MAX_BACKOFF = 60.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Limiti predefiniti per tipo di chiamata: i modelli di immagini hanno quote molto più basse
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "text": {"max_concurrency": 3, "requests_per_minute": 50},
+    "image": {"max_concurrency": 2, "requests_per_minute": 5},
+}
+
+
+class TokenBucket:
+    """Secchiello di gettoni: 'rate' richieste al minuto con raffiche fino a 'capacity'"""
+
+    def __init__(self, requests_per_minute: float, capacity: Optional[float] = None):
+        self.rate = max(0.001, float(requests_per_minute)) / 60.0
+        self.capacity = max(1.0, float(capacity if capacity is not None else requests_per_minute))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Attende finché non ci sono abbastanza gettoni e li consuma"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Svuota il secchiello per 'seconds' (usato quando il server risponde con Retry-After)"""
+        with self._lock:
+            self._refill()
+            # Il prossimo gettone sarà disponibile solo tra 'seconds'
+            self._tokens = min(self._tokens, 1.0 - seconds * self.rate)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Codice HTTP di un'eccezione degli SDK (Anthropic/OpenAI: status_code, Google: code)"""
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Legge gli header retry-after-ms / Retry-After (secondi o data HTTP) dalla risposta"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        milliseconds = headers.get("retry-after-ms")
+        if milliseconds:
+            return float(milliseconds) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Limita le chiamate di un tipo (testo o immagini): numero massimo di chiamate
+    contemporanee, quota al minuto con token bucket e nuovi tentativi sugli errori
+    temporanei (429, 5xx) rispettando Retry-After oppure con backoff esponenziale.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 2, requests_per_minute: float = 30,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_backoff: float = DEFAULT_BASE_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF):
+        self.name = name
+        self.max_retries = max(0, int(max_retries))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._semaphore = threading.BoundedSemaphore(max(1, int(max_concurrency)))
+        self._bucket = TokenBucket(requests_per_minute)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Esegue func rispettando i limiti; rilancia l'errore se non è temporaneo o i tentativi finiscono"""
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            with self._semaphore:
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    status = _status_code(e)
+                    if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, e)
+            attempt += 1
+            logging.warning(f"API {self.name}: errore {status}, nuovo tentativo {attempt}/{self.max_retries} "
+                            f"tra {delay:.1f}s")
+            if status == 429:
+                # Quota esaurita: l'attesa vale anche per le altre chiamate dello stesso tipo
+                self._bucket.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def configure_rate_limiters(settings: Dict[str, Any]) -> None:
+    """Ricrea i limitatori dalla sezione 'job_scheduler' della configurazione"""
+    with _rate_limiters_lock:
+        _rate_limiters.clear()
+        for kind, defaults in DEFAULT_LIMITS.items():
+            _rate_limiters[kind] = RateLimiter(
+                kind,
+                max_concurrency=settings.get(f"{kind}_concurrency", defaults["max_concurrency"]),
+                requests_per_minute=settings.get(f"{kind}_requests_per_minute", defaults["requests_per_minute"]),
+                max_retries=settings.get("max_retries", DEFAULT_MAX_RETRIES),
+            )
+
+
+def get_rate_limiter(kind: str) -> RateLimiter:
+    """Limitatore condiviso per tipo di chiamata ('text' o 'image')"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(kind)
+        if limiter is None:
+            defaults = DEFAULT_LIMITS.get(kind, DEFAULT_LIMITS["text"])
+            limiter = RateLimiter(kind, int(defaults["max_concurrency"]), defaults["requests_per_minute"])
+            _rate_limiters[kind] = limiter
+        return limiter
+
+
+class PostJobScheduler:
+    """
+    Esegue in parallelo la generazione dei post (un job per articolo) e restituisce
+    i risultati man mano che completano, così ogni post viene salvato appena pronto.
+    I limiti per le API restano quelli dei RateLimiter condivisi.
+    """
+
+    def __init__(self, max_jobs: int = DEFAULT_MAX_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_jobs)), thread_name_prefix="post-job")
+        self._completed: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._pending = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PostJobScheduler":
+        """Configura i limitatori e crea lo scheduler dalla sezione 'job_scheduler'"""
+        settings = config.get("job_scheduler", {})
+        configure_rate_limiters(settings)
+        return cls(max_jobs=settings.get("max_jobs", DEFAULT_MAX_JOBS))
+
+    def submit(self, key: Any, func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Accoda un job; 'key' identifica il job nei risultati"""
+        future = self._executor.submit(func, *args, **kwargs)
+        self._pending += 1
+        future.add_done_callback(lambda done: self._completed.put((key, done)))
+
+    def iter_completed(self) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Restituisce (key, risultato, errore) per ogni job, in ordine di completamento"""
+        while self._pending:
+            key, future = self._completed.get()
+            self._pending -= 1
+            error = future.exception()
+            yield key, (None if error else future.result()), error
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self) -> "PostJobScheduler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown(wait=exc_info[0] is None)
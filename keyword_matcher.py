@@ -0,0 +1,102 @@
+# keyword_matcher.py - Ricerca multi-keyword in un solo passaggio (Aho-Corasick)
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+
+class KeywordHit(NamedTuple):
+    start: int
+    end: int
+    group: str
+    keyword: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    """
+    Automa di Aho-Corasick costruito una volta sola per tutte le keyword della
+    configurazione, divise in gruppi (es. 'ai' ed 'exclude'). Un solo passaggio sul
+    testo restituisce tutte le occorrenze, con costo indipendente dal numero di keyword.
+
+    Le occorrenze devono iniziare a inizio parola ("AI" non trova "said" o "maintain")
+    e finire a fine parola, ammettendo il plurale in -s/-es ("AI agents", "transformers").
+    Per i gruppi in 'prefix_groups' basta l'inizio parola ("crypto" trova "cryptocurrency").
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], prefix_groups: Iterable[str] = ()):
+        self.prefix_groups = set(prefix_groups)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._patterns: List[Tuple[str, str]] = []  # (gruppo, keyword originale)
+        self._lengths: List[int] = []
+
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                pattern = keyword.strip().lower()
+                if pattern:
+                    self._add_pattern(pattern, group, keyword)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str, group: str, keyword: str) -> None:
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = next_node
+            node = next_node
+        self._output[node].append(len(self._patterns))
+        self._patterns.append((group, keyword))
+        self._lengths.append(len(pattern))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[child] = candidate if candidate != child else 0
+                self._output[child].extend(self._output[self._fail[child]])
+
+    def _accepts(self, text: str, start: int, end: int, group: str) -> bool:
+        if start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if group in self.prefix_groups or end >= len(text) or not _is_word_char(text[end]):
+            return True
+        # Plurale: "agent" -> "agents", "process" -> "processes"
+        for suffix in ("s", "es"):
+            stop = end + len(suffix)
+            if text.startswith(suffix, end) and (stop >= len(text) or not _is_word_char(text[stop])):
+                return True
+        return False
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Tutte le occorrenze (anche sovrapposte, es. "AI" dentro "AI safety") in un passaggio"""
+        lowered = text.lower()
+        hits: List[KeywordHit] = []
+        node = 0
+        for index, char in enumerate(lowered):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern_id in self._output[node]:
+                end = index + 1
+                start = end - self._lengths[pattern_id]
+                group, keyword = self._patterns[pattern_id]
+                if self._accepts(lowered, start, end, group):
+                    hits.append(KeywordHit(start, end, group, keyword))
+        return hits
+
+    def find(self, text: str, group: str) -> Set[str]:
+        """Keyword distinte del gruppo presenti nel testo"""
+        return {hit.keyword for hit in self.find_all(text) if hit.group == group}
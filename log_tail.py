@@ -0,0 +1,154 @@
+# log_tail.py - Lettura in coda (tail -f) dei file di log con buffer circolare e filtri
+import logging
+import os
+import queue
+import re
+import threading
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple
+
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_MAX_LINES = 5000
+# Alla prima apertura si mostrano solo gli ultimi KB del file, non tutto il log
+DEFAULT_INITIAL_BYTES = 256 * 1024
+DEFAULT_POLL_INTERVAL = 0.5
+READ_CHUNK_BYTES = 64 * 1024
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+LEVEL_ORDER = {name: index for index, name in enumerate(LEVELS)}
+_LEVEL_RE = re.compile(r" - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ")
+
+LogLine = Tuple[str, str]  # (livello, testo)
+
+
+def latest_log_file(log_dir: str = DEFAULT_LOG_DIR) -> Optional[str]:
+    """Percorso del file .log modificato più di recente, None se non ce ne sono"""
+    if not os.path.isdir(log_dir):
+        return None
+    candidates = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(".log")]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+
+def parse_level(line: str, previous_level: str = "INFO") -> str:
+    """Livello della riga; le righe senza livello (es. traceback) ereditano quello precedente"""
+    match = _LEVEL_RE.search(line)
+    return match.group(1) if match else previous_level
+
+
+class LogBuffer:
+    """Ultime 'max_lines' righe con il loro livello: i filtri lavorano qui, senza rileggere il file"""
+
+    def __init__(self, max_lines: int = DEFAULT_MAX_LINES):
+        self.lines: Deque[LogLine] = deque(maxlen=max_lines)
+        self._last_level = "INFO"
+
+    def append(self, text: str) -> LogLine:
+        self._last_level = parse_level(text, self._last_level)
+        entry = (self._last_level, text)
+        self.lines.append(entry)
+        return entry
+
+    def clear(self) -> None:
+        self.lines.clear()
+
+    @staticmethod
+    def matches(entry: LogLine, min_level: Optional[str] = None, substring: str = "") -> bool:
+        level, text = entry
+        if min_level and LEVEL_ORDER.get(level, 0) < LEVEL_ORDER.get(min_level, 0):
+            return False
+        return not substring or substring.lower() in text.lower()
+
+    def filtered(self, min_level: Optional[str] = None, substring: str = "") -> List[LogLine]:
+        return [entry for entry in self.lines if self.matches(entry, min_level, substring)]
+
+
+class LogTailer:
+    """
+    Thread che segue il file di log più recente della cartella: parte dagli ultimi
+    'initial_bytes', poi legge solo i byte aggiunti e mette le righe complete in
+    'lines' (queue thread-safe). Passa da solo al file nuovo quando ne compare uno
+    (es. il log del giorno dopo) e riparte da capo se il file viene troncato.
+    """
+
+    def __init__(self, log_dir: str = DEFAULT_LOG_DIR, initial_bytes: int = DEFAULT_INITIAL_BYTES,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.log_dir = log_dir
+        self.initial_bytes = initial_bytes
+        self.poll_interval = poll_interval
+        self.lines: "queue.Queue[str]" = queue.Queue()
+        self.current_path: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="log-tail", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def drain(self, max_lines: Optional[int] = None) -> List[str]:
+        """Righe arrivate dall'ultima chiamata (da usare nel thread della GUI)"""
+        drained: List[str] = []
+        while max_lines is None or len(drained) < max_lines:
+            try:
+                drained.append(self.lines.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def _emit(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.lines.put(line)
+
+    def _run(self) -> None:
+        handle = None
+        position = 0
+        pending = b""
+        try:
+            while not self._stop.is_set():
+                latest = latest_log_file(self.log_dir)
+                if latest != self.current_path and latest is not None:
+                    if handle is not None:
+                        handle.close()
+                    first_open = self.current_path is None
+                    self.current_path = latest
+                    handle = open(latest, "rb")
+                    size = os.path.getsize(latest)
+                    # Il primo file parte dalla coda; quelli nuovi (rotazione) dall'inizio
+                    position = max(0, size - self.initial_bytes) if first_open else 0
+                    handle.seek(position)
+                    pending = b""
+                    if position > 0:
+                        handle.readline()  # Salta la riga tagliata a metà
+                        position = handle.tell()
+                    self._emit([f"--- {latest} ---"])
+
+                if handle is not None:
+                    try:
+                        size = os.path.getsize(self.current_path)
+                    except OSError:
+                        size = position
+                    if size < position:
+                        # File troncato o ricreato: si riparte dall'inizio
+                        handle.seek(0)
+                        position = 0
+                        pending = b""
+                    while True:
+                        chunk = handle.read(READ_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        position += len(chunk)
+                        pending += chunk
+                        *complete, pending = pending.split(b"\n")
+                        self._emit(line.decode("utf-8", errors="replace").rstrip("\r") for line in complete)
+
+                self._stop.wait(self.poll_interval)
+        except Exception as e:
+            logging.error(f"Errore nella lettura del log: {e}")
+            self._emit([f"Errore lettura log: {e}"])
+        finally:
+            if handle is not None:
+                handle.close()
@@ -5,6 +5,9 @@ import subprocess
 import os
 import sys
 
+from process_runner import ProcessRunner, RunAlreadyActive, automation_command
+from run_window import open_run_window
+
 class MainLauncher:
     def __init__(self):
         self.root = tk.Tk()
@@ -147,32 +150,29 @@ class MainLauncher:
                                     "Questo genererà post reali con le impostazioni attuali.")
         
         if result:
+            runner = ProcessRunner(automation_command(base_dir=os.path.dirname(os.path.abspath(__file__))))
             try:
-                # Nascondi finestra durante test
-                self.root.withdraw()
-                
-                venv_python = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'venv', 'Scripts', 'python.exe')
-                if os.path.exists(venv_python):
-                    result = subprocess.run([venv_python, "automation_test.py"],
-                                             capture_output=True, text=True)
-                else:
-                    result = subprocess.run([sys.executable, "daily_ai_automation.py"],
-                                            capture_output=True, text=True)
-
-                # Mostra finestra
-                self.root.deiconify()
-                
-                if result.returncode == 0:
+                runner.start()
+            except RunAlreadyActive as e:
+                messagebox.showwarning("Test Automazione", f"{e}.\n\nAttendi che finisca prima di avviarne un altro.")
+                return
+            except OSError as e:
+                messagebox.showerror("Errore", f"Errore durante il test: {e}")
+                return
+            
+            def on_finished(returncode, cancelled):
+                if cancelled:
+                    return
+                if returncode == 0:
                     messagebox.showinfo("Test Completato", 
                                       "✅ Test automazione completato con successo!\n\n"
                                       "Controlla la cartella generated_posts per i risultati.")
                 else:
                     messagebox.showerror("Test Fallito", 
-                                        f"❌ Test fallito:\n\n{result.stderr}")
-                    
-            except Exception as e:
-                self.root.deiconify()
-                messagebox.showerror("Errore", f"Errore durante il test: {e}")
+                                        f"❌ Test fallito (codice {returncode}).\n\n"
+                                        "Controlla l'output del test o il log per i dettagli.")
+            
+            open_run_window(self.root, "Test Automazione - Output", runner, on_finished=on_finished)
     
     def open_posts_folder(self):
         """Apre cartella post generati"""
@@ -0,0 +1,141 @@
+# near_duplicates.py - Raggruppamento delle notizie quasi duplicate con MinHash + LSH
+import hashlib
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_SHINGLE_SIZE = 2
+DEFAULT_BANDS = 20
+DEFAULT_ROWS_PER_BAND = 3
+DEFAULT_THRESHOLD = 0.4
+
+# Hash universale (a*x + b) mod p come in datasketch: x e a < 2^32, quindi a*x sta in uint64
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+PERMUTATION_SEED = 1337
+
+TAG_RE = re.compile(r"<[^>]+>")
+WORD_RE = re.compile(r"\w+")
+
+
+def article_text_for_similarity(article: Dict[str, Any]) -> str:
+    """Titolo + riassunto senza HTML, in minuscolo"""
+    summary = TAG_RE.sub(" ", article.get('summary', '') or '')
+    return html.unescape(f"{article.get('title', '')} {summary}").lower()
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> set:
+    """Insieme di n-grammi di parole"""
+    words = WORD_RE.findall(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Calcola firme MinHash con 'num_perm' permutazioni vettorizzate con NumPy"""
+
+    def __init__(self, num_perm: int, seed: int = PERMUTATION_SEED):
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = generator.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _hash_shingle(shingle: str) -> int:
+        return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        if not shingle_set:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter((self._hash_shingle(s) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        permuted = ((hashes[:, None] * self.a + self.b) % MERSENNE_PRIME) & MAX_HASH
+        return permuted.min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def cluster_near_duplicates(texts: Sequence[str],
+                            shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                            bands: int = DEFAULT_BANDS,
+                            rows_per_band: int = DEFAULT_ROWS_PER_BAND,
+                            threshold: float = DEFAULT_THRESHOLD) -> List[int]:
+    """
+    Restituisce per ogni testo l'id del suo cluster (indice del primo elemento del cluster).
+    Le coppie candidate vengono trovate con il banding LSH (costo quasi lineare) e
+    confermate solo se la similarità di Jaccard stimata dalle firme supera 'threshold'.
+    """
+    hasher = MinHasher(bands * rows_per_band)
+    signatures = [hasher.signature(shingles(text, shingle_size)) for text in texts]
+    union_find = _UnionFind(len(texts))
+
+    for band in range(bands):
+        start = band * rows_per_band
+        buckets: Dict[bytes, int] = {}
+        for index, signature in enumerate(signatures):
+            key = signature[start:start + rows_per_band].tobytes()
+            first = buckets.setdefault(key, index)
+            if first == index or union_find.find(first) == union_find.find(index):
+                continue
+            similarity = float(np.mean(signatures[first] == signature))
+            if similarity >= threshold:
+                union_find.union(first, index)
+
+    return [union_find.find(index) for index in range(len(texts))]
+
+
+def _richness(article: Dict[str, Any]) -> int:
+    return len(article.get('summary', '') or '') + len(article.get('content', '') or '')
+
+
+def collapse_near_duplicates(articles: List[Dict[str, Any]],
+                             settings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Assegna 'cluster_id' a ogni articolo e restituisce un solo rappresentante per cluster
+    (quello con più contenuto), con 'cluster_size' e 'cluster_sources' valorizzati.
+    """
+    if not articles:
+        return []
+    settings = settings or {}
+    cluster_ids = cluster_near_duplicates(
+        [article_text_for_similarity(article) for article in articles],
+        shingle_size=settings.get("shingle_size", DEFAULT_SHINGLE_SIZE),
+        bands=settings.get("bands", DEFAULT_BANDS),
+        rows_per_band=settings.get("rows_per_band", DEFAULT_ROWS_PER_BAND),
+        threshold=settings.get("threshold", DEFAULT_THRESHOLD),
+    )
+
+    clusters: Dict[int, List[Dict[str, Any]]] = {}
+    for article, cluster_id in zip(articles, cluster_ids):
+        article['cluster_id'] = cluster_id
+        clusters.setdefault(cluster_id, []).append(article)
+
+    representatives = []
+    for members in clusters.values():
+        best = max(members, key=_richness)
+        best['cluster_size'] = len(members)
+        best['cluster_sources'] = sorted({m.get('source', '') for m in members})
+        representatives.append(best)
+        if len(members) > 1:
+            logging.info(f"Notizia duplicata su {len(members)} fonti ({', '.join(best['cluster_sources'])}): "
+                         f"{best.get('title', 'N/A')}")
+
+    return representatives
@@ -1,6 +1,4 @@
-import feedparser
 import os
-import anthropic
 from dotenv import load_dotenv
 from newspaper import Article, ArticleException
 # Importazioni per Tkinter
@@ -8,15 +6,33 @@ import tkinter as tk
 from tkinter import simpledialog, messagebox # simpledialog non lo useremo subito, messagebox sì
 import sys
 from datetime import datetime 
-import time
 import re 
 # import requests
-import openai
 import base64
 import logging
+import threading
+from urllib.parse import urlparse
 
 
 from docx import Document
+from api_clients import get_anthropic_client, get_gemini_client, get_http_client, get_openai_client
+from article_extractor import iter_extracted_articles
+from article_list import ArticleListModel, VirtualListbox, article_id
+from article_scoring import parse_published_timestamp
+from background_tasks import FINAL_STATUSES, BackgroundTaskRunner, TaskCancelled
+from article_text_cache import get_article_text_cache
+from feed_cache import FeedCache
+from feed_fetcher import FeedFetcher
+from image_cache import get_image_cache
+from job_scheduler import PostJobScheduler, get_rate_limiter
+from post_pipeline import PostPipeline
+from processed_store import ProcessedArticleStore
+from provider_router import ProviderRouter
+from response_cache import ResponseCacheMiss, get_response_cache, response_key
+from stream_parser import SectionStreamParser
+from text_compaction import compact_article_text, title_keywords
+from token_usage import get_token_usage, record_usage
+from top_k_selector import TopKSelector
 
 def setup_logging():
     """Setup del sistema di logging"""
@@ -51,31 +67,101 @@ if not OPENAI_API_KEY:
 
 FEED_FILE_PATH = "feeds.txt" # Definiamo il nome del file come costante
 
-# Aggiungi questa costante vicino a FEED_FILE_PATH
+# Registro degli articoli già processati: database SQLite condiviso tra GUI e modalità --auto.
+# Il vecchio file di testo viene importato automaticamente al primo avvio.
 PROCESSED_ARTICLES_FILE = "processed_articles.txt"
+PROCESSED_ARTICLES_DB = "processed_articles.db"
+PROCESSED_ARTICLES_RETENTION_DAYS = 365
+
+# Selezione automatica: quanti post per esecuzione e al massimo quanti dalla stessa fonte (None: nessun limite)
+AUTOMATED_POSTS_PER_RUN = 1
+AUTOMATED_MAX_POSTS_PER_SOURCE = None
+AUTOMATED_MAX_PARALLEL_JOBS = 3
+
+# Attività in background della GUI (download dei feed e generazioni contemporanee)
+GUI_MAX_PARALLEL_TASKS = 4
+# Righe delle attività concluse tenute nell'elenco (le più vecchie vengono rimosse)
+MAX_FINISHED_TASK_ROWS = 20
+# Ogni quanti secondi l'attesa di DOCX e immagine controlla se l'utente ha annullato
+CANCEL_POLL_SECONDS = 0.2
+
+# Token massimi del testo dell'articolo inserito nel prompt (stima locale)
+ARTICLE_TEXT_MAX_TOKENS = 3000
+
+# Modello OpenAI di riserva per il testo del post (richieste hedged dalla GUI)
+OPENAI_POST_MODEL = "gpt-4o"
+
+# Istruzioni fisse per Claude, uguali per ogni articolo: inviate come prompt di sistema con
+# cache_control, così le richieste successive le leggono dalla cache dei prompt del provider
+# (Anthropic memorizza solo prefissi abbastanza lunghi, es. 1024 token per Sonnet: sotto
+# questa soglia la richiesta funziona uguale ma i token risultano tutti non in cache)
+CLAUDE_POST_SYSTEM_PROMPT = """Sei un esperto divulgatore e social media manager.
+Basandoti sull'articolo fornito nel messaggio (titolo, link e testo), svolgi due compiti:
 
-def load_processed_articles(filepath=PROCESSED_ARTICLES_FILE):
+1. Scrivi un post per LinkedIn di 250-300 parole seguendo queste linee guida:
+
+STRUTTURA DEL POST:
+• Inizia con un HOOK coinvolgente (mai "Cari professionisti" o simili formalismi)
+• Usa esempi di apertura come:
+  - "Ieri ho scoperto qualcosa che ha cambiato il mio approccio a..."
+  - "3 anni fa pensavo che [X] fosse impossibile. Mi sbagliavo."
+  - "Ho appena testato [tecnologia/metodo] e i risultati mi hanno sorpreso"
+  - "Quello che sto per condividere può farti risparmiare ore di lavoro"
+
+TONO E STILE:
+• Usa un tono conversazionale, come se stessi parlando con un collega
+• Scrivi in prima persona quando possibile
+• Includi 2-3 emoji pertinenti (non esagerare)
+• Usa frasi breve e paragrafi di 1-2 righe per facilità di lettura
+
+CONTENUTO:
+• Racconta una storia o esperienza personale collegata al tema
+• Spiega concetti complessi con analogie semplici
+• Includi dati concreti o numeri quando disponibili
+• Fornisci 2-3 takeaway pratici e actionable
+
+ENGAGEMENT:
+• Termina con una domanda aperta per stimolare i commenti
+• Includi una call-to-action chiara
+• Usa spazi bianchi per rendere il post più leggibile
+
+• Aggiungi alla fine il link dell'articolo originale indicato nel messaggio
+
+2. Dopo il post, scrivi un prompt per immagine AI (in inglese, max 50 parole) che rappresenti visivamente il concetto principale del post.
+
+Per favore, formatta la tua risposta esattamente così, senza aggiungere altro testo:
+[POST]
+(Qui il testo del post per LinkedIn)
+[IMAGE_PROMPT]
+(Qui il prompt per l'immagine in inglese)
+"""
+
+_processed_store = None
+
+def get_processed_store(db_path=PROCESSED_ARTICLES_DB):
+    """Restituisce lo store degli articoli processati (aperto una sola volta per processo)"""
+    global _processed_store
+    if _processed_store is None or _processed_store.db_path != db_path:
+        _processed_store = ProcessedArticleStore(db_path, legacy_path=PROCESSED_ARTICLES_FILE)
+    return _processed_store
+
+def load_processed_articles(db_path=PROCESSED_ARTICLES_DB):
     """
-    Carica gli URL degli articoli già processati e li restituisce come un 'set'
-    per una ricerca veloce.
+    Restituisce lo store degli URL già processati. Supporta l'operatore 'in'
+    con una ricerca indicizzata, senza caricare tutto il registro in memoria.
     """
-    if not os.path.exists(filepath):
-        return set() # Restituisce un set vuoto se il file non esiste
-    
-    with open(filepath, "r", encoding="utf-8") as f:
-        # Crea un set di URL, rimuovendo spazi bianchi da ogni riga
-        processed_urls = {line.strip() for line in f if line.strip()}
-    print(f"Caricati {len(processed_urls)} URL di articoli già processati.")
-    return processed_urls
+    store = get_processed_store(db_path)
+    store.compact(PROCESSED_ARTICLES_RETENTION_DAYS)
+    print(f"Registro articoli processati: {len(store)} URL.")
+    return store
 
-def add_to_processed_articles(article_url, filepath=PROCESSED_ARTICLES_FILE):
+def add_to_processed_articles(article_url, db_path=PROCESSED_ARTICLES_DB, title=None):
     """
-    Aggiunge un nuovo URL di un articolo processato al file di registro.
-    Usa la modalità 'a' (append) per aggiungere in fondo al file senza cancellare.
+    Aggiunge un nuovo URL di un articolo processato al registro.
+    L'inserimento è atomico e sicuro anche con più processi attivi.
     """
     try:
-        with open(filepath, "a", encoding="utf-8") as f:
-            f.write(article_url + "\n")
+        get_processed_store(db_path).add(article_url, title)
         print(f"Articolo {article_url} aggiunto al registro dei processati.")
         return True
     except Exception as e:
@@ -121,11 +207,22 @@ def save_rss_feeds_to_file(feeds_list, filepath=FEED_FILE_PATH):
 # Rimuovi la vecchia definizione di rss_feeds = [...]
 rss_feeds_list_global = load_rss_feeds_from_file()
 
+# Fetcher condiviso: usa la stessa cache su disco (ETag / Last-Modified) di daily_ai_automation.py
+feed_fetcher_global = FeedFetcher(cache=FeedCache())
+
 def fetch_articles_from_feed(feed_url, limit=10):
-    # ... (questa funzione rimane invariata) ...
     logging.info(f"Recupero articoli da: {feed_url} (limite: {limit})")
+    return articles_from_fetch_result(feed_fetcher_global.fetch_one(feed_url), limit)
+
+def articles_from_fetch_result(result, limit=10):
+    """Articoli di un feed già scaricato da FeedFetcher (lista vuota in caso di errore)"""
+    feed_url = result['url']
     try:
-        feed = feedparser.parse(feed_url)
+        if result['error'] is not None:
+            raise result['error']
+        if result['not_modified']:
+            logging.info(f"Feed non modificato (304), uso la cache: {feed_url}")
+        feed = result['feed']
         articles = []
         entries_to_process = feed.entries[:limit]
         for entry in entries_to_process:
@@ -134,7 +231,8 @@ def fetch_articles_from_feed(feed_url, limit=10):
                 'link': entry.link,
                 'published': entry.get('published', 'Data non disponibile'),
                 'published_parsed': entry.get('published_parsed', None),
-                'summary': entry.get('summary', 'Nessun riassunto disponibile')
+                'summary': entry.get('summary', 'Nessun riassunto disponibile'),
+                'source': urlparse(feed_url).netloc
             }
             articles.append(article)
         if not articles:
@@ -161,9 +259,16 @@ def get_full_article_text_from_url(article_url):
     """
     Scarica e estrae il testo completo di un articolo da un URL usando newspaper3k.
     Restituisce il testo dell'articolo o None se l'estrazione fallisce.
+    Il testo già estratto viene servito dalla cache locale senza accedere alla rete.
     """
     if not article_url:
         return None
+
+    text_cache = get_article_text_cache()
+    cached_text = text_cache.get(article_url)
+    if cached_text:
+        logging.info(f"Testo dell'articolo recuperato dalla cache: {article_url}")
+        return cached_text
         
     logging.info(f"Estrazione testo da: {article_url}")
     try:
@@ -174,6 +279,7 @@ def get_full_article_text_from_url(article_url):
         
         if article_parser.text:
             logging.info("Testo dell'articolo estratto con successo.")
+            text_cache.put(article_url, article_parser.text)
             return article_parser.text
         else:
             logging.warning("Testo dell'articolo vuoto.")
@@ -195,17 +301,12 @@ def generate_post_image_google(image_generation_prompt, output_filepath, api_key
 
     print(f"\nRichiesta di generazione immagine a Google Gemini con prompt: '{image_generation_prompt}'")
     try:
-        from google import genai
-        from google.genai import types
-        from PIL import Image
-        from io import BytesIO
-        
-        # Configura il client Google Gemini
-        genai.configure(api_key=api_key)
-        client = genai.Client()
+        # Client Google Gemini condiviso (creato una volta per processo)
+        client = get_gemini_client(api_key)
         
         # Genera l'immagine usando Gemini
-        response = client.models.generate_content(
+        response = get_rate_limiter("image").call(
+            client.models.generate_content,
             model="gemini-2.5-flash-image-preview",
             contents=[image_generation_prompt],
         )
@@ -243,11 +344,13 @@ def generate_post_image_google(image_generation_prompt, output_filepath, api_key
         print(f"ERRORE durante la generazione dell'immagine con Google: {e}")
         return False
 
-def generate_post_image(image_generation_prompt, output_filepath, provider="openai"):
+def generate_post_image(image_generation_prompt, output_filepath, provider="openai", use_cache=True):
     """
-    Genera un'immagine basata su un prompt testuale usando OpenAI o Google API
+    Genera un'immagine basata su un prompt testuale usando OpenAI o Google API.
+    Con 'use_cache' un'immagine già generata per lo stesso prompt (o quasi) viene riusata.
     """
     print(f"\nRichiesta di generazione immagine con {provider.upper()} con prompt: '{image_generation_prompt}'")
+    image_cache = get_image_cache()
     
     if provider.lower() == "google":
         google_key = os.getenv('GOOGLE_API_KEY')
@@ -255,18 +358,28 @@ def generate_post_image(image_generation_prompt, output_filepath, provider="open
             print("ERRORE: La chiave API di Google non è configurata, provo con OpenAI...")
             provider = "openai"
         else:
-            return generate_post_image_google(image_generation_prompt, output_filepath, google_key)
+            if use_cache and image_cache.restore(image_generation_prompt, "google", output_filepath):
+                return True
+            success = generate_post_image_google(image_generation_prompt, output_filepath, google_key)
+            if success:
+                image_cache.store_file(image_generation_prompt, "google", output_filepath)
+            return success
     
     if provider.lower() == "openai":
+        if use_cache and image_cache.restore(image_generation_prompt, "openai", output_filepath):
+            print(f"Immagine riusata dalla cache: {output_filepath}")
+            return True
         if not OPENAI_API_KEY:
             print("ERRORE: La chiave API di OpenAI non è configurata.")
             return False
         
         try:
-            client = openai.OpenAI(api_key=OPENAI_API_KEY)
+            client = get_openai_client(OPENAI_API_KEY)
 
             # Usa l'API corretta di OpenAI per la generazione di immagini
-            response = client.images.generate(
+            # (quote e nuovi tentativi gestiti dal limitatore condiviso)
+            response = get_rate_limiter("image").call(
+                client.images.generate,
                 model="dall-e-3",
                 prompt=image_generation_prompt,
                 size="1024x1024",
@@ -278,8 +391,8 @@ def generate_post_image(image_generation_prompt, output_filepath, provider="open
             image_url = response.data[0].url
 
             # Scarica l'immagine dall'URL
-            import requests
-            image_response = requests.get(image_url)
+            # Download con lo stesso pool di connessioni delle API
+            image_response = get_http_client().get(image_url, follow_redirects=True)
             image_response.raise_for_status()
 
             # Salva l'immagine nel file
@@ -287,6 +400,7 @@ def generate_post_image(image_generation_prompt, output_filepath, provider="open
                 f.write(image_response.content)
 
             print(f"Immagine generata e salvata con successo in: {output_filepath}")
+            image_cache.store_file(image_generation_prompt, "openai", output_filepath)
 
             # Controlla se c'è un prompt rivisto
             if hasattr(response.data[0], 'revised_prompt') and response.data[0].revised_prompt:
@@ -301,7 +415,18 @@ def generate_post_image(image_generation_prompt, output_filepath, provider="open
     print(f"ERRORE: Provider non supportato: {provider}")
     return False
 
-def generate_linkedin_post_with_claude(article_data, interactive_mode=True):
+# Router condiviso da tutte le generazioni: latenze ed errori di Claude e OpenAI si accumulano tra i post
+_post_text_router = ProviderRouter()
+
+def parse_post_sections(text, on_text=None):
+    """Sezioni [POST] / [IMAGE_PROMPT] di una risposta completa (dalla cache o non in streaming)"""
+    parser = SectionStreamParser(on_text=on_text)
+    parser.feed(text)
+    parser.close()
+    return parser.sections
+
+def generate_linkedin_post_with_claude(article_data, interactive_mode=True, article_text=None, on_progress=None,
+                                       run_in_ui=None, check_cancelled=None, regenerate=False):
 
     article_title = article_data.get('title', 'Titolo non disponibile')
     article_link = article_data.get('link', '')
@@ -311,147 +436,286 @@ def generate_linkedin_post_with_claude(article_data, interactive_mode=True):
     """
     Genera un post per LinkedIn E un prompt per l'immagine, poi chiama la funzione 
     per generare l'immagine e salva tutto.
+    Se 'article_text' è già stato estratto (anche vuoto) non viene riscaricato l'articolo.
+    La risposta arriva in streaming: 'on_progress(sezione, testo)' riceve il testo man mano.
+    Con 'interactive_mode', se Claude tarda parte in parallelo OpenAI e vince la prima risposta.
+    Una risposta già in cache viene riusata; solo 'regenerate' (o la conferma dell'utente
+    nella finestra di dialogo) ne chiede una nuova.
+    Se la funzione gira in un thread di lavoro della GUI, 'run_in_ui' esegue le finestre
+    di dialogo nel thread di Tk e 'check_cancelled' (che solleva TaskCancelled) viene
+    controllata tra uno stadio e l'altro, anche durante la generazione dell'immagine.
     """
+    def show_dialog(dialog, *args, **kwargs):
+        return run_in_ui(dialog, *args, **kwargs) if run_in_ui else dialog(*args, **kwargs)
+
+    def ensure_not_cancelled():
+        if check_cancelled:
+            check_cancelled()
+
     if not ANTHROPIC_API_KEY:
         if interactive_mode: 
-            messagebox.showerror("Errore API", "Chiave API di Anthropic non configurata.")
+            show_dialog(messagebox.showerror, "Errore API", "Chiave API di Anthropic non configurata.")
         return False
     
     # --- Recupero Contenuto ---
-    logging.info(f"Recupero contenuto dell'articolo da: {article_link}")
-    article_text_content = get_full_article_text_from_url(article_link) or article_data.get('summary', '')
+    if article_text is None:
+        logging.info(f"Recupero contenuto dell'articolo da: {article_link}")
+        article_text = get_full_article_text_from_url(article_link)
+    # Testo ripulito dal boilerplate e limitato a un budget di token: dimensione del prompt prevedibile
+    article_text_content = compact_article_text(article_text or article_data.get('summary', ''),
+                                                max_tokens=ARTICLE_TEXT_MAX_TOKENS,
+                                                keywords=title_keywords(article_title))
 
     if not article_text_content:
         if interactive_mode: 
-            messagebox.showerror("Errore Contenuto", f"Impossibile recuperare il contenuto per: {article_title}")
+            show_dialog(messagebox.showerror, "Errore Contenuto", f"Impossibile recuperare il contenuto per: {article_title}")
         return False
 
-    # --- Prompt per Claude ---
-    prompt_message = f"""Sei un esperto divulgatore e social media manager.
-Basandoti sul seguente articolo intitolato "{article_title}", svolgi due compiti:
-
-1. Scrivi un post per LinkedIn di 250-300 parole seguendo queste linee guida:
-
-STRUTTURA DEL POST:
-• Inizia con un HOOK coinvolgente (mai "Cari professionisti" o simili formalismi)
-• Usa esempi di apertura come:
-  - "Ieri ho scoperto qualcosa che ha cambiato il mio approccio a..."
-  - "3 anni fa pensavo che [X] fosse impossibile. Mi sbagliavo."
-  - "Ho appena testato [tecnologia/metodo] e i risultati mi hanno sorpreso"
-  - "Quello che sto per condividere può farti risparmiare ore di lavoro"
-
-TONO E STILE:
-• Usa un tono conversazionale, come se stessi parlando con un collega
-• Scrivi in prima persona quando possibile
-• Includi 2-3 emoji pertinenti (non esagerare)
-• Usa frasi breve e paragrafi di 1-2 righe per facilità di lettura
-
-CONTENUTO:
-• Racconta una storia o esperienza personale collegata al tema
-• Spiega concetti complessi con analogie semplici
-• Includi dati concreti o numeri quando disponibili
-• Fornisci 2-3 takeaway pratici e actionable
-
-ENGAGEMENT:
-• Termina con una domanda aperta per stimolare i commenti
-• Includi una call-to-action chiara
-• Usa spazi bianchi per rendere il post più leggibile
-
-• Aggiungi il link dell'articolo originale alla fine: {article_link}
-
-2. Dopo il post, scrivi un prompt per immagine AI (in inglese, max 50 parole) che rappresenti visivamente il concetto principale del post.
-
-Per favore, formatta la tua risposta esattamente così, senza aggiungere altro testo:
-[POST]
-(Qui il testo del post per LinkedIn)
-[IMAGE_PROMPT]
-(Qui il prompt per l'immagine in inglese)
+    # --- Prompt per Claude: istruzioni fisse nel sistema (in cache), articolo nel messaggio ---
+    prompt_message = f"""Articolo intitolato "{article_title}"
+Link dell'articolo originale: {article_link}
 
 --- TESTO ARTICOLO ---
 {article_text_content}
 ---
 """
     
-    # --- Chiamata a Claude e Gestione Risposta ---
-    try:
-        logging.info("Chiamata all'API di Claude per generare testo e prompt immagine...")
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt_message}]
-        )
-        
-        if not (response.content and len(response.content) > 0 and hasattr(response.content[0], 'text')):
-            logging.error("Risposta Claude vuota o formato non valido")
-            if interactive_mode: 
-                messagebox.showerror("Errore Risposta Claude", "La risposta da Claude è vuota o in un formato imprevisto.")
-            return False
-
-        # CORREZIONE: Definiamo la variabile con la risposta completa qui
-        full_response_text = response.content[0].text
-        
-        # --- Estrazione del Post e del Prompt Immagine ---
+    # --- Nomi dei file di output (servono già durante lo streaming) ---
+    output_folder = "generated_posts"
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    sanitized_title = sanitize_filename(article_title)
+    filename_base = f"{timestamp}_{sanitized_title}"
+    filepath_docx = os.path.join(output_folder, f"{filename_base}.docx")
+    filepath_image = os.path.join(output_folder, f"{filename_base}.png")
+
+    def write_post_docx(text, _image_result):
+        ensure_not_cancelled()
+        # Salva il documento Word
+        os.makedirs(output_folder, exist_ok=True)
+        document = Document()
+        document.add_heading('Post LinkedIn Generato', level=1)
+        document.add_paragraph(text)
+        # Potresti aggiungere altri dettagli come il link, ecc.
+        document.save(filepath_docx)
+        logging.info(f"Post salvato con successo come file Word in: {filepath_docx}")
+        return filepath_docx
+
+    reused_images = []
+
+    def generate_image(prompt):
         try:
-            post_text = full_response_text.split("[IMAGE_PROMPT]")[0].replace("[POST]", "").strip()
-            image_prompt_text = full_response_text.split("[IMAGE_PROMPT]")[1].strip()
-
-            logging.info("Post generato con successo da Claude")
-            logging.info(f"Prompt immagine: {image_prompt_text}")
-        except IndexError:
-            logging.error("Formato risposta Claude non valido - manacano i tag [POST] o [IMAGE_PROMPT]")
-            if interactive_mode: 
-                messagebox.showerror("Errore Formato Risposta", "Claude non ha restituito l'output nel formato [POST]...[IMAGE_PROMPT] atteso.")
+            ensure_not_cancelled()
+        except TaskCancelled:
+            # Annullata mentre il testo era in generazione: l'immagine (a pagamento) non parte
             return False
-            
-        # --- Salvataggio File DOCX e Immagine PNG ---
+        os.makedirs(output_folder, exist_ok=True)
+        # Un'immagine già generata per lo stesso prompt evita la fase più lenta e costosa;
+        # in modalità interattiva alla fine si chiede se rigenerarla comunque
+        cached_image = get_image_cache().restore(prompt, "openai", filepath_image)
+        if cached_image is not None:
+            reused_images.append((prompt, cached_image))
+            return True
+        logging.info("Generazione immagine in corso...")
+        return generate_post_image(prompt, filepath_image, use_cache=False)
+
+    # DOCX e immagine partono in parallelo appena la risposta è completa
+    pipeline_name = sanitized_title[:20] or "post"
+    pipeline = PostPipeline(generate_image=generate_image, write_document=write_post_docx, name=pipeline_name)
+
+    def dispatch_sections(sections):
+        # Solo dopo uno stream concluso: un tentativo interrotto (es. 429 a metà) e ripetuto
+        # non deve mescolare il POST di una generazione con il prompt immagine di un'altra.
+        # Una risposta incompleta non fa partire nulla (l'immagine verrebbe poi scartata)
+        if not (sections.get("POST") and sections.get("IMAGE_PROMPT")):
+            return
+        logging.info("Post generato con successo")
+        pipeline.submit_post_text(sections["POST"])
+        logging.info(f"Prompt immagine: {sections['IMAGE_PROMPT']}")
+        pipeline.submit_image_request(sections["IMAGE_PROMPT"])
+
+    def discard_outputs(wait=True):
+        # Il DOCX potrebbe essere già stato scritto: lo si rimuove come se il post non fosse mai stato salvato
+        if not wait:
+            # Dopo un annullamento l'attività finisce subito: un'immagine già in generazione
+            # viene attesa e rimossa in background
+            threading.Thread(target=discard_outputs, name=f"{pipeline_name}-discard", daemon=True).start()
+            return
         try:
-            output_folder = "generated_posts"
-            os.makedirs(output_folder, exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            sanitized_title = sanitize_filename(article_title)
-            
-            # CORREZIONE: Definiamo i nomi dei file prima di usarli
-            filename_base = f"{timestamp}_{sanitized_title}"
-            filepath_docx = os.path.join(output_folder, f"{filename_base}.docx")
-            filepath_image = os.path.join(output_folder, f"{filename_base}.png")
-
-            # Salva il documento Word
-            document = Document()
-            document.add_heading('Post LinkedIn Generato', level=1)
-            document.add_paragraph(post_text)
-            # Potresti aggiungere altri dettagli come il link, ecc.
-            document.save(filepath_docx) # CORREZIONE: Usa la variabile corretta
-            logging.info(f"Post salvato con successo come file Word in: {filepath_docx}")
-
-            # Genera e salva l'immagine
-            logging.info("Generazione immagine in corso...")
-            image_success = generate_post_image(image_prompt_text, filepath_image) # CORREZIONE: Usa la variabile corretta
-            
-            if image_success:
-                logging.info(f"Immagine salvata con successo in: {filepath_image}")
-            else:
-                logging.warning("Generazione immagine fallita")
+            pipeline.join()
+        except Exception:
+            pass
+        for path in (filepath_docx, filepath_image):
+            if os.path.exists(path):
+                os.remove(path)
+
+    model = "claude-3-7-sonnet-20250219"
+    messages = [{"role": "user", "content": prompt_message}]
+    system_blocks = [{"type": "text", "text": CLAUDE_POST_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    response_cache = get_response_cache()
+    cache_key = response_key("anthropic", model, messages, {"max_tokens": 1024, "system": CLAUDE_POST_SYSTEM_PROMPT})
+
+    attempts = []
+    streamed_responses = []
+    # Con le richieste hedged il provider che perde continua in background: da quel momento
+    # il suo testo non deve più arrivare alla finestra di avanzamento
+    generation_done = threading.Event()
+
+    def show_progress(section, text):
+        if on_progress and not generation_done.is_set():
+            on_progress(section, text)
+
+    def stream_response():
+        # Un parser nuovo per ogni tentativo del limitatore; il testo mostrato dal tentativo
+        # precedente viene separato da quello nuovo
+        if attempts:
+            show_progress("POST", "\n\n--- Nuovo tentativo ---\n\n")
+        attempts.append(1)
+        parser = SectionStreamParser(on_text=show_progress)
+        chunks = []
+        with client.messages.stream(
+            model=model,
+            max_tokens=1024,
+            system=system_blocks,
+            messages=messages
+        ) as stream:
+            for text_delta in stream.text_stream:
+                chunks.append(text_delta)
+                parser.feed(text_delta)
+            usage = record_usage("anthropic", model, stream.get_final_message().usage)
+        logging.info(f"Token di input: {usage['cache_read']} dalla cache, {usage['cache_write']} scritti in cache, "
+                     f"{usage['uncached']} non in cache")
+        parser.close()
+        # Solo le risposte nel formato atteso vengono riusate dalle riesecuzioni (e vincono nel router)
+        if not (parser.sections.get("POST") and parser.sections.get("IMAGE_PROMPT")):
+            logging.warning("Risposta di Claude incompleta: mancano i tag [POST] o [IMAGE_PROMPT]")
+            return None
+        response_text = "".join(chunks)
+        response_cache.put(cache_key, response_text)
+        streamed_responses.append(response_text)
+        return response_text
+
+    def generate_with_claude(_prompt):
+        logging.info("Chiamata all'API di Claude per generare testo e prompt immagine (streaming)...")
+        return get_rate_limiter("text").call(stream_response)
+
+    def generate_with_openai(_prompt):
+        # Stesso prompt e stesso formato: con 'interactive_mode' parte solo se Claude tarda
+        openai_messages = [{"role": "system", "content": CLAUDE_POST_SYSTEM_PROMPT}] + messages
+
+        def call_api():
+            response = get_rate_limiter("text").call(
+                get_openai_client(OPENAI_API_KEY).chat.completions.create,
+                model=OPENAI_POST_MODEL,
+                messages=openai_messages,
+                max_tokens=1024
+            )
+            record_usage("openai", OPENAI_POST_MODEL, response.usage)
+            text = response.choices[0].message.content or ""
+            return text if parse_post_sections(text).get("IMAGE_PROMPT") else None
 
-            if interactive_mode:
-                messagebox.showinfo("Successo", "Post e immagine sono stati generati e salvati!")
-            
-            logging.info(f"Generazione completata con successo per: {article_title}")
-            
-            return True # Successo!
-        
-        except Exception as e_save:
-            logging.error(f"Errore durante il salvataggio dei file: {e_save}")
-            if interactive_mode: 
-                messagebox.showerror("Errore Salvataggio", f"Errore durante il salvataggio dei file:\n{e_save}")
-            return False
+        return response_cache.get_or_generate("openai", OPENAI_POST_MODEL, openai_messages, {"max_tokens": 1024},
+                                              call_api, refresh=regenerate)
 
+    # --- Chiamata a Claude (in streaming) e Gestione Risposta ---
+    try:
+        # Una riesecuzione (es. dopo un errore) riusa la risposta già pagata; solo una rigenerazione
+        # esplicita la ignora e la sostituisce (in replay la cache resta l'unica fonte)
+        use_cached = not regenerate or response_cache.mode == "replay"
+        cached_response = response_cache.get(cache_key) if use_cached else None
+        if cached_response is not None and interactive_mode and response_cache.mode != "replay":
+            if show_dialog(messagebox.askyesno, "Post già generato",
+                           "Per questo articolo c'è già una risposta generata in precedenza.\n\n"
+                           "Vuoi generarne una nuova? (a pagamento)"):
+                regenerate = True
+                cached_response = None
+        if cached_response is not None:
+            # Stessa risposta di un'esecuzione precedente: nessuna nuova chiamata a pagamento
+            logging.info("Risposta di Claude dalla cache")
+            sections = parse_post_sections(cached_response, on_text=on_progress)
+        elif response_cache.mode == "replay":
+            raise ResponseCacheMiss(f"Risposta per '{article_title}' non presente in cache (modalità replay)")
+        else:
+            client = get_anthropic_client(ANTHROPIC_API_KEY)
+            providers = [("claude", generate_with_claude)]
+            if OPENAI_API_KEY:
+                providers.append(("openai", generate_with_openai))
+            # Dalla GUI l'utente aspetta: richieste hedged (OpenAI parte se Claude supera il suo p95)
+            try:
+                response_text = _post_text_router.generate(prompt_message, providers, hedge=interactive_mode,
+                                                           abort_on=(TaskCancelled,))
+            finally:
+                generation_done.set()
+            logging.info(f"Statistiche provider di testo: {_post_text_router.stats()}")
+            if response_text is not None and not any(response_text is text for text in streamed_responses):
+                # Ha risposto OpenAI: il testo non è arrivato in streaming, lo si mostra ora per intero
+                logging.info("Risposta generata da OpenAI")
+                if on_progress:
+                    on_progress("POST", "\n\n--- Risposta di OpenAI ---\n\n")
+                sections = parse_post_sections(response_text, on_text=on_progress)
+            else:
+                sections = parse_post_sections(response_text or "")
+        ensure_not_cancelled()
+        dispatch_sections(sections)
+    except TaskCancelled:
+        discard_outputs(wait=False)
+        logging.info(f"Generazione annullata per: {article_title}")
+        return False
     except Exception as e:
+        discard_outputs()
         logging.error(f"Errore durante la chiamata a Claude: {e}")
         if interactive_mode: 
-            messagebox.showerror("Errore Chiamata Claude", f"Errore durante la chiamata a Claude:\n{e}")
+            show_dialog(messagebox.showerror, "Errore Chiamata Claude", f"Errore durante la chiamata a Claude:\n{e}")
         return False
+
+    if not sections.get("POST"):
+        discard_outputs()
+        logging.error("Risposta Claude vuota o formato non valido")
+        if interactive_mode: 
+            show_dialog(messagebox.showerror, "Errore Risposta Claude", "La risposta da Claude è vuota o in un formato imprevisto.")
+        return False
+
+    if not sections.get("IMAGE_PROMPT"):
+        discard_outputs()
+        logging.error("Formato risposta Claude non valido - manacano i tag [POST] o [IMAGE_PROMPT]")
+        if interactive_mode: 
+            show_dialog(messagebox.showerror, "Errore Formato Risposta", "Claude non ha restituito l'output nel formato [POST]...[IMAGE_PROMPT] atteso.")
+        return False
+
+    # --- Attesa del salvataggio di DOCX e Immagine PNG ---
+    try:
+        while not pipeline.wait(CANCEL_POLL_SECONDS):
+            ensure_not_cancelled()
+        _, image_success = pipeline.join()
+    except TaskCancelled:
+        discard_outputs(wait=False)
+        logging.info(f"Generazione annullata per: {article_title}")
+        return False
+    except Exception as e_save:
+        logging.error(f"Errore durante il salvataggio dei file: {e_save}")
+        if interactive_mode: 
+            show_dialog(messagebox.showerror, "Errore Salvataggio", f"Errore durante il salvataggio dei file:\n{e_save}")
+        return False
+
+    if reused_images and interactive_mode:
+        image_prompt, cached_image = reused_images[0]
+        generated_on = datetime.fromtimestamp(cached_image.created_at).strftime("%d/%m/%Y")
+        similarity_note = "" if cached_image.exact else " per un prompt molto simile"
+        if show_dialog(messagebox.askyesno, "Immagine già generata",
+                       f"È stata riusata un'immagine generata il {generated_on}{similarity_note}.\n\n"
+                       "Vuoi generarne una nuova? (più lento e a pagamento)"):
+            image_success = generate_post_image(image_prompt, filepath_image, use_cache=False)
+
+    if image_success:
+        logging.info(f"Immagine salvata con successo in: {filepath_image}")
+    else:
+        logging.warning("Generazione immagine fallita")
+
+    if interactive_mode:
+        show_dialog(messagebox.showinfo, "Successo", "Post e immagine sono stati generati e salvati!")
+    
+    logging.info(f"Generazione completata con successo per: {article_title}")
+    
+    return True # Successo!
     
 def run_automated_post_generation():
     """
@@ -467,26 +731,26 @@ def run_automated_post_generation():
         logging.warning("Nessun feed RSS configurato.")
         return
 
-    # 1. Raccogliamo tutti gli articoli e calcoliamo il loro punteggio di attualità
-    all_new_articles_with_score = []
+    # 1. Raccogliamo tutti gli articoli e calcoliamo il loro punteggio di attualità;
+    # un heap limitato tiene solo i migliori man mano che i feed vengono letti
+    selector = TopKSelector(AUTOMATED_POSTS_PER_RUN, max_per_source=AUTOMATED_MAX_POSTS_PER_SOURCE)
     now_timestamp = datetime.now().timestamp() # Timestamp attuale come riferimento
 
     print("\nRaccolta e valutazione di tutti i nuovi articoli...")
-    for feed_url in all_feeds:
-        articles_from_this_feed = fetch_articles_from_feed(feed_url, limit=10)
+    # I feed vengono scaricati in parallelo e valutati man mano che rispondono
+    for result in feed_fetcher_global.iter_fetch(all_feeds):
+        articles_from_this_feed = articles_from_fetch_result(result, limit=10)
         
         # Usiamo enumerate per avere l'indice di ogni articolo nel suo feed (0, 1, 2...)
         for index, article in enumerate(articles_from_this_feed):
             article_link = article.get('link')
             
             # Se l'articolo ha un link e non è stato già processato...
-            if article_link and article_link not in processed_urls:
-                score = 0
-                # Calcoliamo il punteggio
-                if article.get('published_parsed'):
-                    # Se ha una data, il punteggio è il suo timestamp
-                    score = time.mktime(article['published_parsed'])
-                else:
+            if article_link and not processed_urls.contains_article(article_link, article.get('title')):
+                # Calcoliamo il punteggio: se ha una data, il punteggio è il suo timestamp UTC
+                # (published_parsed di feedparser è in UTC, mktime la interpreterebbe come ora locale)
+                score = parse_published_timestamp(article.get('published_parsed'), article.get('published'))
+                if score is None:
                     # Se non ha una data, il punteggio è basato sul tempo attuale
                     # meno una penalità per la sua posizione nel feed.
                     # Articoli più in alto (indice basso) avranno un punteggio più alto.
@@ -495,38 +759,38 @@ def run_automated_post_generation():
                     penalty = index * 3600 
                     score = now_timestamp - penalty
                 
-                # Aggiungiamo alla lista l'articolo e il suo punteggio
-                all_new_articles_with_score.append({'score': score, 'article': article})
+                # Proponiamo l'articolo al selettore con il suo punteggio
+                selector.push(article, score, source=article.get('source'))
 
-    if not all_new_articles_with_score:
+    if not selector.seen:
         print("\nNessun nuovo articolo trovato in nessun feed. Uscita.")
         return
 
-    # 2. Ordiniamo la lista in base al punteggio, dal più alto al più basso
-    logging.info(f"Trovati {len(all_new_articles_with_score)} nuovi articoli.")
-    sorted_articles = sorted(
-        all_new_articles_with_score,
-        key=lambda x: x['score'],
-        reverse=True
-    )
-
-    # 3. Prendiamo i primi 3 articoli da processare
-    articles_to_process = sorted_articles[:1]
+    # 2. Prendiamo gli articoli con il punteggio più alto (al massimo uno per fonte)
+    logging.info(f"Trovati {selector.seen} nuovi articoli.")
+    selected_articles = [article for article, _ in selector.result()]
     
-    print(f"Selezionati {len(articles_to_process)} articoli con punteggio più alto per la generazione dei post.")
-
-    # 4. Eseguiamo un ciclo sugli articoli selezionati e generiamo i post
-    for i, scored_item in enumerate(articles_to_process):
-        article_to_process = scored_item['article'] # Estraiamo l'articolo vero e proprio
-        print(f"\n--- Processo l'articolo #{i+1}/{len(articles_to_process)}: '{article_to_process['title']}' ---")
-        
-        success = generate_linkedin_post_with_claude(article_to_process, interactive_mode=False)
-
-        if success:
-            add_to_processed_articles(article_to_process['link'])
-        else:
-            logging.warning(f"Generazione o salvataggio del post per '{article_to_process['title']}' sono falliti.")
+    print(f"Selezionati {len(selected_articles)} articoli con punteggio più alto per la generazione dei post.")
+
+    # 3. Estraiamo in parallelo il testo di tutti gli articoli selezionati e avviamo
+    # la generazione di ogni post appena il suo testo è pronto; i post vengono generati
+    # in parallelo (entro i limiti delle API) e registrati man mano che completano
+    with PostJobScheduler(max_jobs=AUTOMATED_MAX_PARALLEL_JOBS) as scheduler:
+        extracted = iter_extracted_articles(selected_articles)
+        for i, (article_to_process, article_text) in enumerate(extracted):
+            print(f"\n--- Processo l'articolo #{i+1}/{len(selected_articles)}: '{article_to_process['title']}' ---")
+            scheduler.submit(article_to_process, generate_linkedin_post_with_claude, article_to_process,
+                             interactive_mode=False, article_text=article_text or "")
+
+        for article_to_process, success, error in scheduler.iter_completed():
+            if success:
+                add_to_processed_articles(article_to_process['link'], title=article_to_process.get('title'))
+            else:
+                if error is not None:
+                    logging.error(f"Errore nel job per '{article_to_process['title']}': {error}")
+                logging.warning(f"Generazione o salvataggio del post per '{article_to_process['title']}' sono falliti.")
 
+    get_token_usage().log_summary()
     logging.info("=== ESECUZIONE AUTOMATICA COMPLETATA ===")
 
 def show_article_selection_window(initial_articles_list):
@@ -534,7 +798,7 @@ def show_article_selection_window(initial_articles_list):
 
     window = tk.Tk()
     window.title("Selezione Articolo per Post LinkedIn")
-    window.geometry("700x450") 
+    window.geometry("700x550") 
 
     manage_feeds_button = tk.Button(window, text="Gestisci Fonti RSS",
                                     command=lambda: open_manage_feeds_window(window),
@@ -544,55 +808,142 @@ def show_article_selection_window(initial_articles_list):
     label = tk.Label(window, text="Seleziona un articolo per generare un post:", font=("Arial", 14))
     label.pack(pady=5)
 
-    listbox_articles = tk.Listbox(window, width=100, height=15, selectmode=tk.SINGLE, font=("Arial", 10))
-    
-    def on_generate_post_click():
-        selected_indices = listbox_articles.curselection()
-        if not selected_indices:
-            messagebox.showwarning("Nessuna Selezione", "Per favore, seleziona un articolo dalla lista.", parent=window)
+    # Modello incrementale (id stabili) e lista virtualizzata: un ricaricamento aggiunge
+    # solo gli articoli nuovi e vengono disegnate solo le righe visibili
+    articles_model = ArticleListModel()
+    listbox_articles = VirtualListbox(window, articles_model, width=100, height=15, font=("Arial", 10),
+                                      empty_text="Nessun articolo trovato dai feed configurati.")
+
+    # Download dei feed e generazioni girano in background: la finestra resta reattiva
+    # e si possono generare più post contemporaneamente
+    tasks_frame = tk.Frame(window)
+    tk.Label(tasks_frame, text="Attività in background:", font=("Arial", 9)).pack(anchor=tk.W)
+    tasks_listbox = tk.Listbox(tasks_frame, width=100, height=4, selectmode=tk.SINGLE, font=("Arial", 9))
+    tasks_listbox.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    # Una riga per attività, nello stesso ordine della listbox
+    task_rows = []
+
+    def on_task_update(handle):
+        text = f"{handle.name} - {handle.status}" + (f" ({handle.progress})" if handle.progress else "")
+        if handle in task_rows:
+            row = task_rows.index(handle)
+            tasks_listbox.delete(row)
+            tasks_listbox.insert(row, text)
+        else:
+            task_rows.append(handle)
+            tasks_listbox.insert(tk.END, text)
+        # Le attività concluse più vecchie escono dall'elenco: la listbox non cresce per tutta la sessione
+        finished = [row for row, task in enumerate(task_rows) if task.status in FINAL_STATUSES]
+        for row in reversed(finished[:-MAX_FINISHED_TASK_ROWS]):
+            tasks_listbox.delete(row)
+            del task_rows[row]
+
+    runner = BackgroundTaskRunner(window, max_workers=GUI_MAX_PARALLEL_TASKS, on_task_update=on_task_update)
+
+    def cancel_selected_task():
+        selected_rows = tasks_listbox.curselection()
+        if not selected_rows:
+            messagebox.showwarning("Nessuna Selezione", "Seleziona un'attività da annullare.", parent=window)
             return
-        
-        if not hasattr(window, 'current_display_articles') or not window.current_display_articles:
+        if selected_rows[0] < len(task_rows):
+            task_rows[selected_rows[0]].cancel()
+
+    tk.Button(tasks_frame, text="Annulla Attività", command=cancel_selected_task,
+              font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
+
+    def on_generate_post_click():
+        if not len(articles_model):
             messagebox.showerror("Errore", "Lista articoli non disponibile. Prova a ricaricare.", parent=window)
             return
 
-        selected_index = selected_indices[0]
-        if selected_index < len(window.current_display_articles):
-            selected_article_data = window.current_display_articles[selected_index]
+        if listbox_articles.selected_id is None:
+            messagebox.showwarning("Nessuna Selezione", "Per favore, seleziona un articolo dalla lista.", parent=window)
+            return
+
+        selected_article_data = listbox_articles.selected_article()
+        if selected_article_data is not None:
             print(f"\nArticolo selezionato per il post (dalla GUI): {selected_article_data['title']}")
-            generate_linkedin_post_with_claude(selected_article_data, interactive_mode=True)
+            task = {}
+            on_progress, on_finished = open_generation_progress_window(
+                window, selected_article_data['title'], on_cancel=lambda: task["handle"].cancel())
+
+            def generate(handle, article_data):
+                def stream_progress(section, text):
+                    # Il testo in streaming arriva alla finestra attraverso la coda della GUI
+                    handle.check_cancelled()
+                    handle.report(section, text)
+                handle.set_status("generazione del testo")
+                return generate_linkedin_post_with_claude(article_data, interactive_mode=True,
+                                                          on_progress=stream_progress,
+                                                          run_in_ui=handle.run_in_ui,
+                                                          check_cancelled=handle.check_cancelled)
+
+            task["handle"] = runner.submit(
+                f"Post: {selected_article_data['title'][:60]}", generate, selected_article_data,
+                on_progress=on_progress,
+                on_done=lambda success: on_finished("Generazione completata" if success else "Generazione non riuscita"),
+                on_error=lambda error: on_finished(f"Errore: {error}"),
+                on_cancelled=lambda: on_finished("Generazione annullata"),
+            )
         else:
             messagebox.showerror("Errore Indice", "Errore nella selezione dell'articolo. Prova a ricaricare la lista.", parent=window)
 
+    def close_window():
+        runner.shutdown()
+        window.destroy()
+
     button_frame = tk.Frame(window)
     generate_button = tk.Button(button_frame, text="Genera Post da Articolo Selezionato", 
                                 command=on_generate_post_click,
                                 font=("Arial", 12), bg="lightgreen")
     generate_button.pack(side=tk.LEFT, padx=10)
 
-    close_button = tk.Button(button_frame, text="Chiudi", command=window.destroy, font=("Arial", 12), bg="lightcoral")
+    close_button = tk.Button(button_frame, text="Chiudi", command=close_window, font=("Arial", 12), bg="lightcoral")
     close_button.pack(side=tk.LEFT, padx=10)
+    window.protocol("WM_DELETE_WINDOW", close_window)
+
+    reload_task = {"handle": None, "seen_ids": set()}
+
+    def reload_feeds(handle, feed_urls):
+        # I feed vengono scaricati in parallelo e consegnati man mano che rispondono
+        completed = 0
+        for result in feed_fetcher_global.iter_fetch(feed_urls):
+            handle.check_cancelled()
+            completed += 1
+            handle.report(articles_from_fetch_result(result))
+            handle.set_status(f"{completed}/{len(feed_urls)} feed")
+        return completed
+
+    def add_articles(articles):
+        reload_task["seen_ids"].update(article_id(article) for article in articles)
+        if articles_model.merge(articles):
+            listbox_articles.refresh()
+        if len(articles_model):
+            generate_button.config(state=tk.NORMAL)
+
+    def on_reload_done(_):
+        # Solo a caricamento completo si tolgono gli articoli spariti dai feed
+        articles_model.retain(reload_task["seen_ids"])
+        listbox_articles.refresh()
+        if not len(articles_model):
+            generate_button.config(state=tk.DISABLED)
 
     def populate_articles_listbox():
-        listbox_articles.delete(0, tk.END)
-        current_articles_to_display = []
+        if reload_task["handle"] is not None:
+            # Un nuovo caricamento sostituisce quello precedente ancora in corso
+            reload_task["handle"].cancel()
+        reload_task["seen_ids"] = set()
         if not rss_feeds_list_global:
-             messagebox.showinfo("Nessun Feed RSS", "Nessun feed RSS configurato. Aggiungine tramite 'Gestisci Fonti RSS'.", parent=window)
-        else:
-            print("\nAggiornamento articoli dai feed configurati...")
-            for feed_url_item in rss_feeds_list_global:
-                articles_from_current_feed = fetch_articles_from_feed(feed_url_item)
-                current_articles_to_display.extend(articles_from_current_feed)
-        
-        if not current_articles_to_display:
-            listbox_articles.insert(tk.END, "Nessun articolo trovato dai feed configurati.")
+            messagebox.showinfo("Nessun Feed RSS", "Nessun feed RSS configurato. Aggiungine tramite 'Gestisci Fonti RSS'.", parent=window)
+            articles_model.clear()
+            listbox_articles.refresh()
             generate_button.config(state=tk.DISABLED)
-        else:
-            for i, article in enumerate(current_articles_to_display):
-                listbox_articles.insert(tk.END, f"{i+1}. {article['title']}")
-            generate_button.config(state=tk.NORMAL)
-        
-        window.current_display_articles = current_articles_to_display
+            return
+        if not len(articles_model):
+            generate_button.config(state=tk.DISABLED)
+        print("\nAggiornamento articoli dai feed configurati...")
+        reload_task["handle"] = runner.submit("Ricarica feed", reload_feeds, list(rss_feeds_list_global),
+                                              on_progress=add_articles, on_done=on_reload_done)
 
     reload_articles_button = tk.Button(window, text="Ricarica Articoli dai Feed",
                                      command=populate_articles_listbox,
@@ -601,16 +952,63 @@ def show_article_selection_window(initial_articles_list):
     listbox_articles.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
     reload_articles_button.pack(pady=5)
     button_frame.pack(pady=10)
+    tasks_frame.pack(pady=(0, 10), padx=20, fill=tk.X)
 
     populate_articles_listbox() 
 
-    if not hasattr(window, 'current_display_articles') or not window.current_display_articles:
-        generate_button.config(state=tk.DISABLED)
-    else:
-        generate_button.config(state=tk.NORMAL)
-
     window.mainloop() # <-- LA FUNZIONE DEVE TERMINARE QUI
 
+def open_generation_progress_window(parent_window, article_title, on_cancel=None):
+    """
+    Finestra che mostra il post mentre Claude lo scrive (streaming).
+    Restituisce le callback on_progress(sezione, testo) e on_finished(messaggio),
+    da chiamare nel thread della GUI.
+    """
+    progress_window = tk.Toplevel(parent_window)
+    progress_window.title(f"Generazione in corso: {article_title[:60]}")
+    progress_window.geometry("650x450")
+
+    status_label = tk.Label(progress_window, text="In attesa della risposta di Claude...", font=("Arial", 10))
+    status_label.pack(pady=(10, 0))
+
+    text_widget = tk.Text(progress_window, wrap=tk.WORD, font=("Arial", 10))
+    text_widget.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+
+    buttons_frame = tk.Frame(progress_window)
+    buttons_frame.pack(pady=5)
+    cancel_button = None
+    if on_cancel is not None:
+        def cancel():
+            on_cancel()
+            status_label.config(text="Annullamento in corso...")
+            cancel_button.config(state=tk.DISABLED)
+        cancel_button = tk.Button(buttons_frame, text="Annulla", command=cancel)
+        cancel_button.pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons_frame, text="Chiudi", command=progress_window.destroy).pack(side=tk.LEFT, padx=5)
+
+    section_titles = {"POST": "Scrittura del post...", "IMAGE_PROMPT": "Scrittura del prompt per l'immagine..."}
+    current_section = {"name": None}
+
+    def on_progress(section, text):
+        if not progress_window.winfo_exists():
+            return
+        if section != current_section["name"]:
+            current_section["name"] = section
+            status_label.config(text=section_titles.get(section, section))
+            if section == "IMAGE_PROMPT":
+                text_widget.insert(tk.END, "\n\n--- Prompt immagine ---\n")
+        text_widget.insert(tk.END, text)
+        text_widget.see(tk.END)
+
+    def on_finished(message):
+        if not progress_window.winfo_exists():
+            return
+        status_label.config(text=message)
+        if cancel_button is not None:
+            cancel_button.config(state=tk.DISABLED)
+
+    return on_progress, on_finished
+
 # (Assicurati che 'import tkinter as tk' e 'from tkinter import messagebox, simpledialog' siano presenti)
 # simpledialog ci servirà per l'input del nuovo URL
 
@@ -0,0 +1,104 @@
+# post_pipeline.py - Pipeline a stadi per un post: immagine e documento in parallelo al testo
+import logging
+import queue
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+_CANCELLED = object()
+
+
+class PostPipeline:
+    """
+    Stadi separati collegati da code: lo stadio immagine parte appena riceve il
+    prompt (anche mentre il testo è ancora in generazione) e lo stadio documento
+    scrive il file appena il testo è pronto, in parallelo all'immagine.
+    Con 'document_needs_image' il documento aspetta anche l'immagine (per incorporarla).
+    """
+
+    def __init__(self, generate_image: Callable[[Any], Any],
+                 write_document: Callable[[str, Any], Any],
+                 document_needs_image: bool = False, name: str = "post"):
+        self._generate_image = generate_image
+        self._write_document = write_document
+        self.document_needs_image = document_needs_image
+        self._image_requests: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+        self._image_results: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+        self._post_texts: "queue.Queue[Any]" = queue.Queue(maxsize=1)
+        self._image_result: Any = None
+        self._document_result: Any = None
+        self._document_error: Optional[BaseException] = None
+        self._image_submitted = False
+        self._text_submitted = False
+        self._threads = [
+            threading.Thread(target=self._image_stage, name=f"{name}-image", daemon=True),
+            threading.Thread(target=self._document_stage, name=f"{name}-document", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _image_stage(self) -> None:
+        request = self._image_requests.get()
+        result = None
+        if request is not _CANCELLED:
+            try:
+                result = self._generate_image(request)
+            except Exception as e:
+                logging.error(f"Errore nello stadio immagine: {e}")
+        self._image_result = result
+        self._image_results.put(result)
+
+    def _document_stage(self) -> None:
+        post_text = self._post_texts.get()
+        if post_text is _CANCELLED:
+            return
+        image_result = self._image_results.get() if self.document_needs_image else None
+        try:
+            self._document_result = self._write_document(post_text, image_result)
+        except Exception as e:
+            self._document_error = e
+
+    def submit_image_request(self, request: Any) -> None:
+        """Avvia subito la generazione dell'immagine (prompt o dati dell'articolo)"""
+        if not self._image_submitted:
+            self._image_submitted = True
+            self._image_requests.put(request)
+
+    def submit_post_text(self, post_text: str) -> None:
+        """Consegna il testo definitivo allo stadio documento"""
+        if not self._text_submitted:
+            self._text_submitted = True
+            self._post_texts.put(post_text)
+
+    def cancel(self) -> None:
+        """Ferma gli stadi non ancora avviati (es. se la generazione del testo fallisce)"""
+        if not self._image_submitted:
+            self._image_submitted = True
+            self._image_requests.put(_CANCELLED)
+        if not self._text_submitted:
+            self._text_submitted = True
+            self._post_texts.put(_CANCELLED)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Attende al massimo 'timeout' secondi la fine degli stadi (annullando quelli non
+        alimentati, come join) e restituisce True se sono finiti: chi attende può
+        controllare nel frattempo se l'utente ha annullato
+        """
+        self.cancel()
+        for thread in self._threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        return True
+
+    def join(self) -> Tuple[Any, Any]:
+        """
+        Attende la fine di entrambi gli stadi e restituisce (risultato documento, risultato immagine).
+        Gli stadi non alimentati vengono annullati; un errore del documento viene rilanciato.
+        """
+        self.cancel()
+        for thread in self._threads:
+            thread.join()
+        if self._document_error is not None:
+            raise self._document_error
+        return self._document_result, self._image_result
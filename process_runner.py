@@ -0,0 +1,245 @@
+# process_runner.py - Esecuzione dell'automazione in un processo figlio con output in streaming ed eventi di avanzamento
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+AUTOMATION_SCRIPT = "daily_ai_automation.py"
+DEFAULT_LOCK_PATH = os.path.join("cache", "automation.lock")
+# Le righe che iniziano così sono eventi JSON per la GUI, non output da mostrare
+PROGRESS_PREFIX = "@@PROGRESS "
+# Variabile d'ambiente con cui il genitore chiede al figlio di emettere gli eventi
+PROGRESS_ENV = "AI_CONTENT_PROGRESS"
+TERMINATE_TIMEOUT = 5.0
+# Codice di uscita del figlio quando trova il lock già preso
+RUN_ALREADY_ACTIVE_EXIT_CODE = 3
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+RunEvent = Tuple[str, Any]  # ("line", testo) | ("progress", dict) | ("exit", codice di uscita)
+
+_started_at = time.monotonic()
+
+
+class RunAlreadyActive(Exception):
+    """Un'esecuzione dell'automazione è già in corso (in questo processo o in un altro)"""
+
+
+def python_executable(base_dir: Optional[str] = None) -> str:
+    """Python del virtualenv del progetto se presente, altrimenti quello corrente"""
+    venv_python = os.path.join(base_dir or os.getcwd(), "venv", "Scripts", "python.exe")
+    return venv_python if os.path.exists(venv_python) else sys.executable
+
+
+def automation_command(*args: str, base_dir: Optional[str] = None) -> List[str]:
+    return [python_executable(base_dir), AUTOMATION_SCRIPT, *args]
+
+
+def emit_progress(stage: str, current: Optional[int] = None, total: Optional[int] = None, **extra: Any) -> None:
+    """
+    Lato figlio: scrive su stdout un evento di avanzamento (fase, articolo i/N, secondi
+    trascorsi). Non fa nulla se il processo non è stato avviato da ProcessRunner.
+    """
+    if not os.getenv(PROGRESS_ENV):
+        return
+    event = {"stage": stage, "elapsed": round(time.monotonic() - _started_at, 1)}
+    if current is not None:
+        event["current"] = current
+    if total is not None:
+        event["total"] = total
+    event.update(extra)
+    print(PROGRESS_PREFIX + json.dumps(event, ensure_ascii=False), flush=True)
+
+
+def parse_progress(line: str) -> Optional[Dict[str, Any]]:
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        event = json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def format_progress(event: Dict[str, Any]) -> str:
+    """Testo breve per la barra di stato, es. 'generazione 2/3 (41s)'"""
+    text = str(event.get("stage", ""))
+    if event.get("total"):
+        text += f" {event.get('current', 0)}/{event['total']}"
+    if "elapsed" in event:
+        text += f" ({event['elapsed']:.0f}s)"
+    return text
+
+
+class RunLock:
+    """
+    Lock esclusivo su file tra processi: impedisce due esecuzioni contemporanee
+    dell'automazione (pannello, launcher, Utilità di pianificazione). Il sistema
+    operativo lo rilascia anche se il processo termina in modo anomalo.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Prova a prendere il lock senza attendere; False se è già preso"""
+        if self._file is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if os.name == "nt":
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+        self._file.close()
+        self._file = None
+
+    def is_held(self) -> bool:
+        """True se un altro processo (o un'altra istanza) tiene il lock"""
+        if self._file is not None:
+            return True
+        if not self.acquire():
+            return True
+        self.release()
+        return False
+
+    def __enter__(self) -> "RunLock":
+        if not self.acquire():
+            raise RunAlreadyActive("Un'altra esecuzione dell'automazione è già in corso")
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+_active_lock = threading.Lock()
+_active_runner: Optional["ProcessRunner"] = None
+
+
+class ProcessRunner:
+    """
+    Avvia l'automazione in un processo figlio con stdout e stderr uniti in una pipe
+    letta da un thread: la GUI raccoglie righe ed eventi con 'drain' (da un ciclo
+    'after') senza mai bloccarsi. Un solo ProcessRunner alla volta può essere attivo
+    in un processo; tra processi diversi decide il RunLock preso dal figlio.
+    """
+
+    def __init__(self, command: Sequence[str], cwd: Optional[str] = None,
+                 lock_path: str = DEFAULT_LOCK_PATH, env: Optional[Dict[str, str]] = None):
+        self.command = list(command)
+        self.cwd = cwd or os.getcwd()
+        self.lock_path = lock_path
+        self.env = env
+        self.events: "queue.Queue[RunEvent]" = queue.Queue()
+        self.process: Optional[subprocess.Popen] = None
+        self.returncode: Optional[int] = None
+        self.cancelled = False
+        self.last_progress: Optional[Dict[str, Any]] = None
+        self._reader: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.returncode is None
+
+    def start(self) -> None:
+        global _active_runner
+        with _active_lock:
+            if _active_runner is not None and _active_runner.running:
+                raise RunAlreadyActive("Un test è già in esecuzione")
+            if RunLock(os.path.join(self.cwd, self.lock_path)).is_held():
+                raise RunAlreadyActive("L'automazione è già in esecuzione in un altro processo")
+
+            env = dict(os.environ if self.env is None else self.env)
+            env.update({PROGRESS_ENV: "1", "PYTHONUNBUFFERED": "1", "PYTHONIOENCODING": "utf-8"})
+            # Su Windows niente finestra di console per il figlio
+            creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            self.process = subprocess.Popen(
+                self.command, cwd=self.cwd, env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                text=True, encoding="utf-8", errors="replace", bufsize=1,
+                creationflags=creationflags,
+            )
+            _active_runner = self
+        logging.info(f"Avviato processo {self.process.pid}: {' '.join(self.command)}")
+        self._reader = threading.Thread(target=self._read_output, name="process-output", daemon=True)
+        self._reader.start()
+
+    def _read_output(self) -> None:
+        global _active_runner
+        try:
+            for raw_line in self.process.stdout:
+                line = raw_line.rstrip("\r\n")
+                event = parse_progress(line)
+                if event is not None:
+                    self.events.put(("progress", event))
+                else:
+                    self.events.put(("line", line))
+        except (OSError, ValueError) as e:
+            self.events.put(("line", f"Errore lettura output: {e}"))
+        finally:
+            returncode = self.process.wait()
+            self.process.stdout.close()
+            with _active_lock:
+                self.returncode = returncode
+                if _active_runner is self:
+                    _active_runner = None
+            self.events.put(("exit", returncode))
+
+    def drain(self, max_events: Optional[int] = None) -> List[RunEvent]:
+        """Eventi arrivati dall'ultima chiamata (da usare nel thread della GUI)"""
+        drained: List[RunEvent] = []
+        while max_events is None or len(drained) < max_events:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.last_progress = payload
+            drained.append((kind, payload))
+        return drained
+
+    def cancel(self) -> None:
+        """Chiede al figlio di terminare; se non esce entro qualche secondo viene ucciso"""
+        if not self.running:
+            return
+        self.cancelled = True
+        logging.info(f"Annullamento del processo {self.process.pid}")
+        self.process.terminate()
+
+        def kill_if_still_running():
+            try:
+                self.process.wait(TERMINATE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+        threading.Thread(target=kill_if_still_running, name="process-kill", daemon=True).start()
@@ -0,0 +1,208 @@
+# processed_store.py - Registro indicizzato degli articoli già processati (SQLite in WAL)
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from url_utils import is_redirector, normalize_title, normalize_url, resolve_redirect
+
+DEFAULT_PROCESSED_DB = "processed_articles.db"
+LEGACY_PROCESSED_FILE = "processed_articles.txt"
+DEFAULT_RETENTION_DAYS = 365
+# Richieste contemporanee per risolvere i redirect di un gruppo di link
+DEFAULT_REDIRECT_WORKERS = 8
+
+
+class ProcessedArticleStore:
+    """
+    Insieme persistente di URL già processati.
+    La ricerca usa la chiave primaria (O(1) pratico), gli inserimenti sono atomici
+    e sicuri tra processi diversi (GUI e modalità --auto possono girare insieme).
+    Al primo avvio importa una sola volta il vecchio processed_articles.txt.
+    Oltre all'URL normalizzato indicizza anche il titolo, così la stessa notizia
+    non viene ripresa se ricompare con un link diverso; i redirect (feedburner,
+    shortener) vengono risolti una volta sola e memorizzati.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_PROCESSED_DB,
+                 legacy_path: Optional[str] = LEGACY_PROCESSED_FILE):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+        if legacy_path:
+            self.migrate_from_text(legacy_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed (
+                url_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                processed_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(processed)")}
+        if "title_key" not in columns:
+            conn.execute("ALTER TABLE processed ADD COLUMN title_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_at ON processed(processed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_title ON processed(title_key)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS redirects (
+                url_key TEXT PRIMARY KEY,
+                canonical_url TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    @staticmethod
+    def title_key(title: Optional[str]) -> Optional[str]:
+        normalized = normalize_title(title or "")
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest() if normalized else None
+
+    @staticmethod
+    def _original_url(article_url: str, entry: Optional[Dict[str, Any]]) -> str:
+        if entry is not None and entry.get("feedburner_origlink"):
+            return entry["feedburner_origlink"]
+        return article_url
+
+    def _known_redirect(self, url_key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT canonical_url FROM redirects WHERE url_key = ?", (url_key,)).fetchone()
+        return row[0] if row else None
+
+    def _save_redirects(self, resolved: Sequence[Tuple[str, str]]) -> None:
+        now = time.time()
+        self._connect().executemany(
+            "INSERT OR REPLACE INTO redirects (url_key, canonical_url, resolved_at) VALUES (?, ?, ?)",
+            [(url_key, normalize_url(final_url), now) for url_key, final_url in resolved],
+        )
+
+    def canonical_url(self, article_url: str, entry: Optional[Dict[str, Any]] = None) -> str:
+        """
+        URL canonico normalizzato: usa il link originale fornito dal feed se presente,
+        altrimenti risolve (una volta sola) i redirect dei servizi di inoltro.
+        """
+        article_url = self._original_url(article_url, entry)
+        if not article_url or not is_redirector(article_url):
+            return normalize_url(article_url)
+
+        url_key = normalize_url(article_url)
+        known = self._known_redirect(url_key)
+        if known is not None:
+            return known
+        self._save_redirects([(url_key, resolve_redirect(article_url))])
+        return self._known_redirect(url_key)
+
+    def canonical_urls(self, links: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+                       max_workers: int = DEFAULT_REDIRECT_WORKERS) -> List[str]:
+        """
+        Come canonical_url per una lista di (link, voce del feed): i redirect non ancora
+        noti vengono risolti in parallelo, al massimo 'max_workers' richieste alla volta,
+        invece di attendere il timeout di ciascuno in sequenza.
+        """
+        urls = [self._original_url(url, entry) for url, entry in links]
+        pending: Dict[str, str] = {}
+        for url in urls:
+            if url and is_redirector(url):
+                url_key = normalize_url(url)
+                if url_key not in pending and self._known_redirect(url_key) is None:
+                    pending[url_key] = url
+        if pending:
+            logging.info(f"Risoluzione di {len(pending)} redirect in parallelo")
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))),
+                                    thread_name_prefix="redirect") as pool:
+                self._save_redirects(list(zip(pending, pool.map(resolve_redirect, pending.values()))))
+        return [self.canonical_url(url) for url in urls]
+
+    def __contains__(self, article_url: object) -> bool:
+        if not isinstance(article_url, str) or not article_url:
+            return False
+        row = self._connect().execute(
+            "SELECT 1 FROM processed WHERE url_key = ?", (normalize_url(article_url),)
+        ).fetchone()
+        return row is not None
+
+    def contains_article(self, article_url: Optional[str], title: Optional[str] = None) -> bool:
+        """True se l'URL oppure il titolo risultano già processati"""
+        if article_url and article_url in self:
+            return True
+        key = self.title_key(title)
+        if key is None:
+            return False
+        row = self._connect().execute(
+            "SELECT 1 FROM processed WHERE title_key = ? LIMIT 1", (key,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def add(self, article_url: str, title: Optional[str] = None) -> bool:
+        """Registra l'URL (e il titolo); restituisce False se era già presente"""
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO processed (url_key, url, processed_at, title_key) VALUES (?, ?, ?, ?)",
+            (normalize_url(article_url), article_url, time.time(), self.title_key(title)),
+        )
+        return cursor.rowcount == 1
+
+    def migrate_from_text(self, legacy_path: str) -> int:
+        """Importa il vecchio file di testo una sola volta (transazione unica)"""
+        if not os.path.exists(legacy_path):
+            return 0
+        conn = self._connect()
+        marker = f"migrated:{os.path.basename(legacy_path)}"
+        if conn.execute("SELECT 1 FROM meta WHERE name = ?", (marker,)).fetchone():
+            return 0
+
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip()]
+
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Ricontrollo dentro la transazione: un altro processo potrebbe aver già migrato
+            if conn.execute("SELECT 1 FROM meta WHERE name = ?", (marker,)).fetchone():
+                conn.execute("ROLLBACK")
+                return 0
+            conn.executemany(
+                "INSERT OR IGNORE INTO processed (url_key, url, processed_at) VALUES (?, ?, ?)",
+                [(normalize_url(url), url, now) for url in urls],
+            )
+            conn.execute("INSERT INTO meta (name, value) VALUES (?, ?)", (marker, str(now)))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        logging.info(f"Migrati {len(urls)} URL da {legacy_path} a {self.db_path}")
+        return len(urls)
+
+    def compact(self, retention_days: float = DEFAULT_RETENTION_DAYS) -> int:
+        """Rimuove le voci più vecchie di 'retention_days' e recupera lo spazio su disco"""
+        conn = self._connect()
+        cutoff = time.time() - retention_days * 24 * 3600
+        removed = conn.execute("DELETE FROM processed WHERE processed_at < ?", (cutoff,)).rowcount
+        conn.execute("DELETE FROM redirects WHERE resolved_at < ?", (cutoff,))
+        if removed:
+            logging.info(f"Compattazione {self.db_path}: rimosse {removed} voci")
+            try:
+                conn.execute("VACUUM")
+            except sqlite3.OperationalError as e:
+                # Un altro processo sta leggendo: lo spazio verrà recuperato alla prossima compattazione
+                logging.warning(f"VACUUM di {self.db_path} rimandato: {e}")
+        return removed
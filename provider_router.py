@@ -0,0 +1,209 @@
+# provider_router.py - Scelta del provider di testo per latenza, errori e circuit breaker
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Type
+
+DEFAULT_WINDOW = 50
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN_SECONDS = 120.0
+DEFAULT_HEDGE_DELAY = 8.0
+MIN_LATENCY_SAMPLES = 3
+
+ProviderFunc = Callable[[str], Optional[str]]
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class ProviderHealth:
+    """
+    Statistiche mobili di un provider (latenze delle risposte riuscite ed esiti)
+    e circuit breaker: dopo 'failure_threshold' errori consecutivi il provider viene
+    saltato per 'cooldown_seconds', poi riceve una sola richiesta di prova.
+    """
+
+    def __init__(self, name: str, window: int = DEFAULT_WINDOW,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def record(self, success: bool, latency: float) -> None:
+        with self._lock:
+            self._outcomes.append(success)
+            self._trial_in_progress = False
+            if success:
+                self._latencies.append(latency)
+                self._consecutive_failures = 0
+                if self._opened_at is not None:
+                    logging.info(f"Provider {self.name} di nuovo disponibile (circuito chiuso)")
+                self._opened_at = None
+            else:
+                self._consecutive_failures += 1
+                if self._opened_at is not None or self._consecutive_failures >= self.failure_threshold:
+                    if self._opened_at is None:
+                        logging.warning(f"Provider {self.name}: {self._consecutive_failures} errori consecutivi, "
+                                        f"escluso per {self.cooldown_seconds:.0f}s (circuito aperto)")
+                    self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Libera la richiesta di prova senza registrare un esito (risposta dalla cache, annullamento)"""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def is_available(self) -> bool:
+        """True se il circuito è chiuso o l'attesa è finita (senza riservare la richiesta di prova)"""
+        with self._lock:
+            return self._opened_at is None or (
+                time.monotonic() - self._opened_at >= self.cooldown_seconds and not self._trial_in_progress)
+
+    def allow_request(self) -> bool:
+        """False se il circuito è aperto; a fine attesa lascia passare una sola richiesta di prova"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown_seconds or self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return (self._outcomes.count(False) / len(self._outcomes)) if self._outcomes else 0.0
+
+    def latency_percentiles(self) -> Tuple[Optional[float], Optional[float]]:
+        """(p50, p95) delle risposte riuscite, None se i campioni sono troppo pochi"""
+        with self._lock:
+            values = sorted(self._latencies)
+        if len(values) < MIN_LATENCY_SAMPLES:
+            return None, None
+        return _percentile(values, 0.5), _percentile(values, 0.95)
+
+    def snapshot(self) -> Dict[str, object]:
+        p50, p95 = self.latency_percentiles()
+        return {"p50": p50, "p95": p95, "error_rate": round(self.error_rate, 3),
+                "circuit_open": self._opened_at is not None}
+
+
+class ProviderRouter:
+    """
+    Prova i provider dal più veloce al più lento tra quelli sani (p50 corretto per il
+    tasso di errore; quelli senza statistiche mantengono l'ordine di preferenza).
+    Con 'hedge' (generazioni interattive) se il primo non risponde entro il suo p95
+    parte in parallelo il secondo e vince la prima risposta valida.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS, hedge_delay: float = DEFAULT_HEDGE_DELAY):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_delay = hedge_delay
+        self._health: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="provider-hedge")
+
+    def health(self, name: str) -> ProviderHealth:
+        with self._lock:
+            health = self._health.get(name)
+            if health is None:
+                health = ProviderHealth(name, self.window, self.failure_threshold, self.cooldown_seconds)
+                self._health[name] = health
+            return health
+
+    def rank(self, providers: Sequence[Tuple[str, ProviderFunc]]) -> List[Tuple[str, ProviderFunc]]:
+        """Provider con il circuito chiuso, ordinati per latenza attesa"""
+        def expected_latency(item: Tuple[int, Tuple[str, ProviderFunc]]) -> Tuple[float, int]:
+            index, (name, _) = item
+            health = self.health(name)
+            p50, _ = health.latency_percentiles()
+            if p50 is None:
+                return 0.0, index
+            return p50 / max(0.05, 1.0 - health.error_rate), index
+
+        ordered = [provider for _, provider in sorted(enumerate(providers), key=expected_latency)]
+        return [(name, func) for name, func in ordered if self.health(name).is_available()]
+
+    def _call(self, name: str, func: ProviderFunc, prompt: str,
+              abort_on: Tuple[Type[BaseException], ...] = ()) -> Optional[str]:
+        health = self.health(name)
+        if not health.allow_request():
+            return None
+        start = time.monotonic()
+        try:
+            result = func(prompt)
+        except abort_on:
+            # Annullata dall'utente: non è un errore del provider
+            health.release_trial()
+            raise
+        except Exception as e:
+            logging.error(f"Errore del provider {name}: {e}")
+            result = None
+        if getattr(result, "from_cache", False):
+            # Una risposta dalla cache non dice nulla sulla latenza né sullo stato del provider
+            health.release_trial()
+            return result
+        health.record(bool(result), time.monotonic() - start)
+        return result
+
+    def _hedge_delay_for(self, name: str) -> float:
+        _, p95 = self.health(name).latency_percentiles()
+        return p95 if p95 is not None else self.hedge_delay
+
+    def generate(self, prompt: str, providers: Sequence[Tuple[str, ProviderFunc]],
+                 hedge: bool = False, abort_on: Tuple[Type[BaseException], ...] = ()) -> Optional[str]:
+        """
+        Restituisce la prima risposta valida o None se tutti i provider falliscono.
+        Le eccezioni in 'abort_on' (es. annullamento) interrompono la generazione invece di
+        contare come errore del provider.
+        """
+        candidates = self.rank(providers)
+        if not candidates:
+            logging.warning("Nessun provider di testo disponibile (circuiti aperti o nessuna API key)")
+            return None
+
+        if not hedge:
+            for name, func in candidates:
+                logging.info(f"Generazione testo con {name}")
+                result = self._call(name, func, prompt, abort_on)
+                if result:
+                    return result
+            return None
+
+        # Richieste "hedged": il provider successivo parte se il precedente supera il suo p95
+        pending: Dict[Future, str] = {}
+        remaining = list(candidates)
+        while remaining or pending:
+            if remaining:
+                name, func = remaining.pop(0)
+                logging.info(f"Generazione testo con {name} (hedged)")
+                pending[self._executor.submit(self._call, name, func, prompt, abort_on)] = name
+                timeout = self._hedge_delay_for(name) if remaining else None
+            else:
+                timeout = None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                result = future.result()
+                if result:
+                    # Le richieste ancora in corso terminano in background e aggiornano le statistiche
+                    return result
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            names = list(self._health)
+        return {name: self.health(name).snapshot() for name in names}
@@ -0,0 +1,114 @@
+# response_cache.py - Cache persistente delle risposte dei modelli (chiave: hash di modello, prompt e parametri)
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from disk_cache import DiskCache
+
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join("cache", "llm_responses.db")
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_RESPONSE_CACHE_TTL = 3 * 24 * 3600
+RESPONSE_NAMESPACE = "llm_response"
+
+# off: nessuna cache; on: usa le risposte non scadute e salva le nuove;
+# replay: usa qualsiasi risposta salvata (anche scaduta) e non chiama mai le API
+CACHE_MODES = ("off", "on", "replay")
+CACHE_MODE_ENV = "LLM_CACHE_MODE"
+DEFAULT_CACHE_MODE = "on"
+
+
+class ResponseCacheMiss(Exception):
+    """In modalità replay la risposta richiesta non è in cache"""
+
+
+class CachedText(str):
+    """Risposta letta dalla cache: chi misura le latenze dei provider la riconosce e la ignora"""
+    from_cache = True
+
+
+def response_key(provider: str, model: str, messages: Any, params: Optional[Dict[str, Any]] = None) -> str:
+    """Hash stabile di provider, modello, messaggi e parametri di generazione"""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "params": params or {}},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Memorizza le risposte testuali dei modelli, così una riesecuzione dopo un
+    errore (es. salvataggio del DOCX fallito) non paga di nuovo la stessa generazione.
+    La modalità si sceglie con la configurazione o con la variabile LLM_CACHE_MODE.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_RESPONSE_CACHE_PATH,
+                 max_bytes: int = DEFAULT_RESPONSE_CACHE_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_RESPONSE_CACHE_TTL,
+                 mode: str = DEFAULT_CACHE_MODE):
+        mode = os.environ.get(CACHE_MODE_ENV, mode).strip().lower()
+        if mode not in CACHE_MODES:
+            logging.warning(f"Modalità cache LLM non valida '{mode}', uso '{DEFAULT_CACHE_MODE}'")
+            mode = DEFAULT_CACHE_MODE
+        self.mode = mode
+        self.cache = DiskCache(db_path, max_bytes=max_bytes, ttl_seconds=ttl_seconds) if mode != "off" else None
+
+    def get(self, key: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        # In replay le risposte non scadono: le riesecuzioni e i test restano gratuiti
+        ttl = None if self.mode == "replay" else self.cache.ttl_seconds
+        return self.cache.get(key, namespace=RESPONSE_NAMESPACE, ttl_seconds=ttl)
+
+    def put(self, key: str, text: Optional[str]) -> None:
+        if self.cache is not None and text:
+            self.cache.set(key, text, namespace=RESPONSE_NAMESPACE)
+
+    def get_or_generate(self, provider: str, model: str, messages: Any,
+                        params: Optional[Dict[str, Any]], generate: Callable[[], Optional[str]],
+                        refresh: bool = False) -> Optional[str]:
+        """
+        Restituisce la risposta in cache oppure chiama 'generate' e ne salva il risultato.
+        Con 'refresh' (rigenerazione chiesta dall'utente) la cache viene solo aggiornata,
+        tranne in replay dove resta l'unica fonte.
+        """
+        key = response_key(provider, model, messages, params)
+        cached = self.get(key) if not refresh or self.mode == "replay" else None
+        if cached is not None:
+            logging.info(f"Risposta {provider}/{model} dalla cache ({key[:12]})")
+            return CachedText(cached)
+        if self.mode == "replay":
+            raise ResponseCacheMiss(f"Risposta {provider}/{model} non presente in cache ({key[:12]})")
+        text = generate()
+        self.put(key, text)
+        return text
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def configure_response_cache(settings: Dict[str, Any]) -> ResponseCache:
+    """Ricrea la cache condivisa dalla sezione 'llm_cache' della configurazione"""
+    global _default_cache
+    cache = ResponseCache(
+        db_path=settings.get("db_path", DEFAULT_RESPONSE_CACHE_PATH),
+        max_bytes=int(settings.get("max_mb", DEFAULT_RESPONSE_CACHE_MAX_BYTES / (1024 * 1024)) * 1024 * 1024),
+        ttl_seconds=settings.get("ttl_hours", DEFAULT_RESPONSE_CACHE_TTL / 3600) * 3600,
+        mode=settings.get("mode", DEFAULT_CACHE_MODE),
+    )
+    with _default_cache_lock:
+        _default_cache = cache
+    return cache
+
+
+def get_response_cache() -> ResponseCache:
+    """Istanza condivisa della cache (creata al primo utilizzo)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,90 @@
+# run_window.py - Finestra Tkinter che mostra in diretta l'output di un ProcessRunner
+import tkinter as tk
+from tkinter import scrolledtext
+from typing import Any, Callable, Dict, Optional
+
+from process_runner import RUN_ALREADY_ACTIVE_EXIT_CODE, ProcessRunner, format_progress
+
+RUN_POLL_MS = 100
+MAX_EVENTS_PER_POLL = 500
+MAX_OUTPUT_LINES = 5000
+
+
+def open_run_window(parent, title: str, runner: ProcessRunner,
+                    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    on_finished: Optional[Callable[[int, bool], None]] = None) -> tk.Toplevel:
+    """
+    Finestra con l'output del processo (già avviato) riga per riga, lo stato letto dagli
+    eventi di avanzamento e un pulsante per annullare. on_progress(evento) e
+    on_finished(codice di uscita, annullato) sono chiamate nel thread della GUI, anche
+    se la finestra è stata chiusa nel frattempo.
+    """
+    window = tk.Toplevel(parent)
+    window.title(title)
+    window.geometry("750x450")
+
+    status_label = tk.Label(window, text="Avvio in corso...", font=("Arial", 10))
+    status_label.pack(pady=(10, 0))
+
+    output_text = scrolledtext.ScrolledText(window, font=("Consolas", 9), bg="black", fg="white")
+    output_text.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
+
+    buttons_frame = tk.Frame(window)
+    buttons_frame.pack(pady=5)
+
+    def cancel():
+        runner.cancel()
+        status_label.config(text="Annullamento in corso...")
+        cancel_button.config(state=tk.DISABLED)
+
+    cancel_button = tk.Button(buttons_frame, text="Annulla", command=cancel)
+    cancel_button.pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons_frame, text="Chiudi", command=window.destroy).pack(side=tk.LEFT, padx=5)
+
+    def append_lines(lines):
+        at_bottom = output_text.yview()[1] >= 0.999
+        output_text.insert(tk.END, "\n".join(lines) + "\n")
+        line_count = int(output_text.index("end-1c").split(".")[0])
+        if line_count > MAX_OUTPUT_LINES:
+            output_text.delete(1.0, f"{line_count - MAX_OUTPUT_LINES + 1}.0")
+        if at_bottom:
+            output_text.see(tk.END)
+
+    def finish(returncode):
+        if runner.cancelled:
+            message = "Esecuzione annullata"
+        elif returncode == 0:
+            message = "✅ Esecuzione completata"
+        elif returncode == RUN_ALREADY_ACTIVE_EXIT_CODE:
+            message = "⚠️ Un'altra esecuzione era già in corso"
+        else:
+            message = f"❌ Esecuzione terminata con codice {returncode}"
+        if window.winfo_exists():
+            status_label.config(text=message)
+            cancel_button.config(state=tk.DISABLED)
+        if on_finished:
+            on_finished(returncode, runner.cancelled)
+
+    def poll():
+        lines = []
+        exit_code = None
+        for kind, payload in runner.drain(MAX_EVENTS_PER_POLL):
+            if kind == "line":
+                lines.append(payload)
+            elif kind == "progress":
+                if window.winfo_exists() and not runner.cancelled:
+                    status_label.config(text=format_progress(payload))
+                if on_progress:
+                    on_progress(payload)
+            elif kind == "exit":
+                exit_code = payload
+        # La coda va svuotata anche a finestra chiusa, altrimenti l'output si accumula
+        if lines and window.winfo_exists():
+            append_lines(lines)
+        if exit_code is not None:
+            finish(exit_code)
+        else:
+            parent.after(RUN_POLL_MS, poll)
+
+    parent.after(RUN_POLL_MS, poll)
+    return window
@@ -0,0 +1,377 @@
+# scheduler_daemon.py - Processo residente che esegue l'automazione agli orari di automation_config.json
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from process_runner import RunLock, python_executable
+
+DEFAULT_CONFIG_PATH = "automation_config.json"
+DEFAULT_STATE_PATH = os.path.join("cache", "scheduler_state.json")
+# Tenuto dal demone per tutta la sua vita: dice al pannello se è attivo e impedisce una seconda istanza
+DEFAULT_DAEMON_LOCK_PATH = os.path.join("cache", "scheduler.lock")
+# File di controllo scritti dal pannello e consumati dal demone
+RUN_NOW_PATH = os.path.join("cache", "scheduler_run_now")
+STOP_PATH = os.path.join("cache", "scheduler_stop")
+DEFAULT_POLL_SECONDS = 5.0
+# Un'esecuzione persa (PC spento o in sospensione) viene recuperata solo se è di non più di tante ore fa
+DEFAULT_CATCH_UP_HOURS = 12.0
+LOGS_DIR = "logs"
+
+SLOT_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def parse_execution_times(value: Union[str, Iterable[str], None]) -> List[dt_time]:
+    """Orari 'HH:MM' da una stringa (anche più orari separati da virgola) o da una lista"""
+    items = value.split(",") if isinstance(value, str) else list(value or [])
+    times = set()
+    for item in items:
+        try:
+            times.add(datetime.strptime(str(item).strip(), "%H:%M").time())
+        except ValueError:
+            logging.warning(f"Orario di esecuzione non valido ignorato: '{item}'")
+    return sorted(times)
+
+
+def slot_key(slot: datetime) -> str:
+    return slot.strftime(SLOT_FORMAT)
+
+
+def latest_slot(now: datetime, times: List[dt_time]) -> Optional[datetime]:
+    """Ultimo orario programmato non successivo a 'now' (oggi o ieri)"""
+    candidates = [datetime.combine(day, slot_time)
+                  for day in (now.date(), now.date() - timedelta(days=1)) for slot_time in times]
+    past = [slot for slot in candidates if slot <= now]
+    return max(past) if past else None
+
+
+def next_slot(now: datetime, times: List[dt_time]) -> Optional[datetime]:
+    """Primo orario programmato successivo a 'now'"""
+    candidates = [datetime.combine(day, slot_time)
+                  for day in (now.date(), now.date() + timedelta(days=1)) for slot_time in times]
+    future = [slot for slot in candidates if slot > now]
+    return min(future) if future else None
+
+
+def due_slot(now: datetime, times: List[dt_time], last_slot: Optional[str],
+             catch_up_hours: float = DEFAULT_CATCH_UP_HOURS) -> Optional[datetime]:
+    """
+    Orario da eseguire adesso, o None. Più orari persi contano come una sola esecuzione
+    (l'ultimo); uno più vecchio di 'catch_up_hours' non viene recuperato.
+    """
+    slot = latest_slot(now, times)
+    if slot is None or slot_key(slot) == last_slot:
+        return None
+    if last_slot and slot_key(slot) < last_slot:
+        return None
+    if now - slot > timedelta(hours=catch_up_hours):
+        return None
+    return slot
+
+
+def load_state(state_path: str = DEFAULT_STATE_PATH) -> Dict[str, Any]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Stato dello scheduler illeggibile ({state_path}): {e}")
+        return {}
+
+
+def save_state(state: Dict[str, Any], state_path: str = DEFAULT_STATE_PATH) -> None:
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    # Scrittura atomica: il pannello non legge mai un file a metà
+    os.replace(temp_path, state_path)
+
+
+# --- Lato pannello di controllo ---
+
+def is_daemon_running(lock_path: str = DEFAULT_DAEMON_LOCK_PATH) -> bool:
+    return RunLock(lock_path).is_held()
+
+
+def daemon_status(state_path: str = DEFAULT_STATE_PATH,
+                  lock_path: str = DEFAULT_DAEMON_LOCK_PATH) -> Dict[str, Any]:
+    """Stato salvato dal demone più 'running', letto dal lock e non da un pid che potrebbe essere vecchio"""
+    status = load_state(state_path)
+    status["running"] = is_daemon_running(lock_path)
+    return status
+
+
+def _touch(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(datetime.now().isoformat(timespec="seconds"))
+
+
+def request_run_now() -> None:
+    """Chiede al demone un'esecuzione immediata (anche se l'automazione è disabilitata)"""
+    _touch(RUN_NOW_PATH)
+
+
+def request_stop() -> None:
+    """Chiede al demone di terminare (dopo l'eventuale esecuzione in corso)"""
+    _touch(STOP_PATH)
+
+
+def start_daemon_process(base_dir: Optional[str] = None) -> subprocess.Popen:
+    """Avvia il demone in un processo separato che sopravvive alla chiusura del pannello"""
+    base_dir = base_dir or os.getcwd()
+    python = python_executable(base_dir)
+    # Su Windows pythonw evita la finestra di console
+    pythonw = os.path.join(os.path.dirname(python), "pythonw.exe")
+    if os.name == "nt" and os.path.exists(pythonw):
+        python = pythonw
+    options: Dict[str, Any] = {}
+    if os.name == "nt":
+        options["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options["start_new_session"] = True
+    if os.path.exists(STOP_PATH):
+        os.remove(STOP_PATH)  # Una richiesta di stop rimasta da prima fermerebbe subito il nuovo demone
+    return subprocess.Popen([python, os.path.join(base_dir, "scheduler_daemon.py")],
+                            cwd=base_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, **options)
+
+
+# --- Demone ---
+
+class SchedulerDaemon:
+    """
+    Resta in esecuzione e lancia l'automazione agli orari di 'schedule.execution_time'
+    quando 'schedule.enabled' è attivo. Import, client delle API (con i loro pool di
+    connessioni) e cache restano caldi tra un'esecuzione e l'altra; la configurazione
+    viene riletta quando il file cambia. Gli orari persi mentre il demone è attivo (es. PC
+    in sospensione) vengono recuperati entro 'scheduler.catch_up_hours'.
+    """
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, state_path: str = DEFAULT_STATE_PATH,
+                 lock_path: str = DEFAULT_DAEMON_LOCK_PATH):
+        self.config_path = config_path
+        self.state_path = state_path
+        self.lock = RunLock(lock_path)
+        self.config: Dict[str, Any] = {}
+        self.times: List[dt_time] = []
+        self._config_mtime: Optional[float] = None
+        self._log_file: Optional[str] = None
+        self._log_handler: Optional[logging.Handler] = None
+        self._automation = None
+        self.state = load_state(state_path)
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self.config.get("scheduler", {})
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get("schedule", {}).get("enabled", True))
+
+    def setup_logging(self) -> None:
+        """Log nello stesso file giornaliero dell'automazione, cambiato a mezzanotte"""
+        log_file = os.path.join(LOGS_DIR, f"enhanced_automation_{datetime.now().strftime('%Y%m%d')}.log")
+        if log_file == self._log_file:
+            return
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        root = logging.getLogger()
+        if self._log_handler is not None:
+            root.removeHandler(self._log_handler)
+            self._log_handler.close()
+        elif not root.handlers:
+            root.setLevel(logging.INFO)
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            root.addHandler(console)
+        self._log_handler = logging.FileHandler(log_file, encoding="utf-8")
+        self._log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        root.addHandler(self._log_handler)
+        self._log_file = log_file
+
+    def reload_config_if_changed(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            return False
+        if mtime == self._config_mtime:
+            return False
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            # File salvato a metà o non valido: si tiene la configurazione precedente
+            logging.error(f"Configurazione non valida, resta quella precedente: {e}")
+            return False
+        first_load = self._config_mtime is None
+        self._config_mtime = mtime
+        self.config = config
+        self.times = parse_execution_times(config.get("schedule", {}).get("execution_time", "08:00"))
+        self.configure_caches()
+        orari = ", ".join(slot_time.strftime("%H:%M") for slot_time in self.times) or "nessuno"
+        logging.info(f"Configurazione {'caricata' if first_load else 'ricaricata'}: orari {orari}, "
+                     f"automazione {'attiva' if self.enabled else 'disattiva'}")
+        self.save_state()
+        return True
+
+    def configure_caches(self) -> None:
+        """Cache condivise ricreate solo quando cambia la configurazione: tra un'esecuzione e l'altra restano aperte"""
+        from image_cache import configure_image_cache
+        from response_cache import configure_response_cache
+
+        configure_response_cache(self.config.get("llm_cache", {}))
+        configure_image_cache(self.config.get("image_cache", {}))
+
+    def warm_up(self) -> None:
+        """Import pesanti e client delle API una volta sola, non a ogni esecuzione"""
+        import daily_ai_automation
+        from api_clients import get_anthropic_client, get_http_client, get_openai_client
+
+        self._automation = daily_ai_automation
+        get_http_client()
+        if os.getenv("CLAUDE_API_KEY"):
+            get_anthropic_client(os.getenv("CLAUDE_API_KEY"))
+        if os.getenv("OPENAI_API_KEY"):
+            get_openai_client(os.getenv("OPENAI_API_KEY"))
+        logging.info("Scheduler pronto: moduli e client API inizializzati")
+
+    def skip_missed_slots(self, now: Optional[datetime] = None) -> None:
+        """
+        Al primo avvio (nessun orario già eseguito) l'ultimo orario passato conta come
+        fatto: il recupero riguarda solo gli orari persi mentre il demone era attivo.
+        """
+        if self.state.get("last_slot"):
+            return
+        slot = latest_slot(now or datetime.now(), self.times)
+        if slot is not None:
+            logging.info(f"Primo avvio: l'orario {slot.strftime('%d/%m %H:%M')} non viene recuperato")
+            self.save_state(last_slot=slot_key(slot))
+
+    def save_state(self, **updates: Any) -> None:
+        self.state.update(updates)
+        now = datetime.now()
+        upcoming = next_slot(now, self.times) if self.enabled else None
+        self.state.update({
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "execution_times": [slot_time.strftime("%H:%M") for slot_time in self.times],
+            "next_run": upcoming.isoformat(timespec="minutes") if upcoming else None,
+            "updated_at": now.isoformat(timespec="seconds"),
+        })
+        try:
+            save_state(self.state, self.state_path)
+        except OSError as e:
+            logging.error(f"Impossibile salvare lo stato dello scheduler: {e}")
+
+    def run_automation(self, reason: str, slot: Optional[datetime] = None) -> bool:
+        """
+        Esegue l'automazione nel processo del demone; False se un'altra esecuzione è in corso.
+        In quel caso l'orario conta comunque come fatto: l'esecuzione già avviata lo copre e,
+        rilasciato il lock, non ne deve partire una seconda.
+        """
+        run_lock = RunLock()
+        if not run_lock.acquire():
+            logging.warning(f"Esecuzione ({reason}) saltata: l'automazione è già in corso in un altro processo")
+            if slot is not None:
+                self.save_state(last_slot=slot_key(slot))
+            return False
+        started = datetime.now()
+        self.save_state(running=True, current_run={"reason": reason, "started_at": started.isoformat(timespec="seconds")})
+        posts: List[str] = []
+        error = None
+        try:
+            logging.info(f"=== Scheduler: avvio esecuzione ({reason}) ===")
+            # Cache già configurate dal demone; gli errori risalgono fino a 'last_run'
+            posts = self._automation.main(batch=bool(self.settings.get("batch", False)),
+                                          raise_errors=True, configure_caches=False) or []
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Errore nell'esecuzione programmata: {e}")
+        finally:
+            run_lock.release()
+            finished = datetime.now()
+            last_run = {
+                "reason": reason,
+                "started_at": started.isoformat(timespec="seconds"),
+                "finished_at": finished.isoformat(timespec="seconds"),
+                "duration_seconds": round((finished - started).total_seconds(), 1),
+                "posts": len(posts),
+                "error": error,
+            }
+            updates: Dict[str, Any] = {"running": False, "current_run": None, "last_run": last_run}
+            if slot is not None:
+                updates["last_slot"] = slot_key(slot)
+            self.save_state(**updates)
+            logging.info(f"=== Scheduler: esecuzione terminata in {last_run['duration_seconds']:.0f}s, "
+                         f"{len(posts)} post ===")
+        return True
+
+    def tick(self, now: Optional[datetime] = None) -> None:
+        """Un giro del ciclo: file di controllo, configurazione, orario programmato"""
+        now = now or datetime.now()
+        self.setup_logging()
+        self.reload_config_if_changed()
+
+        if os.path.exists(RUN_NOW_PATH):
+            # La richiesta viene consumata anche se un'altra esecuzione è in corso: quella la soddisfa
+            self.run_automation("richiesta dal pannello")
+            os.remove(RUN_NOW_PATH)
+            return
+
+        if not self.enabled:
+            return
+        slot = due_slot(now, self.times, self.state.get("last_slot"),
+                        self.settings.get("catch_up_hours", DEFAULT_CATCH_UP_HOURS))
+        if slot is None:
+            return
+        late_minutes = (now - slot).total_seconds() / 60
+        reason = f"orario {slot.strftime('%H:%M')}"
+        if late_minutes > 5:
+            reason = f"recupero dell'orario {slot.strftime('%d/%m %H:%M')} ({late_minutes:.0f} min di ritardo)"
+        self.run_automation(reason, slot)
+
+    def run_forever(self) -> int:
+        if not self.lock.acquire():
+            print("Lo scheduler è già in esecuzione", file=sys.stderr)
+            return 1
+        try:
+            self.setup_logging()
+            logging.info(f"=== Avvio scheduler (PID {os.getpid()}) ===")
+            self.reload_config_if_changed()
+            self.skip_missed_slots()
+            self.warm_up()
+            self.save_state(started_at=datetime.now().isoformat(timespec="seconds"), running=False)
+            while not os.path.exists(STOP_PATH):
+                try:
+                    self.tick()
+                except Exception as e:
+                    # Un errore in un giro non deve fermare il demone
+                    logging.error(f"Errore nel ciclo dello scheduler: {e}")
+                time.sleep(self.settings.get("poll_seconds", DEFAULT_POLL_SECONDS))
+            os.remove(STOP_PATH)
+            logging.info("=== Scheduler fermato su richiesta ===")
+            return 0
+        except KeyboardInterrupt:
+            logging.info("=== Scheduler interrotto ===")
+            return 0
+        finally:
+            self.save_state(running=False, current_run=None, stopped_at=datetime.now().isoformat(timespec="seconds"))
+            self.lock.release()
+
+
+if __name__ == "__main__":
+    # Eseguito dalla cartella del progetto, come gli script .bat
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(SchedulerDaemon().run_forever())
@@ -0,0 +1,96 @@
+# stream_parser.py - Parser incrementale delle sezioni [POST] / [IMAGE_PROMPT] in streaming
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_SECTIONS = ("POST", "IMAGE_PROMPT")
+
+SectionCallback = Callable[[str, str], None]
+
+
+class SectionStreamParser:
+    """
+    Riceve la risposta del modello a pezzi (come arriva dallo streaming) e
+    riconosce i tag di sezione anche se spezzati tra due pezzi.
+    Ogni sezione viene consegnata a 'on_section' appena è completa, cioè quando
+    inizia la successiva o quando lo stream termina; 'on_text' riceve il testo
+    man mano che arriva, per mostrare l'avanzamento.
+    Il testo prima del primo tag appartiene alla prima sezione, come nel vecchio
+    parsing con split().
+    """
+
+    def __init__(self, sections: Sequence[str] = DEFAULT_SECTIONS,
+                 on_section: Optional[SectionCallback] = None,
+                 on_text: Optional[SectionCallback] = None):
+        self._tags = {f"[{name}]": name for name in sections}
+        self._on_section = on_section
+        self._on_text = on_text
+        self._buffer = ""
+        self._current = sections[0]
+        self._opened = False
+        self._parts: List[str] = []
+        self.sections: Dict[str, str] = {}
+        self.closed = False
+
+    def _append(self, text: str) -> None:
+        if text:
+            self._parts.append(text)
+            if self._on_text:
+                self._on_text(self._current, text)
+
+    def _finish_current(self) -> Tuple[str, str]:
+        text = "".join(self._parts).strip()
+        self._parts = []
+        self.sections[self._current] = text
+        if self._on_section:
+            self._on_section(self._current, text)
+        return self._current, text
+
+    def _next_tag(self) -> Optional[Tuple[int, str]]:
+        found = None
+        for tag in self._tags:
+            position = self._buffer.find(tag)
+            if position != -1 and (found is None or position < found[0]):
+                found = (position, tag)
+        return found
+
+    def _safe_length(self) -> int:
+        """Quanta parte del buffer si può emettere senza rischiare di spezzare un tag"""
+        start = self._buffer.rfind("[")
+        if start == -1:
+            return len(self._buffer)
+        tail = self._buffer[start:]
+        if any(tag.startswith(tail) for tag in self._tags):
+            return start
+        return len(self._buffer)
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Aggiunge un pezzo di testo; restituisce le sezioni completate da questo pezzo"""
+        completed: List[Tuple[str, str]] = []
+        self._buffer += chunk
+        while True:
+            found = self._next_tag()
+            if found is None:
+                break
+            position, tag = found
+            self._append(self._buffer[:position])
+            self._buffer = self._buffer[position + len(tag):]
+            name = self._tags[tag]
+            if name == self._current and not self._opened:
+                # Tag di apertura della prima sezione: il preambolo resta nella sezione
+                self._opened = True
+                continue
+            completed.append(self._finish_current())
+            self._current = name
+            self._opened = True
+        safe = self._safe_length()
+        self._append(self._buffer[:safe])
+        self._buffer = self._buffer[safe:]
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Fine dello stream: completa l'ultima sezione"""
+        if self.closed:
+            return []
+        self.closed = True
+        self._append(self._buffer)
+        self._buffer = ""
+        return [self._finish_current()]
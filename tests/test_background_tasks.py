@@ -0,0 +1,92 @@
+# test_background_tasks.py - Runner delle attività della GUI con una finta radice Tk
+import threading
+
+from background_tasks import STATUS_CANCELLED, STATUS_DONE, BackgroundTaskRunner
+
+
+class FakeRoot:
+    """Sostituto di Tk: le callback di after vengono eseguite a mano dal test"""
+
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    def after(self, _ms, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run_pending(self):
+        callbacks, self.pending = list(self.pending.values()), {}
+        for callback in callbacks:
+            callback()
+
+
+def drain_until(root, condition, timeout=5.0):
+    waiter = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        root.run_pending()
+        if condition():
+            return True
+        waiter.wait(0.01)
+    return False
+
+
+def test_finished_tasks_leave_the_runner():
+    root = FakeRoot()
+    updates = []
+    runner = BackgroundTaskRunner(root, max_workers=2, on_task_update=lambda handle: updates.append(handle.status))
+    results = []
+    handle = runner.submit("somma", lambda _handle, a, b: a + b, 2, 3, on_done=results.append)
+    assert drain_until(root, lambda: handle.status == STATUS_DONE)
+    assert results == [5]
+    assert runner.tasks == []
+    assert updates[-1] == STATUS_DONE
+    runner.shutdown()
+
+
+def test_worker_threads_are_daemon():
+    root = FakeRoot()
+    started = threading.Event()
+    threads = []
+
+    def work(_handle):
+        threads.append(threading.current_thread())
+        started.set()
+
+    runner = BackgroundTaskRunner(root, max_workers=1)
+    runner.submit("thread", work)
+    assert started.wait(5)
+    assert threads[0].daemon
+    runner.shutdown()
+
+
+def test_shutdown_cancels_queued_tasks_and_stops_running_ones():
+    root = FakeRoot()
+    running = threading.Event()
+    stopped = threading.Event()
+    queued_ran = []
+
+    def long_task(handle):
+        running.set()
+        while True:
+            handle.check_cancelled()
+            threading.Event().wait(0.01)
+
+    runner = BackgroundTaskRunner(root, max_workers=1)
+    first = runner.submit("lunga", long_task, on_cancelled=stopped.set)
+    second = runner.submit("in coda", lambda _handle: queued_ran.append(1))
+    assert running.wait(5)
+    runner.shutdown()
+    assert first.cancelled and second.cancelled
+    assert second.future.cancelled()
+    first.future.result(timeout=5)
+    # Dopo la chiusura il drenaggio non è più pianificato: si consegnano a mano gli ultimi eventi
+    assert root.pending == {}
+    runner._drain()
+    assert first.status == STATUS_CANCELLED and second.status == STATUS_CANCELLED
+    assert stopped.is_set()
+    assert queued_ran == []
@@ -0,0 +1,151 @@
+# test_batch_runner.py - BatchRunner contro un finto endpoint Batch API di OpenAI
+import json
+import re
+from http.server import BaseHTTPRequestHandler
+
+import openai
+import pytest
+
+import batch_runner
+from batch_runner import BatchRunner, load_batch_state
+
+
+class FakeBatchAPI(BaseHTTPRequestHandler):
+    """Implementa il minimo di /v1/files e /v1/batches usato da BatchRunner"""
+
+    protocol_version = "HTTP/1.1"
+    status = "completed"
+    outputs = {}   # custom_id -> testo del post
+    errors = []    # custom_id presenti solo nel file degli errori
+    submitted = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _batch(self):
+        cls = type(self)
+        return {
+            "id": "batch_1", "object": "batch", "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-in", "completion_window": "24h", "created_at": 0,
+            "status": cls.status,
+            "output_file_id": "file-out" if cls.outputs else None,
+            "error_file_id": "file-err" if cls.errors else None,
+            "request_counts": {"total": len(cls.submitted), "completed": len(cls.outputs),
+                               "failed": len(cls.errors)},
+        }
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            type(self).submitted = re.findall(r'"custom_id": "([^"]+)"', body.decode("utf-8", "replace"))
+            self._send({"id": "file-in", "object": "file", "bytes": len(body), "created_at": 0,
+                        "filename": "batch_input.jsonl", "purpose": "batch", "status": "processed"})
+        else:
+            self._send(self._batch())
+
+    def do_GET(self):
+        cls = type(self)
+        if self.path.endswith("/file-out/content"):
+            lines = [{"custom_id": custom_id, "response": {"status_code": 200, "body": {
+                "choices": [{"message": {"content": text}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5}}}}
+                for custom_id, text in cls.outputs.items()]
+        elif self.path.endswith("/file-err/content"):
+            lines = [{"custom_id": custom_id, "response": {"status_code": 400, "body": {}},
+                      "error": {"message": "invalid request"}} for custom_id in cls.errors]
+        else:
+            self._send(self._batch())
+            return
+        self._send("\n".join(json.dumps(line) for line in lines).encode("utf-8"), "application/octet-stream")
+
+
+@pytest.fixture
+def fake_api(local_server, monkeypatch):
+    FakeBatchAPI.status = "completed"
+    FakeBatchAPI.outputs = {}
+    FakeBatchAPI.errors = []
+    FakeBatchAPI.submitted = []
+    base_url = local_server(FakeBatchAPI)
+    client = openai.OpenAI(api_key="test", base_url=base_url + "/v1", max_retries=0)
+    monkeypatch.setattr(batch_runner, "get_openai_client", lambda api_key: client)
+    return FakeBatchAPI
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return BatchRunner("openai", "test", "gpt-test", 100, state_path=str(tmp_path / "batch_state.json"),
+                       poll_interval=0, max_wait_hours=0.001)
+
+
+ARTICLES = [{"title": "Primo", "link": "https://example.com/1"},
+            {"title": "Secondo", "link": "https://example.com/2"}]
+
+
+def test_submit_saves_state_for_resume(fake_api, runner):
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    assert fake_api.submitted == ["post-0", "post-1"]
+    assert load_batch_state(runner.state_path)["batch_id"] == state["batch_id"] == "batch_1"
+
+
+def test_resume_skips_completed_requests(fake_api, runner):
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    fake_api.outputs = {"post-0": "testo 0", "post-1": "testo 1"}
+    runner.mark_completed(state, "post-0")
+
+    resumed = load_batch_state(runner.state_path)
+    runner.wait(resumed)
+    results = list(runner.results(resumed))
+    assert [(custom_id, text) for custom_id, _, text in results] == [("post-1", "testo 1")]
+
+
+def test_error_file_entries_are_returned_as_failed(fake_api, runner):
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    fake_api.outputs = {"post-0": "testo 0"}
+    fake_api.errors = ["post-1"]
+    assert {custom_id: text for custom_id, _, text in runner.results(state)} == {"post-0": "testo 0", "post-1": None}
+
+
+@pytest.mark.parametrize("status", ["failed", "expired", "cancelled"])
+def test_terminal_failed_batch_returns_every_outstanding_request(fake_api, runner, status):
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    runner.mark_completed(state, "post-0")
+    fake_api.status = status
+    runner.wait(state)
+    assert [(custom_id, text) for custom_id, _, text in runner.results(state)] == [("post-1", None)]
+
+
+def test_failed_batch_is_not_resumed_forever(fake_api, runner, tmp_path, monkeypatch):
+    import daily_ai_automation
+
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    fake_api.status = "expired"
+
+    class Collector:
+        config = {"batch": {"provider": "openai", "state_path": runner.state_path, "poll_interval_seconds": 0}}
+        processed = []
+
+        def mark_as_processed(self, article):
+            self.processed.append(article)
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    # Il batch scaduto è quello salvato dall'esecuzione precedente: viene ripreso una volta sola
+    assert load_batch_state(runner.state_path)["batch_id"] == state["batch_id"]
+    generated = daily_ai_automation.run_batch_generation(Collector())
+    assert generated == []
+    assert load_batch_state(runner.state_path) is None
+
+
+def test_not_ready_batch_keeps_state(fake_api, runner):
+    state = runner.submit(ARTICLES, ["prompt 1", "prompt 2"])
+    fake_api.status = "in_progress"
+    with pytest.raises(batch_runner.BatchNotReady):
+        runner.wait(state)
+    assert load_batch_state(runner.state_path) is not None
@@ -0,0 +1,53 @@
+# test_disk_cache.py - Eviction LRU con il totale delle dimensioni tenuto in memoria
+import os
+import time
+
+from disk_cache import SIZE_RESYNC_WRITES, DiskCache
+
+
+def test_eviction_keeps_cache_under_limit(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=50_000, ttl_seconds=None)
+    for n in range(40):
+        cache.set(f"k{n}", os.urandom(5_000))
+    assert cache.total_size() <= 50_000
+    # Le voci più vecchie sono state rimosse, le ultime restano
+    assert cache.get("k0") is None
+    assert cache.get("k39") is not None
+
+
+def test_total_size_is_not_recomputed_on_every_write(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=10 * 1024 * 1024, ttl_seconds=None)
+    original = cache.total_size
+    sums = []
+
+    def counting_total_size():
+        sums.append(1)
+        return original()
+
+    monkeypatch.setattr(cache, "total_size", counting_total_size)
+    writes = 2 * SIZE_RESYNC_WRITES
+    for n in range(writes):
+        cache.set(f"k{n}", f"valore {n}")
+    assert len(sums) <= writes // SIZE_RESYNC_WRITES + 1
+
+
+def test_writes_from_another_instance_are_picked_up_on_resync(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = DiskCache(path, max_bytes=60_000, ttl_seconds=None)
+    second = DiskCache(path, max_bytes=60_000, ttl_seconds=None)
+    first.set("a", os.urandom(1_000))
+    for n in range(20):
+        second.set(f"b{n}", os.urandom(5_000))
+    for n in range(SIZE_RESYNC_WRITES + 1):
+        first.set("a", os.urandom(1_000))
+    assert first.total_size() <= 60_000
+
+
+def test_contains_respects_ttl(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), ttl_seconds=60)
+    cache.set("chiave", b"valore")
+    assert cache.contains("chiave")
+    assert not cache.contains("altra")
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert not cache.contains("chiave")
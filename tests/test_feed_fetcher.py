@@ -0,0 +1,164 @@
+# test_feed_fetcher.py - Richieste condizionali (ETag / 304) e cache dei feed
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+import pytest
+
+from feed_cache import FeedCache
+from feed_fetcher import FeedFetcher
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Feed di prova</title>
+<item><title>Primo articolo</title><link>https://example.com/1</link></item>
+<item><title>Secondo articolo</title><link>https://example.com/2</link></item>
+</channel></rss>"""
+ETAG = '"v1"'
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    body = RSS
+    always_304 = False
+    pending_304 = 0
+
+    def do_GET(self):
+        handler = type(self)
+        handler.requests_seen.append(dict(self.headers))
+        if handler.pending_304 > 0:
+            handler.pending_304 -= 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.always_304 or self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server(local_server):
+    FeedHandler.requests_seen = []
+    FeedHandler.body = RSS
+    FeedHandler.always_304 = False
+    FeedHandler.pending_304 = 0
+    return local_server(FeedHandler) + "/feed.xml"
+
+
+def titles(result):
+    return [entry["title"] for entry in result["feed"].entries]
+
+
+def test_second_fetch_is_conditional_and_served_from_cache(feed_server, tmp_path):
+    fetcher = FeedFetcher(cache=FeedCache(str(tmp_path)))
+    first = fetcher.fetch_one(feed_server)
+    assert first["error"] is None and not first["not_modified"]
+    assert titles(first) == ["Primo articolo", "Secondo articolo"]
+
+    second = fetcher.fetch_one(feed_server)
+    assert second["error"] is None and second["not_modified"]
+    assert titles(second) == titles(first)
+    assert FeedHandler.requests_seen[1].get("If-None-Match") == ETAG
+
+
+def test_304_without_cached_copy_triggers_full_download(feed_server, tmp_path):
+    # Es. un proxy che risponde 304 ma la cache locale è stata cancellata
+    FeedHandler.pending_304 = 1
+    result = FeedFetcher(cache=FeedCache(str(tmp_path))).fetch_one(feed_server)
+    assert result["error"] is None and not result["not_modified"]
+    assert titles(result) == ["Primo articolo", "Secondo articolo"]
+    assert len(FeedHandler.requests_seen) == 2
+
+
+def test_unconditional_304_is_an_error(feed_server):
+    FeedHandler.always_304 = True
+    result = FeedFetcher().fetch_one(feed_server)
+    assert result["error"] is not None
+
+
+def test_feed_with_minor_format_errors_is_still_cached(feed_server, tmp_path):
+    # Entità non definita: feedparser segnala bozo ma legge gli articoli
+    FeedHandler.body = RSS.replace(b"Primo articolo", b"Primo &nbsp; articolo")
+    cache = FeedCache(str(tmp_path))
+    first = FeedFetcher(cache=cache).fetch_one(feed_server)
+    assert first["feed"].get("bozo") and len(first["feed"].entries) == 2
+    assert cache.load(feed_server) is not None
+
+
+def test_feed_without_entries_is_not_cached(feed_server, tmp_path):
+    FeedHandler.body = b"<html><body>Pagina di errore</body></html>"
+    cache = FeedCache(str(tmp_path))
+    FeedFetcher(cache=cache).fetch_one(feed_server)
+    assert cache.load(feed_server) is None
+
+
+class SlowFeedHandler(FeedHandler):
+    delay = 0.3
+    active = 0
+    max_active = 0
+    lock = None
+
+    def do_GET(self):
+        handler = type(self)
+        with handler.lock:
+            handler.active += 1
+            handler.max_active = max(handler.max_active, handler.active)
+        time.sleep(handler.delay)
+        with handler.lock:
+            handler.active -= 1
+        super().do_GET()
+
+
+def test_feeds_are_fetched_concurrently_within_the_per_host_limit(local_server):
+    SlowFeedHandler.lock = threading.Lock()
+    SlowFeedHandler.requests_seen = []
+    base_url = local_server(SlowFeedHandler)
+    urls = [f"{base_url}/feed{n}.xml" for n in range(6)]
+
+    started = time.monotonic()
+    results = FeedFetcher(max_workers=6, per_host_limit=3).fetch_all(urls)
+    elapsed = time.monotonic() - started
+    assert sorted(result["url"] for result in results) == sorted(urls)
+    assert all(result["error"] is None for result in results)
+    assert SlowFeedHandler.max_active == 3
+    # Due "ondate" da tre richieste invece di sei richieste in fila
+    assert elapsed < 6 * SlowFeedHandler.delay
+
+
+def test_automated_run_fetches_feeds_concurrently(local_server, tmp_path, monkeypatch):
+    import new_fetcher
+
+    SlowFeedHandler.lock = threading.Lock()
+    SlowFeedHandler.requests_seen = []
+    SlowFeedHandler.active = 0
+    SlowFeedHandler.max_active = 0
+    SlowFeedHandler.body = RSS
+    base_url = local_server(SlowFeedHandler)
+    feeds = [f"{base_url}/feed{n}.xml" for n in range(3)]
+    generated = []
+
+    monkeypatch.setattr(new_fetcher, "feed_fetcher_global",
+                        FeedFetcher(max_workers=3, per_host_limit=3, cache=FeedCache(str(tmp_path))))
+    monkeypatch.setattr(new_fetcher, "load_rss_feeds_from_file", lambda: feeds)
+    monkeypatch.setattr(new_fetcher, "load_processed_articles",
+                        lambda: SimpleNamespace(contains_article=lambda link, title=None: False))
+    monkeypatch.setattr(new_fetcher, "iter_extracted_articles",
+                        lambda articles: ((article, "Testo.") for article in articles))
+    monkeypatch.setattr(new_fetcher, "generate_linkedin_post_with_claude",
+                        lambda article, **kwargs: generated.append(article["title"]) or True)
+    monkeypatch.setattr(new_fetcher, "add_to_processed_articles", lambda link, title=None: None)
+
+    new_fetcher.run_automated_post_generation()
+    assert len(SlowFeedHandler.requests_seen) == 3
+    assert SlowFeedHandler.max_active == 3
+    assert len(generated) == new_fetcher.AUTOMATED_POSTS_PER_RUN
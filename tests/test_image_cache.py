@@ -0,0 +1,45 @@
+# test_image_cache.py - Deduplicazione dei byte delle immagini in cache
+import io
+
+from PIL import Image
+
+from image_cache import BLOB_NAMESPACE, ImageCache
+
+
+def png_bytes(shade: int, marker: int = 0) -> bytes:
+    image = Image.new("RGB", (64, 64), (shade, shade, shade))
+    image.putpixel((10, 10), (marker, marker, marker))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def blob_count(cache: ImageCache) -> int:
+    return len(cache.cache.items(BLOB_NAMESPACE))
+
+
+def test_similar_images_are_kept_distinct(tmp_path):
+    cache = ImageCache(db_path=str(tmp_path / "images.db"))
+    first, second = png_bytes(120), png_bytes(120, marker=255)
+    assert first != second
+
+    cache.store("a robot painting a sunset", "openai", first)
+    cache.store("an astronaut reading a newspaper", "openai", second)
+    assert cache.lookup("a robot painting a sunset", "openai").data == first
+    assert cache.lookup("an astronaut reading a newspaper", "openai").data == second
+    assert blob_count(cache) == 2
+
+
+def test_identical_bytes_are_stored_once(tmp_path):
+    cache = ImageCache(db_path=str(tmp_path / "images.db"))
+    data = png_bytes(80)
+    cache.store("a robot painting a sunset", "openai", data)
+    cache.store("an astronaut reading a newspaper", "openai", data)
+    assert blob_count(cache) == 1
+    assert cache.lookup("an astronaut reading a newspaper", "openai").data == data
+
+
+def test_invalid_image_is_not_stored(tmp_path):
+    cache = ImageCache(db_path=str(tmp_path / "images.db"))
+    assert not cache.store("a robot painting a sunset", "openai", b"not an image")
+    assert cache.lookup("a robot painting a sunset", "openai") is None
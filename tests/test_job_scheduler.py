@@ -0,0 +1,232 @@
+# test_job_scheduler.py - RateLimiter con orologio finto e PostJobScheduler contro un finto server delle API
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+import job_scheduler
+from job_scheduler import PostJobScheduler, RateLimiter, TokenBucket, get_rate_limiter, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(job_scheduler, "time", fake)
+    return fake
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"errore {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def test_token_bucket_allows_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(requests_per_minute=60, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(1.0)
+
+
+def test_token_bucket_pause_delays_next_token(clock):
+    bucket = TokenBucket(requests_per_minute=60)
+    bucket.pause(10)
+    bucket.acquire()
+    assert sum(clock.sleeps) == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize("headers,expected", [
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "7"}, 7.0),
+    ({}, None),
+    ({"retry-after": "non valido"}, None),
+])
+def test_retry_after_seconds(headers, expected):
+    assert retry_after_seconds(ApiError(429, headers)) == expected
+
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = retry_after_seconds(ApiError(503, {"retry-after": format_datetime(retry_at, usegmt=True)}))
+    assert 25 <= seconds <= 30
+
+
+def test_rate_limiter_honours_retry_after_on_429(clock):
+    limiter = RateLimiter("text", requests_per_minute=6000, max_retries=3)
+    outcomes = [ApiError(429, {"retry-after": "20"}), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call(flaky) == "ok"
+    # L'attesa passa dal secchiello: vale anche per le altre chiamate dello stesso tipo
+    assert sum(clock.sleeps) == pytest.approx(20.0, abs=0.1)
+
+
+def test_rate_limiter_caps_retry_after_at_max_backoff(clock):
+    limiter = RateLimiter("text", requests_per_minute=6000, max_retries=1, max_backoff=5)
+    outcomes = [ApiError(503, {"retry-after": "3600"}), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call(flaky) == "ok"
+    assert clock.sleeps == [5]
+
+
+def test_rate_limiter_does_not_retry_client_errors(clock):
+    limiter = RateLimiter("text", requests_per_minute=6000)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        limiter.call(bad_request)
+    assert len(calls) == 1
+
+
+def test_rate_limiter_gives_up_after_max_retries(clock):
+    limiter = RateLimiter("text", requests_per_minute=6000, max_retries=2, base_backoff=1)
+    calls = []
+
+    def overloaded():
+        calls.append(1)
+        raise ApiError(529)
+
+    with pytest.raises(ApiError):
+        limiter.call(overloaded)
+    assert len(calls) == 3
+    assert all(0.5 <= delay <= 4 for delay in clock.sleeps)
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """
+    API finta con due endpoint, /text e /image: registra quante richieste per endpoint
+    sono in corso insieme e risponde 429 con Retry-After alla prima richiesta di testo
+    dell'articolo indicato in 'throttle_article'
+    """
+    lock = None
+    active = {}
+    max_active = {}
+    requests_seen = []
+    throttle_article = None
+    retry_after = 0.2
+    slow_article = None
+    delay = 0.05
+    slow_delay = 0.6
+
+    def do_POST(self):
+        handler = type(self)
+        url = urlparse(self.path)
+        endpoint = url.path.strip("/")
+        article = int(parse_qs(url.query)["article"][0])
+        with handler.lock:
+            handler.requests_seen.append((endpoint, article, time.monotonic()))
+            throttled = endpoint == "text" and article == handler.throttle_article
+            if throttled:
+                handler.throttle_article = None
+            else:
+                handler.active[endpoint] = handler.active.get(endpoint, 0) + 1
+                handler.max_active[endpoint] = max(handler.max_active.get(endpoint, 0), handler.active[endpoint])
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", str(handler.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(handler.slow_delay if endpoint == "text" and article == handler.slow_article else handler.delay)
+        with handler.lock:
+            handler.active[endpoint] -= 1
+        body = f"{endpoint} {article}".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_api(local_server, monkeypatch):
+    FakeApiHandler.lock = threading.Lock()
+    FakeApiHandler.active = {}
+    FakeApiHandler.max_active = {}
+    FakeApiHandler.requests_seen = []
+    FakeApiHandler.throttle_article = 1
+    FakeApiHandler.slow_article = 0
+    # Limitatori nuovi per il test: quelli condivisi restano intatti
+    monkeypatch.setattr(job_scheduler, "_rate_limiters", {})
+    return local_server(FakeApiHandler)
+
+
+def test_scheduler_respects_per_kind_limits_and_saves_posts_as_they_finish(fake_api, tmp_path):
+    config = {"job_scheduler": {"max_jobs": 4, "text_concurrency": 2, "image_concurrency": 1,
+                                "text_requests_per_minute": 6000, "image_requests_per_minute": 6000}}
+
+    def call_api(endpoint, article):
+        response = requests.post(f"{fake_api}/{endpoint}", params={"article": article}, timeout=5)
+        response.raise_for_status()
+        return response.text
+
+    def generate_post(article):
+        text = get_rate_limiter("text").call(call_api, "text", article)
+        image = get_rate_limiter("image").call(call_api, "image", article)
+        path = tmp_path / f"post_{article}.txt"
+        path.write_text(f"{text}\n{image}", encoding="utf-8")
+        return path
+
+    completed = []
+    with PostJobScheduler.from_config(config) as scheduler:
+        for article in range(4):
+            scheduler.submit(article, generate_post, article)
+        for article, path, error in scheduler.iter_completed():
+            assert error is None
+            # Ogni post è già su disco quando viene restituito, mentre quelli più lenti sono ancora in corso
+            assert path.read_text(encoding="utf-8") == f"text {article}\nimage {article}"
+            completed.append((article, sorted(p.name for p in tmp_path.iterdir())))
+
+    assert sorted(article for article, _ in completed) == [0, 1, 2, 3]
+    # L'articolo con il testo lento finisce per ultimo e il primo post salvato non aspetta lui
+    assert completed[-1][0] == 0
+    assert "post_0.txt" not in completed[0][1]
+    assert FakeApiHandler.max_active == {"text": 2, "image": 1}
+
+    # Il 429 viene ripetuto dopo il Retry-After indicato dal server
+    text_requests = [seen_at for endpoint, article, seen_at in FakeApiHandler.requests_seen
+                     if endpoint == "text" and article == 1]
+    assert len(text_requests) == 2
+    assert text_requests[1] - text_requests[0] >= FakeApiHandler.retry_after * 0.9
@@ -0,0 +1,235 @@
+# test_post_generation.py - Generazione del post della GUI con un finto client Claude in streaming
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from docx import Document
+
+import new_fetcher
+from job_scheduler import RateLimiter
+from provider_router import ProviderRouter
+from response_cache import ResponseCache
+
+
+class Overloaded(Exception):
+    status_code = 529
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None, release=None):
+        self.chunks = chunks
+        self.error = error
+        self.release = release
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        if self.release is not None:
+            # Claude "lento": risponde solo quando il test lo sblocca
+            self.release.wait(5)
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=10, output_tokens=5,
+                                                     cache_read_input_tokens=0, cache_creation_input_tokens=0))
+
+
+class FakeAnthropic:
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.calls = 0
+        self.messages = SimpleNamespace(stream=self._stream)
+
+    def _stream(self, **kwargs):
+        self.calls += 1
+        return self.streams.pop(0)
+
+
+@pytest.fixture
+def generation_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(new_fetcher, "ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(new_fetcher, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(new_fetcher, "_post_text_router", ProviderRouter(hedge_delay=0.05))
+    monkeypatch.setattr(new_fetcher, "get_rate_limiter", lambda kind: RateLimiter(kind, base_backoff=0.01))
+    cache = ResponseCache(db_path=str(tmp_path / "responses.db"))
+    monkeypatch.setattr(new_fetcher, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(new_fetcher, "get_image_cache", lambda: SimpleNamespace(restore=lambda *args: None))
+    image_prompts = []
+
+    def fake_image(prompt, path, use_cache=True):
+        image_prompts.append(prompt)
+        with open(path, "wb") as f:
+            f.write(b"png")
+        return True
+
+    monkeypatch.setattr(new_fetcher, "generate_post_image", fake_image)
+    return SimpleNamespace(cache=cache, image_prompts=image_prompts, tmp_path=tmp_path)
+
+
+def install_client(monkeypatch, *streams):
+    client = FakeAnthropic(streams)
+    monkeypatch.setattr(new_fetcher, "get_anthropic_client", lambda api_key: client)
+    return client
+
+
+def install_openai(monkeypatch, text):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(new_fetcher, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(new_fetcher, "get_openai_client", lambda api_key: client)
+    return calls
+
+
+def generated_docx_text(tmp_path):
+    folder = tmp_path / "generated_posts"
+    documents = [name for name in os.listdir(folder) if name.endswith(".docx")]
+    assert len(documents) == 1
+    return "\n".join(paragraph.text for paragraph in Document(str(folder / documents[0])).paragraphs)
+
+
+ARTICLE = {"title": "Articolo di prova", "link": "https://example.com/a"}
+
+
+def test_retry_after_mid_stream_error_does_not_mix_generations(generation_env, monkeypatch):
+    client = install_client(
+        monkeypatch,
+        FakeStream(["[POST] primo post ", "[IMAGE_PROMPT] primo pro"], error=Overloaded("overloaded")),
+        FakeStream(["[POST] secondo post ", "[IMAGE_PROMPT] secondo prompt"]),
+    )
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                         article_text="Testo dell'articolo.")
+    assert client.calls == 2
+    text = generated_docx_text(generation_env.tmp_path)
+    assert "secondo post" in text and "primo post" not in text
+    assert generation_env.image_prompts == ["secondo prompt"]
+
+
+def test_incomplete_response_writes_nothing(generation_env, monkeypatch):
+    install_client(monkeypatch, FakeStream(["[POST] solo il post"]))
+    assert not new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                             article_text="Testo dell'articolo.")
+    assert generation_env.image_prompts == []
+    folder = generation_env.tmp_path / "generated_posts"
+    assert not folder.exists() or os.listdir(folder) == []
+
+
+def test_interactive_rerun_reuses_cached_response_unless_regeneration_is_confirmed(generation_env, monkeypatch):
+    client = install_client(
+        monkeypatch,
+        FakeStream(["[POST] primo post ", "[IMAGE_PROMPT] primo prompt"]),
+        FakeStream(["[POST] secondo post ", "[IMAGE_PROMPT] secondo prompt"]),
+    )
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                         article_text="Testo dell'articolo.")
+    # "Genera" di nuovo dalla GUI (es. dopo un errore): l'utente sceglie di non rigenerare
+    asked = []
+    assert new_fetcher.generate_linkedin_post_with_claude(
+        ARTICLE, interactive_mode=True, article_text="Testo dell'articolo.",
+        run_in_ui=lambda dialog, *args, **kwargs: asked.append(args[0]) and False)
+    assert asked[0] == "Post già generato"
+    assert client.calls == 1
+    # Rigenerazione confermata nella finestra di dialogo
+    assert new_fetcher.generate_linkedin_post_with_claude(
+        ARTICLE, interactive_mode=True, article_text="Testo dell'articolo.",
+        run_in_ui=lambda dialog, *args, **kwargs: args[0] == "Post già generato")
+    assert client.calls == 2
+    assert generation_env.image_prompts == ["primo prompt", "primo prompt", "secondo prompt"]
+
+
+def test_explicit_regeneration_bypasses_and_refreshes_cache(generation_env, monkeypatch):
+    client = install_client(
+        monkeypatch,
+        FakeStream(["[POST] primo post ", "[IMAGE_PROMPT] primo prompt"]),
+        FakeStream(["[POST] secondo post ", "[IMAGE_PROMPT] secondo prompt"]),
+    )
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                         article_text="Testo dell'articolo.")
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=True,
+                                                         article_text="Testo dell'articolo.", regenerate=True,
+                                                         run_in_ui=lambda dialog, *args, **kwargs: None)
+    assert client.calls == 2
+    assert generation_env.image_prompts == ["primo prompt", "secondo prompt"]
+
+    # L'automazione successiva riusa la risposta rigenerata, senza chiamare l'API
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                         article_text="Testo dell'articolo.")
+    assert client.calls == 2
+    assert generation_env.image_prompts[-1] == "secondo prompt"
+
+
+def test_interactive_generation_hedges_to_openai_when_claude_is_slow(generation_env, monkeypatch):
+    release = threading.Event()
+    install_client(monkeypatch, FakeStream(["[POST] post di Claude ", "[IMAGE_PROMPT] prompt di Claude"],
+                                           release=release))
+    openai_calls = install_openai(monkeypatch, "[POST] post di OpenAI\n[IMAGE_PROMPT] prompt di OpenAI")
+    shown = []
+    try:
+        assert new_fetcher.generate_linkedin_post_with_claude(
+            ARTICLE, interactive_mode=True, article_text="Testo dell'articolo.",
+            on_progress=lambda section, text: shown.append(text),
+            run_in_ui=lambda dialog, *args, **kwargs: None)
+    finally:
+        release.set()
+    assert len(openai_calls) == 1
+    assert "post di OpenAI" in generated_docx_text(generation_env.tmp_path)
+    assert generation_env.image_prompts == ["prompt di OpenAI"]
+    assert "Claude" not in "".join(shown)
+
+
+def test_automation_does_not_hedge(generation_env, monkeypatch):
+    install_client(monkeypatch, FakeStream(["[POST] post di Claude ", "[IMAGE_PROMPT] prompt di Claude"]))
+    openai_calls = install_openai(monkeypatch, "[POST] post di OpenAI\n[IMAGE_PROMPT] prompt di OpenAI")
+    assert new_fetcher.generate_linkedin_post_with_claude(ARTICLE, interactive_mode=False,
+                                                         article_text="Testo dell'articolo.")
+    assert openai_calls == []
+    assert generation_env.image_prompts == ["prompt di Claude"]
+
+
+def test_cancel_during_image_generation_returns_without_waiting(generation_env, monkeypatch):
+    install_client(monkeypatch, FakeStream(["[POST] post ", "[IMAGE_PROMPT] prompt"]))
+    image_started = threading.Event()
+    release_image = threading.Event()
+    cancelled = threading.Event()
+
+    def slow_image(prompt, path, use_cache=True):
+        image_started.set()
+        release_image.wait(5)
+        with open(path, "wb") as f:
+            f.write(b"png")
+        return True
+
+    def check_cancelled():
+        if cancelled.is_set():
+            raise new_fetcher.TaskCancelled("annullata")
+
+    monkeypatch.setattr(new_fetcher, "generate_post_image", slow_image)
+    threading.Thread(target=lambda: image_started.wait(5) and cancelled.set(), daemon=True).start()
+    try:
+        assert not new_fetcher.generate_linkedin_post_with_claude(
+            ARTICLE, interactive_mode=False, article_text="Testo dell'articolo.",
+            check_cancelled=check_cancelled)
+    finally:
+        release_image.set()
+    # L'immagine arrivata dopo l'annullamento viene rimossa in background insieme al DOCX
+    folder = generation_env.tmp_path / "generated_posts"
+    for _ in range(100):
+        if os.listdir(folder) == []:
+            break
+        threading.Event().wait(0.05)
+    assert os.listdir(folder) == []
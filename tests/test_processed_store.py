@@ -0,0 +1,37 @@
+# test_processed_store.py - Risoluzione dei redirect in parallelo e memorizzata
+import threading
+import time
+
+import processed_store
+from processed_store import ProcessedArticleStore
+
+
+def test_canonical_urls_resolves_redirects_concurrently_and_once(tmp_path, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def slow_resolve(url):
+        with lock:
+            calls.append(url)
+        time.sleep(0.2)
+        return url.replace("https://bit.ly/", "https://example.com/articoli/")
+
+    monkeypatch.setattr(processed_store, "resolve_redirect", slow_resolve)
+    store = ProcessedArticleStore(str(tmp_path / "processed.db"), legacy_path=None)
+    links = [(f"https://bit.ly/{n}", None) for n in range(8)]
+    links += [("https://bit.ly/0", None),
+              ("https://example.com/diretto", None),
+              ("https://feeds.feedburner.com/x", {"feedburner_origlink": "https://example.com/originale"})]
+
+    start = time.monotonic()
+    canonical = store.canonical_urls(links, max_workers=8)
+    assert time.monotonic() - start < 1.0
+    assert len(calls) == 8
+    assert canonical[0] == "https://example.com/articoli/0"
+    assert canonical[8] == canonical[0]
+    assert canonical[9:] == ["https://example.com/diretto", "https://example.com/originale"]
+
+    # Seconda esecuzione: i redirect sono già noti, nessuna richiesta di rete
+    assert store.canonical_urls(links) == canonical
+    assert store.canonical_url("https://bit.ly/3") == "https://example.com/articoli/3"
+    assert len(calls) == 8
@@ -0,0 +1,72 @@
+# test_provider_router.py - Routing per latenza, hedging e risposte dalla cache
+import threading
+import time
+
+import pytest
+
+from provider_router import ProviderRouter
+from response_cache import CachedText
+
+
+def test_cache_hits_are_not_recorded_as_latency():
+    router = ProviderRouter()
+    for _ in range(5):
+        assert router.generate("prompt", [("claude", lambda prompt: CachedText("dalla cache"))]) == "dalla cache"
+    assert router.health("claude").latency_percentiles() == (None, None)
+    assert router.health("claude").error_rate == 0.0
+
+
+def test_falls_back_to_next_provider_on_failure():
+    router = ProviderRouter()
+
+    def failing(prompt):
+        raise RuntimeError("down")
+
+    assert router.generate("prompt", [("claude", failing), ("openai", lambda prompt: "ok")]) == "ok"
+    assert router.health("claude").error_rate == 1.0
+
+
+def test_circuit_opens_after_consecutive_failures():
+    router = ProviderRouter(failure_threshold=2, cooldown_seconds=60)
+    calls = []
+
+    def failing(prompt):
+        calls.append(prompt)
+        return None
+
+    for _ in range(4):
+        router.generate("prompt", [("claude", failing), ("openai", lambda prompt: "ok")])
+    assert len(calls) == 2
+    assert router.stats()["claude"]["circuit_open"]
+
+
+def test_hedge_starts_second_provider_when_first_is_slow():
+    router = ProviderRouter(hedge_delay=0.05)
+    release = threading.Event()
+
+    def slow(prompt):
+        release.wait(5)
+        return "lento"
+
+    start = time.monotonic()
+    try:
+        assert router.generate("prompt", [("claude", slow), ("openai", lambda prompt: "veloce")], hedge=True) == "veloce"
+    finally:
+        release.set()
+    assert time.monotonic() - start < 2
+
+
+class Cancelled(Exception):
+    pass
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_abort_exceptions_propagate_without_counting_as_errors(hedge):
+    router = ProviderRouter()
+
+    def cancelled(prompt):
+        raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        router.generate("prompt", [("claude", cancelled)], hedge=hedge, abort_on=(Cancelled,))
+    assert router.health("claude").error_rate == 0.0
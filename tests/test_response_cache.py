@@ -0,0 +1,43 @@
+# test_response_cache.py - Modalità della cache delle risposte e replay nella generazione giornaliera
+import pytest
+
+import daily_ai_automation
+from response_cache import ResponseCache, ResponseCacheMiss, response_key
+
+ARTICLE = {"title": "Articolo di prova", "summary": "Riassunto.", "link": "https://example.com/a"}
+
+
+@pytest.fixture
+def replay_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+    monkeypatch.setenv("CLAUDE_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    cache = ResponseCache(db_path=str(tmp_path / "responses.db"), mode="replay")
+    monkeypatch.setattr(daily_ai_automation, "get_response_cache", lambda: cache)
+    return cache
+
+
+def test_refresh_bypasses_the_cache_except_in_replay(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+    cache = ResponseCache(db_path=str(tmp_path / "responses.db"))
+    assert cache.get_or_generate("openai", "m", "prompt", None, lambda: "prima") == "prima"
+    assert cache.get_or_generate("openai", "m", "prompt", None, lambda: "seconda") == "prima"
+    assert cache.get_or_generate("openai", "m", "prompt", None, lambda: "seconda", refresh=True) == "seconda"
+
+    cache.mode = "replay"
+    assert cache.get_or_generate("openai", "m", "prompt", None, lambda: "terza", refresh=True) == "seconda"
+    with pytest.raises(ResponseCacheMiss):
+        cache.get_or_generate("openai", "m", "altro prompt", None, lambda: "terza")
+
+
+def test_replay_miss_does_not_fall_back_to_template(replay_cache):
+    assert daily_ai_automation.generate_post_with_ai(ARTICLE) is None
+
+
+def test_replay_uses_any_provider_with_a_saved_response(replay_cache):
+    prompt = daily_ai_automation.build_post_prompt(ARTICLE)
+    messages = daily_ai_automation.openai_messages(prompt, daily_ai_automation.POST_GUIDELINES)
+    key = response_key("openai", daily_ai_automation.OPENAI_TEXT_MODEL, messages,
+                       {"max_tokens": daily_ai_automation.TEXT_MAX_TOKENS})
+    replay_cache.put(key, "Post salvato da OpenAI")
+    assert daily_ai_automation.generate_post_with_ai(ARTICLE) == "Post salvato da OpenAI"
@@ -0,0 +1,117 @@
+# test_scheduler_daemon.py - Orari dovuti, recupero e gestione del lock nello scheduler residente
+import json
+from datetime import datetime, time
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler_daemon
+from process_runner import RunLock
+from scheduler_daemon import SchedulerDaemon, due_slot
+
+TIMES = [time(8, 0), time(18, 0)]
+
+
+def test_due_slot_runs_latest_unhandled_slot():
+    now = datetime(2026, 10, 18, 8, 1)
+    assert due_slot(now, TIMES, "2026-10-17 18:00") == datetime(2026, 10, 18, 8, 0)
+    assert due_slot(now, TIMES, "2026-10-18 08:00") is None
+
+
+def test_due_slot_collapses_missed_slots_into_one():
+    now = datetime(2026, 10, 18, 19, 0)
+    assert due_slot(now, TIMES, "2026-10-17 08:00") == datetime(2026, 10, 18, 18, 0)
+
+
+def test_due_slot_does_not_catch_up_old_slots():
+    now = datetime(2026, 10, 18, 7, 0)
+    assert due_slot(now, TIMES, "2026-10-17 08:00", catch_up_hours=14) == datetime(2026, 10, 17, 18, 0)
+    assert due_slot(now, TIMES, "2026-10-17 08:00", catch_up_hours=12) is None
+
+
+def test_due_slot_ignores_slots_older_than_last_run():
+    assert due_slot(datetime(2026, 10, 18, 8, 30), TIMES, "2026-10-18 18:00") is None
+
+
+class FakeAutomation:
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def main(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        return ["post.docx"]
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {"schedule": {"enabled": True, "execution_time": "08:00"}, "scheduler": {"catch_up_hours": 12}}
+    (tmp_path / "config.json").write_text(json.dumps(config), encoding="utf-8")
+    monkeypatch.setattr(SchedulerDaemon, "configure_caches", lambda self: None)
+    instance = SchedulerDaemon(config_path="config.json", state_path="state.json", lock_path="daemon.lock")
+    instance.reload_config_if_changed()
+    instance._automation = FakeAutomation()
+    return instance
+
+
+def test_first_start_does_not_catch_up(daemon):
+    daemon.skip_missed_slots(datetime(2026, 10, 18, 9, 0))
+    daemon.tick(datetime(2026, 10, 18, 9, 0))
+    assert daemon._automation.calls == []
+    daemon.tick(datetime(2026, 10, 19, 8, 0))
+    assert len(daemon._automation.calls) == 1
+    assert daemon.state["last_slot"] == "2026-10-19 08:00"
+
+
+def test_slot_is_marked_handled_when_another_run_holds_the_lock(daemon):
+    daemon.state["last_slot"] = "2026-10-17 08:00"
+    other_run = RunLock()
+    assert other_run.acquire()
+    try:
+        daemon.tick(datetime(2026, 10, 18, 8, 0))
+        assert daemon.state["last_slot"] == "2026-10-18 08:00"
+    finally:
+        other_run.release()
+    # Liberato il lock, lo stesso orario non viene eseguito una seconda volta
+    daemon.tick(datetime(2026, 10, 18, 8, 0, 10))
+    assert daemon._automation.calls == []
+
+
+def test_run_now_request_is_consumed_when_another_run_holds_the_lock(daemon):
+    daemon.state["last_slot"] = "2026-10-18 08:00"
+    scheduler_daemon.request_run_now()
+    other_run = RunLock()
+    assert other_run.acquire()
+    try:
+        daemon.tick(datetime(2026, 10, 18, 9, 0))
+    finally:
+        other_run.release()
+    daemon.tick(datetime(2026, 10, 18, 9, 0, 5))
+    assert daemon._automation.calls == []
+
+
+def test_run_errors_are_recorded_in_last_run(daemon):
+    daemon._automation = FakeAutomation(error=RuntimeError("feed non raggiungibili"))
+    assert daemon.run_automation("test")
+    assert daemon.state["last_run"]["error"] == "feed non raggiungibili"
+    assert daemon._automation.calls[0]["raise_errors"] is True
+    assert daemon._automation.calls[0]["configure_caches"] is False
+
+
+def test_main_resets_token_usage_and_reraises_for_the_daemon(monkeypatch):
+    daily_ai_automation = pytest.importorskip("daily_ai_automation")
+    from token_usage import get_token_usage
+
+    get_token_usage().record("anthropic", "model", SimpleNamespace(input_tokens=100, output_tokens=10))
+
+    def broken_collector():
+        raise RuntimeError("configurazione illeggibile")
+
+    monkeypatch.setattr(daily_ai_automation, "EnhancedArticleCollector", broken_collector)
+    assert daily_ai_automation.main() == []
+    assert get_token_usage().summary() == {}
+    with pytest.raises(RuntimeError):
+        daily_ai_automation.main(raise_errors=True)
@@ -0,0 +1,67 @@
+# test_stream_parser.py - Riconoscimento incrementale delle sezioni [POST] / [IMAGE_PROMPT]
+from stream_parser import SectionStreamParser
+
+RESPONSE = "[POST]\nUn post sull'IA.\n#AI #Lavoro\n[IMAGE_PROMPT]\nUn robot che legge il giornale"
+
+
+def feed_in_chunks(parser, text, size):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    completed.extend(parser.close())
+    return completed
+
+
+def test_sections_from_whole_response():
+    parser = SectionStreamParser()
+    parser.feed(RESPONSE)
+    parser.close()
+    assert parser.sections == {"POST": "Un post sull'IA.\n#AI #Lavoro", "IMAGE_PROMPT": "Un robot che legge il giornale"}
+
+
+def test_tags_split_across_chunks():
+    for size in (1, 2, 3, 5, 7):
+        parser = SectionStreamParser()
+        completed = feed_in_chunks(parser, RESPONSE, size)
+        assert [name for name, _ in completed] == ["POST", "IMAGE_PROMPT"]
+        assert parser.sections["IMAGE_PROMPT"] == "Un robot che legge il giornale"
+
+
+def test_post_is_emitted_when_image_prompt_starts():
+    emitted = []
+    parser = SectionStreamParser(on_section=lambda name, text: emitted.append(name))
+    parser.feed("[POST] testo del post [IMAGE_")
+    assert emitted == []
+    parser.feed("PROMPT] prompt")
+    assert emitted == ["POST"]
+    parser.close()
+    assert emitted == ["POST", "IMAGE_PROMPT"]
+
+
+def test_progress_text_never_contains_tags():
+    received = []
+    parser = SectionStreamParser(on_text=lambda name, text: received.append((name, text)))
+    feed_in_chunks(parser, RESPONSE, 4)
+    streamed = "".join(text for _, text in received)
+    assert "[" not in streamed
+    assert {name for name, _ in received} == {"POST", "IMAGE_PROMPT"}
+
+
+def test_preamble_belongs_to_first_section():
+    parser = SectionStreamParser()
+    feed_in_chunks(parser, "Ecco il post: [POST] corpo [IMAGE_PROMPT] immagine", 3)
+    assert parser.sections["POST"] == "Ecco il post:  corpo"
+
+
+def test_brackets_that_are_not_tags_are_kept():
+    parser = SectionStreamParser()
+    feed_in_chunks(parser, "[POST] costo [stimato] 5€ [IMAGE_PROMPT] grafico", 2)
+    assert parser.sections["POST"] == "costo [stimato] 5€"
+
+
+def test_close_is_idempotent():
+    parser = SectionStreamParser()
+    parser.feed("[POST] solo post")
+    assert parser.close() == [("POST", "solo post")]
+    assert parser.close() == []
+    assert "IMAGE_PROMPT" not in parser.sections
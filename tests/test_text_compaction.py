@@ -0,0 +1,59 @@
+# test_text_compaction.py - Riduzione del testo degli articoli entro il budget di token
+from text_compaction import compact_article_text, estimate_tokens, remove_boilerplate, title_keywords
+
+
+def paragraph(topic, words=60):
+    return " ".join([f"Paragrafo su {topic}."] + ["testo"] * words) + "."
+
+
+def test_text_within_budget_is_kept_whole():
+    text = "\n\n".join([
+        "Meta ha pubblicato un nuovo modello.",
+        "The EU commission recommended that companies share this data with researchers.",
+        "Iscriviti alla newsletter per ricevere gli aggiornamenti.",
+    ])
+    assert compact_article_text(text, max_tokens=1000) == text
+
+
+def test_compacted_text_stays_within_budget():
+    text = "\n\n".join(paragraph(f"argomento {index}") for index in range(40))
+    compacted = compact_article_text(text, max_tokens=300)
+    assert estimate_tokens(compacted) <= 300
+    # Il paragrafo d'apertura entra sempre
+    assert compacted.startswith("Paragrafo su argomento 0.")
+
+
+def test_long_opening_paragraph_is_truncated_to_budget():
+    text = " ".join(["Una frase abbastanza lunga sull'intelligenza artificiale."] * 200)
+    compacted = compact_article_text(text, max_tokens=50)
+    assert 0 < estimate_tokens(compacted) <= 50
+
+
+def test_boilerplate_and_duplicates_are_removed():
+    paragraphs = [
+        "Home | Tecnologia | Economia | Contatti",
+        "Il modello è stato addestrato su dati pubblici e rilasciato con licenza aperta.",
+        "Leggi anche: i dieci modelli più usati del 2024",
+        "The EU commission recommended that companies share this data with researchers.",
+        "Il modello è stato addestrato su dati pubblici e rilasciato con licenza aperta.",
+        "Subscribe to our newsletter",
+        "Condividi",
+    ]
+    assert remove_boilerplate(paragraphs) == [
+        "Il modello è stato addestrato su dati pubblici e rilasciato con licenza aperta.",
+        "The EU commission recommended that companies share this data with researchers.",
+    ]
+
+
+def test_keyword_dense_paragraphs_win_over_the_rest():
+    text = "\n\n".join([paragraph("apertura")] + [paragraph(f"cucina {index}") for index in range(10)]
+                       + ["Il nuovo LLM di Meta porta agenti AI in Europa: LLM, AI e agenti. " * 3])
+    compacted = compact_article_text(text, max_tokens=200, keywords=title_keywords("Meta LLM for AI agents"))
+    assert "Il nuovo LLM di Meta" in compacted
+    assert "cucina" not in compacted
+
+
+def test_title_keywords_keep_acronyms():
+    assert title_keywords("Meta releases new LLM for AI agents in EU") == [
+        "agents", "ai", "eu", "llm", "meta", "releases"]
+    assert title_keywords("A new model") == ["model"]
@@ -0,0 +1,54 @@
+# test_top_k_selector.py - Confronto della selezione in streaming con l'ordinamento completo
+import random
+
+import pytest
+
+from top_k_selector import TopKSelector
+
+
+def reference_selection(items, k, max_per_source, max_per_cluster):
+    """Ordinamento completo e scelta greedy: il risultato atteso"""
+    ordered = sorted(enumerate(items), key=lambda pair: (pair[1][1], -pair[0]), reverse=True)
+    per_source, per_cluster, selected = {}, {}, []
+    for _, (name, score, source, cluster) in ordered:
+        if len(selected) >= k:
+            break
+        if max_per_source is not None and per_source.get(source, 0) >= max_per_source:
+            continue
+        if max_per_cluster is not None and per_cluster.get(cluster, 0) >= max_per_cluster:
+            continue
+        per_source[source] = per_source.get(source, 0) + 1
+        per_cluster[cluster] = per_cluster.get(cluster, 0) + 1
+        selected.append((name, score))
+    return selected
+
+
+@pytest.mark.parametrize("max_per_source,max_per_cluster", [(None, None), (1, None), (2, None), (None, 1), (1, 1)])
+def test_matches_full_sort(max_per_source, max_per_cluster):
+    rng = random.Random(42)
+    for _ in range(200):
+        k = rng.randint(1, 5)
+        items = [(f"a{i}", rng.randint(0, 20), f"s{rng.randint(0, 3)}", f"c{rng.randint(0, 4)}")
+                 for i in range(rng.randint(0, 40))]
+        selector = TopKSelector(k, max_per_source=max_per_source, max_per_cluster=max_per_cluster)
+        for name, score, source, cluster in items:
+            selector.push(name, score, source=source, cluster=cluster)
+        assert selector.result() == reference_selection(items, k, max_per_source, max_per_cluster)
+
+
+def test_heap_stays_bounded_with_a_single_cap():
+    selector = TopKSelector(3, max_per_source=1)
+    for i in range(1000):
+        selector.push(i, float(i), source=f"s{i % 2}")
+        assert len(selector) < 6
+    assert selector.result() == [(999, 999.0), (998, 998.0)]
+
+
+def test_both_caps_never_return_fewer_than_available():
+    # Un articolo arrivato dopo esclude i due già scelti (stessa fonte dell'uno, stesso cluster dell'altro)
+    selector = TopKSelector(2, max_per_source=1, max_per_cluster=1)
+    selector.push("A", 10, source="s1", cluster="c1")
+    selector.push("B", 9, source="s2", cluster="c2")
+    selector.push("C", 8, source="s3", cluster="c3")
+    selector.push("X", 11, source="s1", cluster="c2")
+    assert [item for item, _ in selector.result()] == ["X", "C"]
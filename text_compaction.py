@@ -0,0 +1,175 @@
+# text_compaction.py - Riduzione del testo degli articoli entro un budget di token prima del prompt
+import logging
+import math
+import re
+from typing import Iterable, List, Optional, Set
+
+from keyword_matcher import KeywordMatcher
+
+DEFAULT_ARTICLE_MAX_TOKENS = 3000
+# Paragrafi brevi oltre i quali non si cercano formule di navigazione (un paragrafo lungo è contenuto)
+BOILERPLATE_MAX_WORDS = 30
+NAV_MAX_WORDS = 4
+# Voci minime perché una riga separata da "|", "•" ecc. sia una barra di link
+LINK_BLOCK_MIN_ITEMS = 3
+MIN_TITLE_KEYWORD_LENGTH = 4
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n|\n")
+_LINK_SEPARATOR_RE = re.compile(r"\s*[|•·»]\s*")
+
+# Formule con cui iniziano menu, box "articoli correlati", banner e piè di pagina (italiano e inglese).
+# Contano solo all'inizio del paragrafo: una frase che cita "newsletter" o "recommended" è contenuto
+_BOILERPLATE_RE = re.compile(
+    r"[\W_]*(leggi anche|leggi di più|potrebbe interessarti|articoli correlati|ti potrebbe interessare|"
+    r"iscriviti (alla|alle|a)\b|seguici su|condividi (su|questo)|tutti i diritti riservati|"
+    r"riproduzione riservata|questo sito (usa|utilizza) (i )?cookie|read more|"
+    r"related (articles|posts|stories)|recommended for you|you may also like|subscribe to|"
+    r"sign up for|follow us|share (this|on)|all rights reserved|we use cookies|"
+    r"this (site|website) uses cookies|click here|clicca qui|continue reading|continua a leggere)\b",
+    re.IGNORECASE,
+)
+
+_STOPWORDS = {
+    # Italiano
+    "alla", "alle", "agli", "allo", "anche", "come", "con", "dalla", "dalle", "degli", "della",
+    "delle", "dello", "dopo", "essere", "fare", "nella", "nelle", "negli", "nello", "perché",
+    "più", "quando", "quella", "quelle", "quello", "questa", "queste", "questo", "sono", "sulla",
+    "sulle", "sugli", "tutti", "tutto", "verso", "anni", "ecco", "cosa", "oggi",
+    # Inglese
+    "about", "after", "again", "also", "been", "before", "being", "from", "have", "here", "into",
+    "just", "more", "most", "only", "over", "some", "than", "that", "their", "them", "then",
+    "there", "these", "they", "this", "what", "when", "where", "which", "while", "will", "with",
+    "your", "says", "said", "makes", "how", "why", "new",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Stima locale dei token (nessuna chiamata all'API): ogni segno di punteggiatura è un token,
+    ogni parola circa un token ogni 4 caratteri. Sovrastima leggermente rispetto ai
+    tokenizer BPE, quindi il budget resta un limite superiore.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PIECE_RE.findall(text))
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [paragraph.strip() for paragraph in _PARAGRAPH_SPLIT_RE.split(text) if paragraph.strip()]
+
+
+def _normalized(paragraph: str) -> str:
+    return " ".join(_WORD_RE.findall(paragraph.lower()))
+
+
+def _is_boilerplate(paragraph: str) -> bool:
+    words = _WORD_RE.findall(paragraph)
+    if not words:
+        return True
+    if len(words) <= NAV_MAX_WORDS and not paragraph.rstrip().endswith((".", "!", "?", ":", "…")):
+        # Voci di menu, etichette, didascalie isolate
+        return True
+    items = [item for item in _LINK_SEPARATOR_RE.split(paragraph) if item]
+    if len(items) >= LINK_BLOCK_MIN_ITEMS and all(len(_WORD_RE.findall(item)) <= NAV_MAX_WORDS for item in items):
+        # Barra di link: "Home | Tecnologia | Economia | Contatti"
+        return True
+    return len(words) <= BOILERPLATE_MAX_WORDS and bool(_BOILERPLATE_RE.match(paragraph))
+
+
+def remove_boilerplate(paragraphs: Iterable[str]) -> List[str]:
+    """Toglie testo di navigazione, blocchi di link correlati e paragrafi ripetuti (tiene la prima occorrenza)"""
+    kept: List[str] = []
+    seen: Set[str] = set()
+    for paragraph in paragraphs:
+        if _is_boilerplate(paragraph):
+            continue
+        key = _normalized(paragraph)
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(paragraph)
+    return kept
+
+
+def title_keywords(title: str) -> List[str]:
+    """Parole significative del titolo, usate come keyword quando non ce ne sono di configurate"""
+    # Le sigle (AI, LLM, EU) si riconoscono dalle maiuscole, quindi prima di portare tutto in minuscolo
+    words = {word.lower() for word in _WORD_RE.findall(title or "")
+             if len(word) >= MIN_TITLE_KEYWORD_LENGTH or (len(word) > 1 and word.isupper())}
+    return sorted(word for word in words if word not in _STOPWORDS)
+
+
+def _truncate_to_budget(paragraph: str, max_tokens: int) -> str:
+    """Prime frasi del paragrafo che stanno nel budget (almeno la prima, tagliata a parole)"""
+    kept: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_END_RE.split(paragraph):
+        cost = estimate_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept)
+    words: List[str] = []
+    for word in paragraph.split():
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        words.append(word)
+    if not words:
+        # Una sola "parola" più lunga del budget (es. testo senza spazi): taglio a caratteri
+        return paragraph[:max_tokens * 4]
+    return " ".join(words) + " …"
+
+
+def compact_article_text(text: Optional[str], max_tokens: int = DEFAULT_ARTICLE_MAX_TOKENS,
+                         keywords: Iterable[str] = (), matcher: Optional[KeywordMatcher] = None) -> str:
+    """
+    Riporta il testo di un articolo entro 'max_tokens': un testo che ci sta già resta
+    intero; altrimenti prima toglie il boilerplate, poi, se serve ancora, tiene il paragrafo
+    d'apertura e i paragrafi con la maggiore densità di keyword, nell'ordine originale.
+    """
+    if not text:
+        return ""
+    paragraphs = split_paragraphs(text)
+    if sum(estimate_tokens(paragraph) for paragraph in paragraphs) <= max_tokens:
+        return "\n\n".join(paragraphs)
+    # Un testo fatto solo di righe brevi (es. il riassunto del feed) resta com'è
+    paragraphs = remove_boilerplate(paragraphs) or paragraphs
+    costs = [estimate_tokens(paragraph) for paragraph in paragraphs]
+    total = sum(costs)
+    if total <= max_tokens:
+        return "\n\n".join(paragraphs)
+
+    if matcher is None:
+        matcher = KeywordMatcher({"topic": keywords})
+
+    def density(index: int) -> float:
+        paragraph = paragraphs[index]
+        hits = [hit for hit in matcher.find_all(paragraph) if hit.group == "topic"]
+        distinct = len({hit.keyword.lower() for hit in hits})
+        words = max(1, len(_WORD_RE.findall(paragraph)))
+        # Densità delle occorrenze più un bonus per la varietà delle keyword; a parità conta la posizione
+        return len(hits) / words + 0.02 * distinct
+
+    # Il paragrafo d'apertura dà il contesto: entra sempre, poi gli altri per densità
+    ranked = [0] + sorted(range(1, len(paragraphs)), key=lambda index: (-density(index), index))
+    selected = {}
+    used = 0
+    for index in ranked:
+        remaining = max_tokens - used
+        if remaining <= 0:
+            break
+        if costs[index] <= remaining:
+            selected[index] = paragraphs[index]
+            used += costs[index]
+        elif index == 0:
+            selected[index] = _truncate_to_budget(paragraphs[index], remaining)
+            used += estimate_tokens(selected[index])
+
+    compacted = "\n\n".join(selected[index] for index in sorted(selected) if selected[index])
+    logging.info(f"Testo articolo ridotto da ~{total} a ~{estimate_tokens(compacted)} token "
+                 f"({len(selected)}/{len(paragraphs)} paragrafi)")
+    return compacted
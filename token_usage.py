@@ -0,0 +1,109 @@
+# token_usage.py - Conteggio dei token di input serviti dalla cache dei prompt dei provider
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+# Prezzo relativo dei token di input rispetto a quelli normali (listini Anthropic/OpenAI):
+# serve solo a stimare il risparmio nel riepilogo, non a fatturare
+CACHE_READ_COST_FACTOR = {"anthropic": 0.1, "openai": 0.5}
+CACHE_WRITE_COST_FACTOR = {"anthropic": 1.25, "openai": 1.0}
+
+
+def _field(usage: Any, name: str) -> Any:
+    """Legge un campo sia dagli oggetti degli SDK sia dai dizionari (risultati batch in JSON)"""
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(name)
+    return getattr(usage, name, None)
+
+
+def normalize_usage(provider: str, usage: Any) -> Dict[str, int]:
+    """
+    Riporta l'usage dei due provider alla stessa forma:
+    uncached (input a prezzo pieno), cache_write, cache_read e output.
+    Anthropic esclude i token in cache da 'input_tokens'; OpenAI li include in 'prompt_tokens'.
+    """
+    if provider == "anthropic":
+        return {
+            "uncached": _field(usage, "input_tokens") or 0,
+            "cache_write": _field(usage, "cache_creation_input_tokens") or 0,
+            "cache_read": _field(usage, "cache_read_input_tokens") or 0,
+            "output": _field(usage, "output_tokens") or 0,
+        }
+    prompt_tokens = _field(usage, "prompt_tokens") or 0
+    cached = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+    return {
+        "uncached": prompt_tokens - cached,
+        "cache_write": 0,
+        "cache_read": cached,
+        "output": _field(usage, "completion_tokens") or 0,
+    }
+
+
+class TokenUsageTracker:
+    """Somma i token per provider/modello durante un'esecuzione (thread-safe)"""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, usage: Any) -> Dict[str, int]:
+        counts = normalize_usage(provider, usage)
+        with self._lock:
+            totals = self._totals[f"{provider}/{model}"]
+            totals["requests"] += 1
+            for name, value in counts.items():
+                totals[name] += value
+        logging.debug(f"Token {provider}/{model}: {counts}")
+        return counts
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Totali per provider/modello con la quota di input letta dalla cache e il costo relativo stimato"""
+        with self._lock:
+            snapshot = {key: dict(values) for key, values in self._totals.items()}
+        for key, totals in snapshot.items():
+            provider = key.split("/", 1)[0]
+            total_input = totals.get("uncached", 0) + totals.get("cache_write", 0) + totals.get("cache_read", 0)
+            weighted = (totals.get("uncached", 0)
+                        + totals.get("cache_write", 0) * CACHE_WRITE_COST_FACTOR.get(provider, 1.0)
+                        + totals.get("cache_read", 0) * CACHE_READ_COST_FACTOR.get(provider, 1.0))
+            totals["input_total"] = total_input
+            totals["cached_ratio"] = round(totals.get("cache_read", 0) / total_input, 3) if total_input else 0.0
+            # Costo dell'input rispetto allo stesso input senza cache (1.0 = nessun risparmio)
+            totals["input_cost_ratio"] = round(weighted / total_input, 3) if total_input else 1.0
+        return snapshot
+
+    def log_summary(self, label: str = "Token di input") -> None:
+        summary = self.summary()
+        if not summary:
+            return
+        for key, totals in summary.items():
+            logging.info(
+                f"{label} {key}: {totals['requests']} richieste, {totals['input_total']} input "
+                f"(da cache {totals['cache_read']}, scritti in cache {totals['cache_write']}, "
+                f"non in cache {totals['uncached']}), {totals['output']} output, "
+                f"quota da cache {totals['cached_ratio']:.0%}, costo input relativo {totals['input_cost_ratio']:.2f}"
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+_default_tracker: Optional[TokenUsageTracker] = None
+_default_tracker_lock = threading.Lock()
+
+
+def get_token_usage() -> TokenUsageTracker:
+    """Contatore condiviso dal processo"""
+    global _default_tracker
+    with _default_tracker_lock:
+        if _default_tracker is None:
+            _default_tracker = TokenUsageTracker()
+        return _default_tracker
+
+
+def record_usage(provider: str, model: str, usage: Any) -> Dict[str, int]:
+    return get_token_usage().record(provider, model, usage)
@@ -0,0 +1,81 @@
+# top_k_selector.py - Selezione in streaming dei migliori K articoli con vincoli di diversità
+import heapq
+import itertools
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+Entry = Tuple[float, int, Optional[Hashable], Optional[Hashable], Any]
+
+
+class TopKSelector:
+    """
+    Mantiene i migliori K elementi man mano che arrivano in un unico min-heap: push()
+    costa O(log n) e i vincoli "al massimo N per fonte" e "al massimo N per cluster"
+    vengono controllati in result() con una selezione greedy per punteggio decrescente.
+    Quando il heap arriva a 2K elementi viene ridotto a quelli scelti dalla selezione,
+    perché gli altri non potranno più entrare nel risultato. Con entrambi i vincoli attivi
+    questo non vale (un nuovo elemento può escluderne due già scelti), quindi vengono
+    tenuti tutti: il risultato ha sempre K elementi se esistono.
+    A parità di punteggio vince l'elemento arrivato prima (come un ordinamento stabile).
+    """
+
+    def __init__(self, k: int, max_per_source: Optional[int] = None,
+                 max_per_cluster: Optional[int] = None):
+        self.k = max(0, k)
+        self.max_per_source = max_per_source
+        self.max_per_cluster = max_per_cluster
+        self._can_prune = max_per_source is None or max_per_cluster is None
+        self._heap: List[Entry] = []
+        self._cutoff: Optional[Tuple[float, int]] = None
+        self._counter = itertools.count()
+        self.seen = 0
+
+    def push(self, item: Any, score: float, source: Optional[Hashable] = None,
+             cluster: Optional[Hashable] = None) -> bool:
+        """Propone un elemento; restituisce False se è stato scartato subito"""
+        self.seen += 1
+        if self.k == 0:
+            return False
+        entry = (score, -next(self._counter), source, cluster, item)
+        if self._cutoff is not None and entry[:2] < self._cutoff:
+            return False
+        heapq.heappush(self._heap, entry)
+        if self._can_prune and len(self._heap) >= 2 * self.k:
+            self._prune()
+        return True
+
+    def _prune(self) -> None:
+        # Con un solo tipo di vincolo un elemento non scelto adesso non lo sarà mai: o sta sotto
+        # il K-esimo scelto, o la sua fonte (o cluster) ha già il massimo di elementi migliori.
+        # I nuovi arrivi possono solo alzare la soglia
+        self._heap = self._select()
+        heapq.heapify(self._heap)
+        if len(self._heap) >= self.k:
+            self._cutoff = self._heap[0][:2]
+
+    def _select(self) -> List[Entry]:
+        per_source: Dict[Hashable, int] = {}
+        per_cluster: Dict[Hashable, int] = {}
+        selected: List[Entry] = []
+        for entry in sorted(self._heap, key=lambda candidate: candidate[:2], reverse=True):
+            if len(selected) >= self.k:
+                break
+            _, _, source, cluster, _ = entry
+            if (self.max_per_source is not None and source is not None
+                    and per_source.get(source, 0) >= self.max_per_source):
+                continue
+            if (self.max_per_cluster is not None and cluster is not None
+                    and per_cluster.get(cluster, 0) >= self.max_per_cluster):
+                continue
+            if source is not None:
+                per_source[source] = per_source.get(source, 0) + 1
+            if cluster is not None:
+                per_cluster[cluster] = per_cluster.get(cluster, 0) + 1
+            selected.append(entry)
+        return selected
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def result(self) -> List[Tuple[Any, float]]:
+        """I migliori K elementi (con punteggio) che rispettano i vincoli, in ordine decrescente"""
+        return [(item, score) for score, _, _, _, item in self._select()]
@@ -0,0 +1,80 @@
+# url_utils.py - Normalizzazione degli URL degli articoli
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+# Parametri di tracking che non cambiano il contenuto della pagina
+TRACKING_PARAM_PREFIXES = ("utm_", "mc_", "pk_", "hsa_")
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mkt_tok",
+    "ref_src", "ref_url", "cmpid", "_hsenc", "_hsmi", "guccounter", "ncid",
+    "sr_share", "taid", "smid",
+}
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def is_tracking_param(name: str) -> bool:
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or lowered.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canonica di un URL: schema e host in minuscolo, senza porta di default,
+    senza frammento, senza parametri di tracking e con la query ordinata.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query_params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                    if not is_tracking_param(k)]
+    query = urlencode(sorted(query_params))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+# Host che restituiscono solo un redirect verso l'articolo vero
+REDIRECTOR_HOSTS = {
+    "feedproxy.google.com", "feeds.feedburner.com", "news.google.com", "t.co",
+    "bit.ly", "ow.ly", "buff.ly", "lnkd.in", "tinyurl.com", "dlvr.it", "trib.al",
+}
+REDIRECT_TIMEOUT = 5
+MIN_TITLE_WORDS = 4
+
+
+def is_redirector(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return host in REDIRECTOR_HOSTS
+
+
+def resolve_redirect(url: str, timeout: float = REDIRECT_TIMEOUT) -> str:
+    """Segue i redirect e restituisce l'URL finale (o quello originale se la richiesta fallisce)"""
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+        if response.status_code >= 400:
+            # Alcuni server non supportano HEAD: ripiego su GET senza scaricare il corpo
+            response = requests.get(url, allow_redirects=True, timeout=timeout, stream=True)
+            response.close()
+        return response.url or url
+    except Exception:
+        return url
+
+
+def normalize_title(title: str) -> str:
+    """Titolo in minuscolo, senza punteggiatura e spazi multipli (vuoto se troppo generico)"""
+    words = re.findall(r"\w+", (title or "").lower())
+    if len(words) < MIN_TITLE_WORDS:
+        return ""
+    return " ".join(words)